@@ -6,8 +6,8 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from db.session import SessionLocal
-from db.models import UserStats
-from ui_utils import load_css, render_header
+from core.gamification import get_user_stats
+from ui_utils import current_user_id, load_css, render_header, render_user_selector
 try:
     from core.rank_system import get_rank_info
 except ImportError:
@@ -26,9 +26,10 @@ st.set_page_config(
 )
 
 # --- v2.0 NEW: Sidebar Gamification Info ---
+render_user_selector()
 db_s = SessionLocal()
 try:
-    stats_s = db_s.query(UserStats).first()
+    stats_s = get_user_stats(db_s, current_user_id())
     if stats_s:
         rank, next_rank = get_rank_info(stats_s.total_points)
         
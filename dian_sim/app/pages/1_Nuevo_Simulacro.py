@@ -6,9 +6,11 @@ import pandas as pd
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from db.session import SessionLocal
-from db.models import Question, Skill
-from core.adaptive import select_questions_for_simulation
-from ui_utils import load_css, render_header
+from core.selection import get_question_pool
+from core.taxonomy import get_taxonomy
+from core.exam_snapshot import build_exam_snapshot
+from core.scheduler import MODE_ADAPTIVE, MODE_REVIEW, count_due, select_review_session
+from ui_utils import current_user_id, load_css, render_header, render_user_selector
 from core.profiles import PROFILES, get_profile_topics
 
 def get_db():
@@ -18,10 +20,28 @@ def get_db():
 st.set_page_config(page_title="Nuevo Simulacro | DIAN Sim", page_icon="📝", layout="wide")
 load_css()
 render_header(title="Nuevo Simulacro", subtitle="Configura los parámetros de tu sesión de estudio")
+render_user_selector()
+user_id = current_user_id()
 
 with st.container():
     st.markdown('<div class="dian-card">', unsafe_allow_html=True)
     
+    # Modo de selección (aplica a ambas pestañas)
+    try:
+        db_temp = get_db()
+        due_count = count_due(db_temp, user_id=user_id)
+        db_temp.close()
+    except Exception:
+        due_count = 0
+    selection_mode = st.radio(
+        "Modo de selección",
+        [MODE_REVIEW, MODE_ADAPTIVE],
+        format_func=lambda m: {MODE_REVIEW: f"📅 Repaso espaciado ({due_count} pendientes)",
+                               MODE_ADAPTIVE: "🎯 Adaptativo 60/25/15"}[m],
+        horizontal=True,
+        help="Repaso espaciado prioriza las preguntas cuyo repaso ya venció y completa con la mezcla adaptativa.",
+    )
+
     # Tabs for Mode
     tab_manual, tab_profile = st.tabs(["🎛️ Configuración Manual", "👤 Preparación por Cargo"])
     
@@ -33,26 +53,26 @@ with st.container():
             
             st.markdown("<br>**Filtros Opcionales** (Dejar vacío para incluir todo)", unsafe_allow_html=True)
             
-            # Get available options with error handling
+            # Opciones desde el catálogo de taxonomía (en memoria hasta que cambie el banco)
             try:
                 db_temp = get_db()
-                all_tracks = [t[0] for t in db_temp.query(Question.track).distinct().all() if t[0]]
-                all_competencies = [t[0] for t in db_temp.query(Question.competency).distinct().all() if t[0]]
-                all_topics = [t[0] for t in db_temp.query(Question.topic).distinct().all() if t[0]]
+                taxonomy = get_taxonomy(db_temp)
                 db_temp.close()
+                all_tracks, all_competencies, all_topics = taxonomy.tracks, taxonomy.competencies, taxonomy.topics
             except Exception as e:
                 st.error(f"Error de conexión con la base de datos: {e}")
                 st.info("Intenta recargar la página o verifica tu conexión a internet.")
+                taxonomy = None
                 all_tracks, all_competencies, all_topics = [], [], []
 
             col1, col2 = st.columns(2)
             with col1:
-                track_filter = st.multiselect("Eje (Track)", sorted(all_tracks))
+                track_filter = st.multiselect("Eje (Track)", all_tracks)
                 difficulty_filter = st.multiselect("Dificultad", [1, 2, 3], format_func=lambda x: {1: "🟢 Básico", 2: "🟡 Intermedio", 3: "🔴 Avanzado"}[x])
             with col2:
-                competency_filter = st.multiselect("Competencia", sorted(all_competencies))
+                competency_filter = st.multiselect("Competencia", all_competencies)
             
-            topic_filter = st.multiselect("Tema Específico", sorted(all_topics))
+            topic_filter = st.multiselect("Tema Específico", all_topics)
             
             st.markdown("<br>", unsafe_allow_html=True)
             col_t1, col_t2 = st.columns(2)
@@ -88,14 +108,12 @@ with st.container():
             with col_p2:
                 difficulty_profile = st.multiselect("Nivel de Dificultad", [1, 2, 3], default=[1, 2, 3], format_func=lambda x: {1: "🟢 Básico", 2: "🟡 Intermedio", 3: "🔴 Avanzado"}[x], key="diff_profile")
 
-            # Check availability
+            # Check availability (conteo memorizado en el catálogo de taxonomía)
             try:
-                db_chk = get_db()
-                query_chk = db_chk.query(Question).filter(Question.topic.in_(profile_topics))
-                if difficulty_profile:
-                    query_chk = query_chk.filter(Question.difficulty.in_(difficulty_profile))
-                available_count = query_chk.count()
-                db_chk.close()
+                if taxonomy is None:
+                    raise RuntimeError("catálogo de taxonomía no disponible")
+                available_count = taxonomy.count(topics=profile_topics, difficulties=difficulty_profile) \
+                    if profile_topics else 0
                 
                 if available_count < 5:
                     st.warning(f"⚠️ Solo hay {available_count} preguntas disponibles para estos temas en tu banco local.")
@@ -152,35 +170,36 @@ if run_sim:
     try:
         db = get_db()
         
-        # 1. Fetch Candidates
-        query = db.query(Question)
+        # 1. Snapshot compacto del banco (se reconstruye solo si el banco cambió)
+        pool = get_question_pool(db, user_id)
         
-        if final_query_filters.get("tracks"):
-            query = query.filter(Question.track.in_(final_query_filters["tracks"]))
-        if final_query_filters.get("competencies"):
-            query = query.filter(Question.competency.in_(final_query_filters["competencies"]))
-        if final_query_filters.get("topics"):
-            query = query.filter(Question.topic.in_(final_query_filters["topics"]))
-        if final_query_filters.get("difficulties"):
-            query = query.filter(Question.difficulty.in_(final_query_filters["difficulties"]))
-        if final_query_filters.get("only_situational"):
-            query = query.filter(Question.stem.ilike("%SITUACIÓN%"))
+        # 2. Filtros como máscara sobre el snapshot
+        candidate_mask = pool.mask(
+            tracks=final_query_filters.get("tracks"),
+            competencies=final_query_filters.get("competencies"),
+            topics=final_query_filters.get("topics"),
+            difficulties=final_query_filters.get("difficulties"),
+            only_situational=final_query_filters.get("only_situational", False)
+        )
         
-        all_candidates = query.all()
-        
-        # 2. Fetch Skills for Adaptive Logic
-        skills = db.query(Skill).all()
-        skills_map = {(s.track, s.competency, s.topic): s for s in skills}
+        # 3. Select Questions: pendientes de repaso primero, o 60/25/15 ponderado por prioridad
+        if selection_mode == MODE_REVIEW:
+            selected, _ = select_review_session(db, pool, num_questions, mask=candidate_mask, user_id=user_id)
+        else:
+            selected = pool.select(num_questions, mask=candidate_mask)
         
-        # 3. Select Questions
-        selected = select_questions_for_simulation(all_candidates, skills_map, n=num_questions)
+        # 4. Snapshot inmutable del examen: Ejecución y Resultados no vuelven a consultar la BD
+        snapshot = build_exam_snapshot(db, selected)
+        db.close()
         
-        if not selected:
+        if not len(snapshot):
             st.error("No hay preguntas disponibles con estos criterios.")
         else:
             # Initialize Exam Session State
             st.session_state["exam_mode"] = True
-            st.session_state["exam_questions"] = [q.question_id for q in selected] # Store IDs
+            st.session_state["exam_user_id"] = user_id # el examen se guarda a nombre de quien lo inició
+            st.session_state["exam_questions"] = list(snapshot.question_ids) # Store IDs
+            st.session_state["exam_snapshot"] = snapshot
             st.session_state["current_idx"] = 0
             st.session_state["answers"] = {} # {q_id: chosen_key}
             st.session_state["hardcore_mode"] = final_query_filters.get("hardcore", False)
@@ -1,91 +1,26 @@
 import streamlit as st
 import time
 from db.session import SessionLocal
-from db.models import Question, Attempt, Skill
-import datetime
-from core.adaptive import calculate_mastery_update, update_priority
-from core.gamification import update_user_stats
+from core.exam_snapshot import snapshot_for
+from core.finalize import finalize_exam_batch
+from core.selection import update_pool_skills
 from core.rank_system import get_rank_info
 from core.generators.llm import LLMGenerator
-from ui_utils import load_css, render_header
+from ui_utils import current_user_id, load_css, render_header
 
 # --- v2.2: Exam Termination Function ---
 def finalize_exam(db, q_ids, answers_dict):
-    """Processes all answers and saves to DB."""
+    """Processes all answers and saves to DB (batched: load / compute / write)."""
+    user_id = st.session_state.get("exam_user_id") or current_user_id()
     try:
-        correct_count = 0
-        total_q = len(q_ids)
-        eje_results = {} # {"FUNCIONAL": [correct, total], ...}
+        summary = finalize_exam_batch(db, q_ids, answers_dict, user_id=user_id)
         
-        for qid in q_ids:
-            q_obj = db.query(Question).get(qid)
-            key_chosen = answers_dict.get(qid, "NONE")
-            
-            is_right = (key_chosen == q_obj.correct_key)
-            if is_right:
-                correct_count += 1
-                
-            # Track by Eje for weighting
-            track = q_obj.track or "FUNCIONAL"
-            if track not in eje_results:
-                eje_results[track] = [0, 0]
-            eje_results[track][1] += 1
-            if is_right:
-                eje_results[track][0] += 1
-
-            # Create Attempt
-            att = Attempt(
-                question_id=qid,
-                chosen_key=key_chosen,
-                is_correct=is_right,
-                created_at=datetime.datetime.utcnow()
-            )
-            db.add(att)
-            
-            # Update Skills
-            skill = db.query(Skill).filter_by(track=q_obj.track, competency=q_obj.competency, topic=q_obj.topic).first()
-            if not skill:
-                skill = Skill(
-                    track=q_obj.track, 
-                    competency=q_obj.competency, 
-                    topic=q_obj.topic, 
-                    macro_dominio=q_obj.macro_dominio,
-                    micro_competencia=q_obj.micro_competencia,
-                    mastery_score=0.0, 
-                    priority_weight=1.0
-                )
-                db.add(skill)
-                db.flush()
-            
-            # Sync taxonomy update
-            skill.macro_dominio = q_obj.macro_dominio
-            skill.micro_competencia = q_obj.micro_competencia
-            
-            skill.mastery_score = calculate_mastery_update(is_right, skill.mastery_score)
-            skill.priority_weight = update_priority(skill.priority_weight, is_right)
-            skill.last_seen = datetime.datetime.utcnow()
-        
-        # Breakdown into dict of tuples for update_user_stats
-        breakdown = {k: (v[0], v[1]) for k,v in eje_results.items()}
-        
-        # Update Gamification with official weighting
-        stats, points_earned, new_achievements, rank_up, is_passed = update_user_stats(db, datetime.date.today(), correct_count, total_q, eje_breakdown=breakdown)
-        db.commit()
+        # Mantener los buckets del selector adaptativo sincronizados
+        update_pool_skills(summary.pop("skill_updates"), user_id)
         
         # Store results for next page
         st.session_state["exam_mode"] = False
-        st.session_state["last_results"] = {
-            "total": total_q,
-            "correct": correct_count,
-            "score": (correct_count / total_q) * 100 if total_q > 0 else 0,
-            "q_ids": q_ids,
-            "points_earned": points_earned,
-            "new_streak": stats.current_streak,
-            "rank_up": rank_up,
-            "is_passed": is_passed,
-            "new_achievements": [a.name for a in new_achievements],
-            "breakdown": breakdown
-        }
+        st.session_state["last_results"] = {**summary, "q_ids": q_ids}
         return True
     except Exception as e:
         db.rollback()
@@ -121,13 +56,21 @@ if "exam_mode" not in st.session_state or not st.session_state["exam_mode"]:
     st.warning("No hay un examen activo. Ve a 'Nuevo Simulacro'.")
     st.stop()
 
-q_ids = st.session_state["exam_questions"]
-current_idx = st.session_state["current_idx"]
+# Snapshot construido al iniciar el simulacro: navegar no consulta la BD
+snapshot = snapshot_for(st.session_state, st.session_state["exam_questions"], SessionLocal)
+q_ids = list(snapshot.question_ids)
+if not q_ids:
+    # Todas las preguntas del simulacro se borraron del banco antes de reconstruir el snapshot
+    st.session_state["exam_mode"] = False
+    st.session_state.pop("exam_snapshot", None)
+    st.warning("Las preguntas de este simulacro ya no existen en el banco. Inicia uno nuevo en 'Nuevo Simulacro'.")
+    st.stop()
+st.session_state["exam_questions"] = q_ids
+current_idx = min(st.session_state["current_idx"], len(q_ids) - 1)
 total_q = len(q_ids)
 
-db = SessionLocal()
 current_q_id = q_ids[current_idx]
-question = db.query(Question).filter(Question.question_id == current_q_id).first()
+question = snapshot[current_idx]
 
 # --- v2.0 NEW: Chronometer / Timer ---
 if "total_time_limit" not in st.session_state:
@@ -165,19 +108,14 @@ st.markdown('<div class="dian-card">', unsafe_allow_html=True)
 st.caption(f"Eje: {question.track} | Macro: {question.macro_dominio or 'General'}")
 st.markdown(f"### {question.topic}")
 
-stem_text = question.stem
-if "SITUACIÓN:" in stem_text and "PREGUNTA:" in stem_text:
-    try:
-        parts = stem_text.split("PREGUNTA:")
-        sit_part = parts[0].replace("SITUACIÓN:", "").strip()
-        q_part = parts[1].strip()
-        st.markdown(f"<div style='background: rgba(230, 0, 0, 0.03); border-left: 6px solid var(--dian-red); padding: 24px; border-radius: 4px 20px 20px 4px; margin-bottom: 24px; backdrop-filter: blur(5px);'><div style='color: var(--dian-red); text-transform: uppercase; font-size: 0.75rem; font-weight: 800; letter-spacing: 0.1em; margin-bottom: 12px; display: flex; align-items: center; gap: 8px;'><span style='background: var(--dian-red); width: 8px; height: 8px; border-radius: 50%;'></span>Caso / Situación Laboral</div><div style='font-size: 1.1rem; line-height: 1.7; color: #334155;'>{sit_part}</div></div><div class='question-stem'>{q_part}</div>", unsafe_allow_html=True)
-    except:
-        st.markdown(f"<div class='question-stem'>{stem_text}</div>", unsafe_allow_html=True)
+if question.situation is not None:
+    sit_part = question.situation
+    q_part = question.question_text
+    st.markdown(f"<div style='background: rgba(230, 0, 0, 0.03); border-left: 6px solid var(--dian-red); padding: 24px; border-radius: 4px 20px 20px 4px; margin-bottom: 24px; backdrop-filter: blur(5px);'><div style='color: var(--dian-red); text-transform: uppercase; font-size: 0.75rem; font-weight: 800; letter-spacing: 0.1em; margin-bottom: 12px; display: flex; align-items: center; gap: 8px;'><span style='background: var(--dian-red); width: 8px; height: 8px; border-radius: 50%;'></span>Caso / Situación Laboral</div><div style='font-size: 1.1rem; line-height: 1.7; color: #334155;'>{sit_part}</div></div><div class='question-stem'>{q_part}</div>", unsafe_allow_html=True)
 else:
-    st.markdown(f"<div class='question-stem'>{stem_text}</div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='question-stem'>{question.stem}</div>", unsafe_allow_html=True)
 
-options = question.options_json 
+options = question.options
 opts_keys = list(options.keys())
 opts_values = [f"{k}) {v}" for k,v in options.items()]
 existing_ans = st.session_state["answers"].get(current_q_id)
@@ -201,8 +139,7 @@ with col2:
                     api_key = get_api_key(current_provider)
                     if api_key:
                         gen = LLMGenerator(current_provider, api_key)
-                        q_data = {"stem": question.stem, "options_json": question.options_json, "correct_key": question.correct_key, "rationale": question.rationale}
-                        st.session_state["tutor_explanation"] = gen.explain_question(q_data)
+                        st.session_state["tutor_explanation"] = gen.explain_question(question.to_dict())
                     else: st.warning(f"⚠️ API Key de {current_provider} no configurada.")
                 except Exception as e: st.error(f"Error: {e}")
     if st.session_state.get("tutor_explanation"):
@@ -224,8 +161,8 @@ with col3:
     else:
         finish_label = "🏁 Finalizar" if time_left > 0 else "⌛ Resultados"
         if st.button(finish_label, type="primary", use_container_width=True):
-            if finalize_exam(db, q_ids, st.session_state["answers"]):
-                db.close()
+            db = SessionLocal()
+            finished = finalize_exam(db, q_ids, st.session_state["answers"])
+            db.close()
+            if finished:
                 st.switch_page("pages/3_Resultados.py")
-
-db.close()
@@ -9,7 +9,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 # For now, I will assume the instruction was to ensure the existing block is present.
 
 from db.session import SessionLocal
-from db.models import Question
+from core.exam_snapshot import snapshot_for
 from ui_utils import load_css, render_header, metric_card
 from core.pdf_utils import generate_exam_pdf
 
@@ -78,16 +78,15 @@ st.divider()
 
 # --- v2.5 PDF DOWNLOAD BUTTON ---
 st.subheader("📄 Reporte de Desempeño")
-db = SessionLocal()
-q_ids = data["q_ids"]
+# Mismo snapshot del simulacro: sin consultas a la BD
+snapshot = snapshot_for(st.session_state, data["q_ids"], SessionLocal)
 answers = st.session_state.get("answers", {})
 
 details = []
-for qid in q_ids:
-    q = db.query(Question).get(qid)
+for q in snapshot:
     details.append({
         "stem": q.stem,
-        "user_ans": answers.get(qid, "N/A"),
+        "user_ans": answers.get(q.question_id, "N/A"),
         "correct_key": q.correct_key,
         "rationale": q.rationale
     })
@@ -115,13 +114,8 @@ if not is_passed:
 else:
     st.subheader("📝 Detalle de Respuestas")
 
-    db = SessionLocal()
-    q_ids = data["q_ids"]
-    answers = st.session_state.get("answers", {})
-
-    for i, qid in enumerate(q_ids):
-        q = db.query(Question).get(qid)
-        user_ans = answers.get(qid, "N/A")
+    for i, q in enumerate(snapshot):
+        user_ans = answers.get(q.question_id, "N/A")
         is_right = (user_ans == q.correct_key)
         
         icon = "✅" if is_right else "❌"
@@ -134,7 +128,7 @@ else:
             col_ans1, col_ans2 = st.columns(2)
             
             # Get option texts
-            opts = q.options_json if q.options_json else {}
+            opts = q.options
             user_text = opts.get(user_ans, "Sin responder")
             correct_text = opts.get(q.correct_key, "")
 
@@ -152,7 +146,5 @@ else:
             st.caption(f"ID: {q.question_id} | Macro-Dominio: {q.macro_dominio} | Micro: {q.micro_competencia}")
             st.markdown("</div>", unsafe_allow_html=True)
 
-    db.close()
-
 if st.button("🏠 Inicio", type="primary"):
     st.switch_page("app.py")
@@ -1,7 +1,6 @@
 import streamlit as st
 import os
 import sys
-import uuid
 
 # Ensure project root is in PYTHONPATH
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
@@ -9,11 +8,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')
 from db.session import SessionLocal
 from db.models import Question
 from core.generators.llm import LLMGenerator
+from core.llm_cache import get_llm_cache
 from core.dedupe import compute_hash
+from core.dedupe_index import get_dedupe_index
+from core.question_store import build_question_row, insert_questions, after_questions_committed
 from core.config import get_api_key, save_api_key_local # NUEVO
+from core.generators.retrieval import CHARS_PER_TOKEN, DEFAULT_CONTEXT_TOKENS, split_chunks
+from core.pdf_extract import CHUNK_PAGES, file_sha256, get_pdf_cache, iter_pages, page_count, parse_page_range
 from ui_utils import load_css, render_header
 
-import pypdf
 import io
 
 st.set_page_config(page_title="Generador IA | DIAN Sim", page_icon="🤖", layout="wide")
@@ -94,12 +97,32 @@ with col1:
         if uploaded_file:
             try:
                 if uploaded_file.type == "application/pdf":
-                    reader = pypdf.PdfReader(uploaded_file)
-                    extracted = []
-                    for page in reader.pages:
-                        extracted.append(page.extract_text())
-                    st.session_state["ai_source_text"] = "\n".join(extracted)
-                    st.success(f"PDF cargado: {len(reader.pages)} páginas leídas.")
+                    data = uploaded_file.getvalue()
+                    sha = file_sha256(data)
+                    pdf_cache = get_pdf_cache()
+                    n_pages = page_count(data, sha, pdf_cache)
+                    page_spec = st.text_input(f"Páginas a extraer (de {n_pages})", value="",
+                                              placeholder="Ej: 1-20, 35, 120-  (vacío = todas)",
+                                              help="Extrae solo los artículos que necesitas; las páginas ya leídas salen de la caché.")
+                    pages = parse_page_range(page_spec, n_pages)
+                    # Solo se extrae si cambió el archivo o el rango (no en cada rerun)
+                    pdf_key = (sha, tuple(pages))
+                    if st.session_state.get("ai_pdf_loaded") != pdf_key:
+                        progress = st.progress(0.0, text="Extrayendo texto...")
+                        preview = st.empty()
+                        extracted = []
+                        for n_done, (page_no, text) in enumerate(iter_pages(data, pages, cache=pdf_cache), start=1):
+                            extracted.append(text)
+                            if n_done % CHUNK_PAGES == 0 or n_done == len(pages):
+                                progress.progress(n_done / len(pages), text=f"Página {page_no + 1} ({n_done}/{len(pages)})")
+                                preview.text_area("Vista previa", "\n".join(extracted)[-5000:], height=200,
+                                                  disabled=True, key=f"pdf_preview_{n_done}")
+                        st.session_state["ai_source_text"] = "\n".join(extracted)
+                        st.session_state["ai_pdf_loaded"] = pdf_key
+                        # Refrescar el área de texto de la otra pestaña con el contenido nuevo
+                        st.session_state.pop("ia_text_input", None)
+                        st.rerun()
+                    st.success(f"PDF cargado: {len(pages)} de {n_pages} páginas leídas.")
                 else:
                     # TXT
                     st.session_state["ai_source_text"] = uploaded_file.read().decode("utf-8")
@@ -126,6 +149,17 @@ with col1:
     st.info("💡 Todas las preguntas generadas serán **SITUACIONALES** (casos prácticos) para cumplir con el estándar de evaluación de la DIAN.")
     st.caption("💎 **Tip Pro:** Si usas Gemini Free Tier, intenta generar lotes de **5 a 10 preguntas** a la vez.")
     
+    with st.expander("📚 Documentos largos"):
+        context_tokens = st.slider("Contexto por lote (tokens aprox.)", 500, 4000, DEFAULT_CONTEXT_TOKENS, step=250,
+                                   help="Cada lote recibe fragmentos distintos del documento hasta este tamaño. Menos tokens = prompts más baratos.")
+        focus_query = st.text_input("Enfoque (opcional)", value="", placeholder="Ej: sanción por extemporaneidad",
+                                    help="Los lotes priorizan los artículos más relacionados con estos términos.")
+        n_batches = -(-num_q // 5)
+        if len(source_text) > context_tokens * CHARS_PER_TOKEN:
+            st.caption(f"📑 {len(split_chunks(source_text))} fragmentos · {n_batches} lote(s) con contexto propio.")
+
+    use_llm_cache = st.checkbox("♻️ Reutilizar respuestas en caché", value=True,
+                                help="Si el mismo texto ya se generó con este proveedor, se reutiliza la respuesta guardada. Desmárcalo para pedir preguntas nuevas.")
     generate_btn = st.button("✨ Generar Preguntas", type="primary", use_container_width=True)
 
 # Helper to get info
@@ -149,6 +183,16 @@ st.sidebar.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+llm_cache = get_llm_cache()
+if llm_cache:
+    cache_stats = llm_cache.stats()
+    batch_stats = cache_stats.get("batch", {"hits": 0, "misses": 0})
+    explain_stats = cache_stats.get("explain", {"hits": 0, "misses": 0})
+    st.sidebar.caption(
+        f"♻️ Caché IA: {cache_stats['entries']} respuestas · lotes {batch_stats['hits']}/{batch_stats['hits'] + batch_stats['misses']} · "
+        f"tutor {explain_stats['hits']}/{explain_stats['hits'] + explain_stats['misses']} aciertos"
+    )
+
 if generate_btn:
     if not api_key:
         st.error("🔑 Falta la API Key. Por favor, ingrésala en la sección de configuración arriba.")
@@ -158,7 +202,15 @@ if generate_btn:
         with st.spinner("Analizando texto y creando preguntas... (Esto puede tardar unos segundos)"):
             try:
                 generator = LLMGenerator(provider, api_key, model_name=model_name)
-                results = generator.generate_from_text(source_text, num_q, difficulty=difficulty_value)
+                gen_progress = st.progress(0.0, text="Generando lotes...")
+
+                def on_batch(batch_results, done, total):
+                    gen_progress.progress(done / total, text=f"Lote {done}/{total} listo ({len(batch_results)} preguntas)")
+
+                results = generator.generate_from_text(source_text, num_q, difficulty=difficulty_value,
+                                                        on_batch=on_batch, use_cache=use_llm_cache,
+                                                        context_tokens=context_tokens, query=focus_query or None)
+                gen_progress.empty()
                 
                 # Apply Custom Topic Override
                 if results and custom_topic.strip():
@@ -188,6 +240,18 @@ def check_duplicate(hash_norm):
         print(f"DEBUG: Error checking duplicate: {e}")
         return None
 
+def get_synced_dedupe_index():
+    """Índice LSH de casi-duplicados, reconstruido desde la BD si quedó desfasado."""
+    try:
+        db = SessionLocal()
+        index = get_dedupe_index()
+        index.ensure_synced(db)
+        db.close()
+        return index
+    except Exception as e:
+        print(f"DEBUG: Dedupe index unavailable: {e}")
+        return None
+
 with col2:
     st.subheader("2. Revisar y Guardar")
     if "generated_questions" in st.session_state and st.session_state["generated_questions"]:
@@ -201,6 +265,7 @@ with col2:
                 st.rerun()
         
         indices_to_save = []
+        dedupe_index = get_synced_dedupe_index()
         
         # Display candidates
         for i, q in enumerate(candidates):
@@ -235,56 +300,42 @@ with col2:
                 
                 # Check Duplicates
                 exists = check_duplicate(q['hash_norm'])
+                near = dedupe_index.find_duplicates(q['stem'], limit=1) if (dedupe_index and not exists) else []
                 if exists:
                     st.warning("⚠️ Ya existe en el banco.")
                 else:
-                    if st.checkbox("Incluir en el guardado", key=f"save_{i}", value=True):
+                    if near:
+                        st.warning(f"⚠️ Muy similar a una pregunta existente ({near[0][1]:.0f}% de similitud).")
+                    if st.checkbox("Incluir en el guardado", key=f"save_{i}", value=not near):
                         indices_to_save.append(i)
         
         st.divider()
         if st.button("💾 Guardar Seleccionadas en Banco", type="primary", use_container_width=True, disabled=not indices_to_save):
-            from db.session import SessionLocal
-            import datetime
             db = SessionLocal()
-            saved_count = 0
-            already_exists = 0
             try:
-                local_seen_hashes = set()
+                rows = []
                 for i in indices_to_save:
                     data = candidates[i]
-                    h = data.get('hash_norm')
-                    
-                    if h in local_seen_hashes:
-                        already_exists += 1
-                        continue
-                    
-                    existing = db.query(Question).filter_by(hash_norm=h).first()
-                    if not existing:
-                        new_q = Question(
-                            question_id=str(uuid.uuid4()),
-                            track=data.get('track', 'FUNCIONAL'),
-                            macro_dominio=data.get('macro_dominio'),
-                            micro_competencia=data.get('micro_competencia'),
-                            competency=data.get('micro_competencia', data.get('competency', 'General')),
-                            topic=data.get('topic', 'Generado por IA'),
-                            difficulty=data.get('difficulty', 2),
-                            stem=data.get('stem'),
-                            options_json=data.get('options_json'),
-                            correct_key=data.get('correct_key'),
-                            rationale=data.get('rationale'),
-                            source_refs=data.get('source_refs', 'IA'),
-                            created_at=datetime.datetime.utcnow(),
-                            hash_norm=h
-                        )
-                        db.add(new_q)
-                        local_seen_hashes.add(h)
-                        saved_count += 1
-                        print(f"DEBUG: Saving question to DB: {new_q.stem[:50]}...")
-                    else:
-                        already_exists += 1
+                    rows.append(build_question_row({
+                        **data,
+                        "track": data.get('track', 'FUNCIONAL'),
+                        "competency": data.get('micro_competencia', data.get('competency', 'General')),
+                        "topic": data.get('topic', 'Generado por IA'),
+                        "difficulty": data.get('difficulty', 2),
+                        "source_refs": data.get('source_refs', 'IA'),
+                        "question_id": None,
+                        "created_at": None,
+                    }))
+                
+                # Un solo INSERT ... ON CONFLICT(hash_norm) DO NOTHING
+                saved_items = insert_questions(db, rows)
+                saved_count = len(saved_items)
+                already_exists = len(rows) - saved_count
                 
                 if saved_count > 0:
                     db.commit()
+                    after_questions_committed(saved_items)
+                    print(f"DEBUG: Saved {saved_count} questions to DB.")
                     st.success(f"✅ ¡Éxito! Se guardaron **{saved_count}** preguntas nuevas en el banco.")
                     if already_exists > 0:
                         st.info(f"ℹ️ {already_exists} preguntas fueron omitidas porque ya existían.")
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import os
 import sys
-import uuid
 import datetime
 import io
 
@@ -10,9 +9,15 @@ import io
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from db.session import SessionLocal
-from db.models import Question
-from core.dedupe import compute_hash, find_duplicates
-from core.import_utils import validate_import_df
+from core.dedupe import find_duplicates
+from core.export import FORMATS as EXPORT_FORMATS, deferred_export, parquet_available
+from core.bank_pages import PAGE_SIZE, count_questions, fetch_page, fetch_page_number, filter_signature
+from core.bank_search import search_page
+from core.import_utils import validate_import_errors
+from core.question_store import (
+    build_question_row, import_dataframe, insert_questions, after_questions_committed, after_questions_deleted,
+    delete_matching, delete_questions
+)
 from ui_utils import load_css, render_header
 
 st.set_page_config(page_title="Banco Preguntas | DIAN Sim", page_icon="📂", layout="wide")
@@ -24,16 +29,35 @@ if "bulk_selection" not in st.session_state:
     st.session_state["bulk_selection"] = set()
 if "page_num" not in st.session_state:
     st.session_state["page_num"] = 1
+if "bank_nav" not in st.session_state:
+    # Cursores keyset por página para el filtro actual: {página: cursor de inicio}
+    st.session_state["bank_nav"] = {"signature": None, "cursors": {1: None}}
 
 def reset_selection():
     st.session_state["bulk_selection"] = set()
 
+IMPORT_CHUNK_SIZE = 2000
+
+EXPORT_LABELS = {"xlsx": "Excel (.xlsx)", "csv": "CSV", "parquet": "Parquet"}
+export_formats = [f for f in EXPORT_LABELS if f != "parquet" or parquet_available()]
+
+@st.cache_data(show_spinner="Leyendo y validando archivo...", max_entries=2)
+def read_and_validate_import(file_bytes: bytes, file_name: str):
+    """Lee el archivo una sola vez por contenido y devuelve (df, errores)."""
+    if file_name.endswith('.csv'):
+        df = pd.read_csv(io.BytesIO(file_bytes))
+    else:
+        df = pd.read_excel(io.BytesIO(file_bytes))
+    return df, validate_import_errors(df)
+
 # --- SIDEBAR TOOLS ---
 with st.sidebar:
     st.markdown("### 🛠️ Herramientas Pro")
     if st.button("🗑️ Limpiar Selección"):
         reset_selection()
         st.rerun()
+    st.checkbox("Al borrar, eliminar también sus intentos", key="delete_attempts",
+                help="Si no, el historial de intentos se conserva sin la pregunta.")
     
     st.divider()
     st.caption("Paginación")
@@ -44,6 +68,10 @@ with st.sidebar:
     if cols_page[1].button("Sig. ➡️"):
         st.session_state["page_num"] += 1
         st.rerun()
+    jump_to = st.number_input("Ir a página", min_value=1, value=st.session_state["page_num"], step=1)
+    if st.button("↪️ Ir", use_container_width=True):
+        st.session_state["page_num"] = int(jump_to)
+        st.rerun()
 
 action = st.radio("Acción", ["Explorar / Bulk", "Carga Masiva (Excel/CSV)", "Crear Manualmente"], horizontal=True)
 st.divider()
@@ -67,89 +95,87 @@ if action == "Explorar / Bulk":
             with col_del:
                 if st.button(f"🗑️ Borrar Seleccionados ({len(st.session_state['bulk_selection'])})", type="primary", use_container_width=True):
                     try:
-                        for qid in st.session_state["bulk_selection"]:
-                            q_to_del = db.query(Question).get(qid)
-                            if q_to_del:
-                                db.delete(q_to_del)
+                        result = delete_questions(db, st.session_state["bulk_selection"],
+                                                  delete_attempts=st.session_state["delete_attempts"])
                         db.commit()
+                        after_questions_deleted(result["ids"])
                         reset_selection()
-                        st.success("Preguntas eliminadas masivamente.")
+                        st.success(f"{result['questions']} preguntas eliminadas masivamente.")
                         st.rerun()
                     except Exception as e:
                         db.rollback()
                         st.error(f"Error en borrado masivo: {e}")
             
-            # Export Logic
-            selected_qs = db.query(Question).filter(Question.question_id.in_(list(st.session_state["bulk_selection"]))).all()
-            
-            if selected_qs:
-                # 1. Excel Export
-                export_data = []
-                for q in selected_qs:
-                    opts = q.options_json if q.options_json else {}
-                    export_data.append({
-                        'track': q.track,
-                        'competency': q.competency,
-                        'topic': q.topic,
-                        'difficulty': q.difficulty,
-                        'stem': q.stem,
-                        'options_A': opts.get('A', ''),
-                        'options_B': opts.get('B', ''),
-                        'options_C': opts.get('C', ''),
-                        'options_D': opts.get('D', ''),
-                        'correct_key': q.correct_key,
-                        'rationale': q.rationale
-                    })
-                df_exp = pd.DataFrame(export_data)
-                topo_ex = io.BytesIO()
-                with pd.ExcelWriter(topo_ex, engine='openpyxl') as writer:
-                    df_exp.to_excel(writer, index=False)
-                
-                with col_down_ex:
-                    st.download_button(
-                        "📥 Descargar Excel",
-                        data=topo_ex.getvalue(),
-                        file_name=f"Seleccion_Preguntas_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-                
-                # 2. Text Export
-                lines = ["track|competency|topic|stem|options_A|options_B|options_C|options_D|correct_key|rationale|difficulty"]
-                for d in export_data:
-                    line = "|".join([
-                        str(d['track']), str(d['competency']), str(d['topic']), 
-                        str(d['stem']).replace("\n", " "), 
-                        str(d['options_A']), str(d['options_B']), str(d['options_C']), str(d['options_D']),
-                        str(d['correct_key']), str(d['rationale']).replace("\n", " "), str(d['difficulty'])
-                    ])
-                    lines.append(line)
-                
-                with col_down_txt:
-                    st.download_button(
-                        "📄 Descargar Texto (|)",
-                        data="\n".join(lines),
-                        file_name=f"Seleccion_Preguntas_{datetime.datetime.now().strftime('%Y%m%d_%H%M')}.txt",
-                        mime="text/plain",
-                        use_container_width=True
-                    )
+            # Export Logic: el archivo se genera solo al hacer clic (streaming, sin cargar la selección)
+            selection = sorted(st.session_state["bulk_selection"])
+            stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M')
+            with col_down_ex:
+                export_fmt = st.selectbox("Formato", export_formats, format_func=EXPORT_LABELS.get,
+                                          key="bulk_export_fmt", label_visibility="collapsed")
+                _, ext, mime = EXPORT_FORMATS[export_fmt]
+                st.download_button(
+                    "📥 Descargar",
+                    data=deferred_export(SessionLocal, export_fmt, selection),
+                    file_name=f"Seleccion_Preguntas_{stamp}.{ext}",
+                    mime=mime,
+                    use_container_width=True
+                )
+
+            with col_down_txt:
+                st.download_button(
+                    "📄 Descargar Texto (|)",
+                    data=deferred_export(SessionLocal, "txt", selection),
+                    file_name=f"Seleccion_Preguntas_{stamp}.txt",
+                    mime="text/plain",
+                    use_container_width=True
+                )
+
+    # QUERY + Pagination Logic
+    track_sel = track_f if track_f != "Todos" else None
+    nav = st.session_state["bank_nav"]
+    signature = (search, filter_signature(track_sel, diff_f))
+    if nav["signature"] != signature:
+        # Filtro nuevo: los cursores anteriores no aplican
+        nav["signature"] = signature
+        nav["cursors"] = {1: None}
+        st.session_state["page_num"] = 1
 
-    # QUERY
-    query = db.query(Question)
     if search:
-        query = query.filter(Question.stem.ilike(f"%{search}%") | Question.rationale.ilike(f"%{search}%"))
-    if track_f != "Todos":
-        query = query.filter(Question.track == track_f)
-    if diff_f:
-        query = query.filter(Question.difficulty.in_(diff_f))
-    
-    # Pagination Logic
-    PAGE_SIZE = 20
-    offset = (st.session_state["page_num"] - 1) * PAGE_SIZE
-    total_count = query.count()
-    questions = query.offset(offset).limit(PAGE_SIZE).all()
+        # Índice FTS: insensible a tildes y ordenado por relevancia
+        offset = (st.session_state["page_num"] - 1) * PAGE_SIZE
+        questions, total_count = search_page(db, search, track=track_sel, difficulties=diff_f,
+                                             offset=offset, limit=PAGE_SIZE)
+    else:
+        # Keyset: sin OFFSET ni COUNT por cada rerun
+        total_count = count_questions(db, track_sel, diff_f)
+        last_page = max(1, -(-total_count // PAGE_SIZE))
+        st.session_state["page_num"] = min(st.session_state["page_num"], last_page)
+        page = st.session_state["page_num"]
+        if page in nav["cursors"]:
+            questions, next_cursor = fetch_page(db, track_sel, diff_f, after=nav["cursors"][page], limit=PAGE_SIZE)
+        else:
+            questions, nav["cursors"][page], next_cursor = fetch_page_number(db, page, track_sel, diff_f, limit=PAGE_SIZE)
+        if next_cursor is not None:
+            nav["cursors"][page + 1] = next_cursor
     
     st.info(f"📚 Mostrando **{len(questions)}** de **{total_count}** preguntas (Página {st.session_state['page_num']}).")
+
+    if total_count and (search or track_sel or diff_f):
+        # Borra en el servidor todo lo que coincide, sin pasar los ids por la sesión
+        with st.expander(f"🗑️ Borrar las {total_count} preguntas que coinciden con el filtro"):
+            confirm = st.checkbox("Confirmo que quiero borrar todas las preguntas del filtro actual")
+            if st.button("Borrar coincidencias", type="primary", disabled=not confirm):
+                try:
+                    result = delete_matching(db, track=track_sel, difficulties=diff_f, search=search,
+                                             delete_attempts=st.session_state["delete_attempts"])
+                    db.commit()
+                    after_questions_deleted(result["ids"])
+                    st.session_state["bulk_selection"] -= set(result["ids"])
+                    st.success(f"{result['questions']} preguntas y {result['attempts']} intentos eliminados.")
+                    st.rerun()
+                except Exception as e:
+                    db.rollback()
+                    st.error(f"Error en borrado masivo: {e}")
     
     if not questions:
         st.warning("No hay preguntas que coincidan con la búsqueda.")
@@ -189,8 +215,10 @@ if action == "Explorar / Bulk":
                     
                     st.divider()
                     if st.button("🗑️ Eliminar esta pregunta", key=f"del_single_{q.question_id}", type="secondary"):
-                        db.delete(q)
+                        result = delete_questions(db, [q.question_id],
+                                                  delete_attempts=st.session_state["delete_attempts"])
                         db.commit()
+                        after_questions_deleted(result["ids"])
                         st.rerun()
 
 elif action == "Carga Masiva (Excel/CSV)":
@@ -228,22 +256,14 @@ elif action == "Carga Masiva (Excel/CSV)":
     
     if uploaded:
         try:
-            if uploaded.name.endswith('.csv'):
-                df = pd.read_csv(uploaded)
-            else:
-                df = pd.read_excel(uploaded)
+            df, errors_df = read_and_validate_import(uploaded.getvalue(), uploaded.name)
             
             st.success(f"Archivo leído: {len(df)} filas detectadas.")
             
-            # VALIDATION
-            is_valid, err_list = validate_import_df(df)
-            
-            if not is_valid:
-                st.error("📉 El archivo tiene errores de estructura o datos:")
-                for err in err_list[:15]: # Limit display
-                    st.write(f"- {err}")
-                if len(err_list) > 15:
-                    st.write(f"... y {len(err_list)-15} errores más.")
+            # VALIDATION (vectorizada: un DataFrame con un error por fila/campo)
+            if not errors_df.empty:
+                st.error(f"📉 El archivo tiene {len(errors_df)} errores de estructura o datos:")
+                st.dataframe(errors_df, use_container_width=True, hide_index=True, height=min(400, 40 + 35 * len(errors_df)))
                 st.stop()
             else:
                 st.success("✅ Estructura validada correctamente.")
@@ -251,56 +271,17 @@ elif action == "Carga Masiva (Excel/CSV)":
                     st.dataframe(df.head())
                 
                 if st.button("🚀 Procesar e Importar", type="primary"):
-                    count_ok = 0
-                    count_dupe = 0
-                    
-                    existing_hashes = [q.hash_norm for q in db.query(Question.hash_norm).all()]
+                    progress = st.progress(0, text="Importando...")
                     
-                    progress = st.progress(0)
-                    for index, row in df.iterrows():
-                        progress.progress((index + 1) / len(df))
-                        stem = str(row['stem'])
-                        h = compute_hash(stem)
-                        
-                        if h in existing_hashes:
-                            count_dupe += 1
-                            continue
-                            
-                        ops = {
-                            "A": str(row['options_A']),
-                            "B": str(row['options_B']),
-                            "C": str(row['options_C']),
-                            "D": str(row['options_D'])
-                        }
-                        
-                        # Safe difficulty conversion
-                        raw_diff = row.get('difficulty', 2)
-                        try:
-                            difficulty = int(float(raw_diff)) if not pd.isna(raw_diff) else 2
-                        except (ValueError, TypeError):
-                            difficulty = 2
-                            
-                        q = Question(
-                            question_id=str(uuid.uuid4()),
-                            track=str(row['track']).upper(),
-                            competency=str(row.get('competency', 'General')),
-                            topic=str(row.get('topic', 'General')),
-                            difficulty=difficulty,
-                            stem=stem,
-                            options_json=ops,
-                            correct_key=str(row['correct_key']).strip().upper(),
-                            rationale=str(row.get('rationale', '')),
-                            hash_norm=h
-                        )
-                        db.add(q)
-                        count_ok += 1
-                        existing_hashes.append(h) # Update local cache for batch
+                    def report_progress(done, total):
+                        progress.progress(done / total, text=f"Importando... {done}/{total} filas")
                     
-                    db.commit()
+                    result = import_dataframe(db, df, chunk_size=IMPORT_CHUNK_SIZE, progress_cb=report_progress)
                     st.balloons()
-                    st.success(f"¡Importación Finalizada! Nuevas: {count_ok} | Duplicadas omitidas: {count_dupe}")
+                    st.success(f"¡Importación Finalizada! Nuevas: {result['inserted']} | Duplicadas omitidas: {result['duplicates']} | Tiempo: {result['elapsed_s']:.1f} s")
 
         except Exception as e:
+            db.rollback()
             st.error(f"Error procesando el archivo: {e}")
 
 elif action == "Crear Manualmente":
@@ -331,24 +312,22 @@ elif action == "Crear Manualmente":
             rationale = st.text_area("Justificación / Explicación")
         
         if st.form_submit_button("Guardar Pregunta", type="primary"):
-            h = compute_hash(stem)
-            if db.query(Question).filter_by(hash_norm=h).first():
+            row = build_question_row({
+                "track": track,
+                "competency": "Manual",
+                "topic": topic,
+                "stem": stem,
+                "difficulty": difficulty,
+                "options_json": {"A": op_a, "B": op_b, "C": op_c, "D": op_d},
+                "correct_key": correct,
+                "rationale": rationale,
+            })
+            saved = insert_questions(db, [row])
+            if not saved:
                 st.error("¡Pregunta idéntica ya existe!")
             else:
-                q = Question(
-                    question_id=str(uuid.uuid4()),
-                    track=track,
-                    competency="Manual",
-                    topic=topic,
-                    stem=stem,
-                    difficulty=difficulty,
-                    options_json={"A": op_a, "B": op_b, "C": op_c, "D": op_d},
-                    correct_key=correct,
-                    rationale=rationale,
-                    hash_norm=h
-                )
-                db.add(q)
                 db.commit()
+                after_questions_committed(saved)
                 st.success("Pregunta guardada exitosamente.")
 
 db.close()
@@ -4,22 +4,28 @@ import os, sys
 # Add root to python path to import modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from db.session import SessionLocal
-from db.models import Skill, Attempt, Achievement, UserStats
-from ui_utils import load_css, render_header
-import datetime, io
+from db.models import Skill, UserStats
+from core.achievements import unlocked_rules
+from core.analytics import load_daily_accuracy, load_skill_rollup
+from core.bank_pages import count_questions
+from core.export import FORMATS as EXPORT_FORMATS, deferred_export, parquet_available
+from core.gamification import get_user_stats
+from ui_utils import current_user_id, load_css, render_header, render_user_selector
+import datetime
 
 st.set_page_config(page_title="Dashboard | DIAN Sim", page_icon="📊", layout="wide")
 load_css()
 render_header(title="Panel de Control", subtitle="Analítica de progreso y gamificación")
+render_user_selector()
+user_id = current_user_id()
 
 db = SessionLocal()
 
 # 1. User Stats (Sidebar/Top)
-stats = db.query(UserStats).first()
+stats = get_user_stats(db, user_id)
 if not stats:
     stats = UserStats(current_streak=0, max_streak=0, total_points=0)
 
@@ -36,17 +42,11 @@ st.divider()
 # 2. Mapa de Calor / Progreso por Eje
 st.markdown('<div class="dian-card">', unsafe_allow_html=True)
 st.subheader("🎯 Nivel de Dominio por Eje (Metodología CNSC)")
-skills = db.query(Skill).all()
-if skills:
-    df_skills = pd.DataFrame([{
-        'Eje': s.track,
-        'Macro-Dominio': s.macro_dominio if hasattr(s, 'macro_dominio') and s.macro_dominio else "Transversal",
-        'Micro-Competencia': s.micro_competencia if hasattr(s, 'micro_competencia') and s.micro_competencia else s.topic,
-        'Dominio': s.mastery_score
-    } for s in skills])
-    
+# Agregados mantenidos por finalize_exam (core.analytics): costo constante
+df_skills = load_skill_rollup(db, user_id)
+if not df_skills.empty:
     fig = px.sunburst(df_skills, path=['Eje', 'Macro-Dominio', 'Micro-Competencia'], values='Dominio',
-                  color='Dominio', color_continuous_scale='RdYlGn',
+                  color='Promedio', color_continuous_scale='RdYlGn',
                   range_color=[0, 100])
     fig.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
     st.plotly_chart(fig, use_container_width=True)
@@ -56,19 +56,9 @@ st.markdown('</div>', unsafe_allow_html=True)
 
 # 3. Rendimiento en el Tiempo
 st.markdown('<div class="dian-card">', unsafe_allow_html=True)
-st.subheader("📈 Rendimiento de los últimos intentos")
-attempts = db.query(Attempt).order_by(Attempt.created_at.desc()).limit(50).all()
-if attempts:
-    df_att = pd.DataFrame([{
-        'Fecha': a.created_at,
-        'Resultado': 1 if a.is_correct else 0
-    } for a in attempts])
-    
-    # Agrupar por fecha
-    df_att['Fecha'] = df_att['Fecha'].dt.date
-    df_daily = df_att.groupby('Fecha').agg({'Resultado': 'mean'}).reset_index()
-    df_daily['Porcentaje'] = df_daily['Resultado'] * 100
-    
+st.subheader("📈 Rendimiento histórico")
+df_daily = load_daily_accuracy(db, user_id)
+if not df_daily.empty:
     fig_line = px.line(df_daily, x='Fecha', y='Porcentaje', title="Precisión Diaria (%)",
                        markers=True, line_shape='spline')
     fig_line.update_yaxes(range=[0, 105])
@@ -81,8 +71,9 @@ col_d1, col_d2 = st.columns(2)
 
 with col_d1:
     st.subheader("🛡️ Radar de Macro-Dominios")
-    if skills:
-        avg_competencies = df_skills.groupby('Macro-Dominio')['Dominio'].mean().reset_index()
+    if not df_skills.empty:
+        avg_competencies = df_skills.groupby('Macro-Dominio')[['Dominio', 'Habilidades']].sum().reset_index()
+        avg_competencies['Dominio'] = avg_competencies['Dominio'] / avg_competencies['Habilidades']
         fig_radar = go.Figure()
         # Actual Mastery
         fig_radar.add_trace(go.Scatterpolar(
@@ -114,8 +105,8 @@ with col_d1:
 
 with col_d2:
     st.subheader("⚠️ Habilidades a Reforzar")
-    if skills:
-        top_weak = db.query(Skill).order_by(Skill.mastery_score.asc()).limit(5).all()
+    if not df_skills.empty:
+        top_weak = db.query(Skill).filter(Skill.user_id == user_id).order_by(Skill.mastery_score.asc()).limit(5).all()
         for s in top_weak:
             color = "red" if s.mastery_score < 40 else "orange"
             st.markdown(f"""
@@ -131,7 +122,8 @@ with col_d2:
 st.markdown('<div class="dian-card">', unsafe_allow_html=True)
 st.subheader("🏆 Tu Vitrina de Trofeos")
 
-achievements = db.query(Achievement).all()
+# El bitset de user_stats dice qué logros hay; no hace falta leer la tabla achievements
+achievements = unlocked_rules(stats.achievements_mask)
 if achievements:
     cols = st.columns(4)
     for i, ach in enumerate(achievements):
@@ -151,56 +143,23 @@ st.markdown('</div>', unsafe_allow_html=True)
 st.divider()
 st.subheader("🛠️ Herramientas de Exportación")
 
-from db.models import Question
-all_qs = db.query(Question).all()
+bank_size = count_questions(db)
 
-if all_qs:
-    export_data = []
-    text_lines = []
-    
-    # Header for text version
-    text_lines.append("track|competency|topic|stem|options_A|options_B|options_C|options_D|correct_key|rationale|difficulty")
-    
-    for q in all_qs:
-        opts = q.options_json if q.options_json else {}
-        
-        # Data for Excel
-        row = {
-            'track': q.track,
-            'competency': q.competency,
-            'topic': q.topic,
-            'difficulty': q.difficulty,
-            'stem': q.stem,
-            'options_A': opts.get('A', ''),
-            'options_B': opts.get('B', ''),
-            'options_C': opts.get('C', ''),
-            'options_D': opts.get('D', ''),
-            'correct_key': q.correct_key,
-            'rationale': q.rationale
-        }
-        export_data.append(row)
-        
-        # Data for Text Format (Pipes)
-        clean_stem = str(q.stem).replace("\n", " ").replace("|", " ")
-        clean_rat = str(q.rationale).replace("\n", " ").replace("|", " ")
-        text_row = f"{q.track}|{q.competency}|{q.topic}|{clean_stem}|{opts.get('A','')}|{opts.get('B','')}|{opts.get('C','')}|{opts.get('D','')}|{q.correct_key}|{clean_rat}|{q.difficulty}"
-        text_lines.append(text_row)
-    
-    df_export = pd.DataFrame(export_data)
-    text_content = "\n".join(text_lines)
-    
+if bank_size:
+    # Streaming: el archivo se arma al hacer clic, fila a fila, sin cargar el banco en memoria
+    stamp = datetime.datetime.now().strftime('%Y%m%d')
     col_exp1, col_exp2 = st.columns(2)
     
     with col_exp1:
-        output_xlsx = io.BytesIO()
-        with pd.ExcelWriter(output_xlsx, engine='openpyxl') as writer:
-            df_export.to_excel(writer, index=False, sheet_name='Banco_Preguntas')
-        
+        full_formats = ["xlsx", "csv"] + (["parquet"] if parquet_available() else [])
+        export_fmt = st.radio("Formato", full_formats, horizontal=True, key="full_export_fmt",
+                              format_func={"xlsx": "Excel (.xlsx)", "csv": "CSV", "parquet": "Parquet"}.get)
+        _, ext, mime = EXPORT_FORMATS[export_fmt]
         st.download_button(
-            label="📥 Descargar Banco (Excel .xlsx)",
-            data=output_xlsx.getvalue(),
-            file_name=f"Banco_Preguntas_DIAN_{datetime.datetime.now().strftime('%Y%m%d')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            label=f"📥 Descargar Banco ({bank_size} preguntas)",
+            data=deferred_export(SessionLocal, export_fmt),
+            file_name=f"Banco_Preguntas_DIAN_{stamp}.{ext}",
+            mime=mime,
             use_container_width=True
         )
         st.caption("Ideal para respaldo completo y edición profesional.")
@@ -208,8 +167,8 @@ if all_qs:
     with col_exp2:
         st.download_button(
             label="📄 Descargar Banco (Texto/Pipes)",
-            data=text_content,
-            file_name=f"Banco_Preguntas_Texto_{datetime.datetime.now().strftime('%Y%m%d')}.txt",
+            data=deferred_export(SessionLocal, "txt"),
+            file_name=f"Banco_Preguntas_Texto_{stamp}.txt",
             mime="text/plain",
             use_container_width=True
         )
@@ -223,7 +182,9 @@ st.subheader("⚙️ Otras Acciones")
 if st.button("🗑️ Reiniciar Estadísticas de Usuario", use_container_width=True):
     st.error("¿Estás seguro de reiniciar tus puntos y rachas?")
     if st.button("Sí, deseo reiniciar todo"):
-         db.query(UserStats).delete()
+         # Los logros (achievements_mask) se conservan
+         db.query(UserStats).filter(UserStats.user_id == user_id).update(
+             {UserStats.current_streak: 0, UserStats.max_streak: 0, UserStats.total_points: 0})
          db.commit()
          st.success("Estadísticas reiniciadas.")
          st.rerun()
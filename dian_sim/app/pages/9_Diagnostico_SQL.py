@@ -0,0 +1,67 @@
+import streamlit as st
+import os, sys
+import datetime
+
+# Add root to python path to import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import pandas as pd
+import db.session  # noqa: F401  (instala el perfilador sobre el engine si está activo)
+from db.profiler import ENABLE_ENV, EXPLAIN_ENV, N_PLUS_ONE_MIN, get_profiler
+from ui_utils import load_css, render_header
+
+# Página oculta del menú (styles.css): se abre en /Diagnostico_SQL
+st.set_page_config(page_title="Diagnóstico SQL | DIAN Sim", page_icon="🔬", layout="wide")
+load_css()
+render_header(title="Diagnóstico SQL", subtitle="Consultas por página: huella, tiempos, filas y planes")
+
+profiler = get_profiler()
+if profiler is None:
+    st.info(f"El perfilador está desactivado. Inicia la app con `{ENABLE_ENV}=1` "
+            f"(opcional: `{EXPLAIN_ENV}=50` para capturar EXPLAIN desde 50 ms) y navega por las páginas.")
+    st.stop()
+
+pages = profiler.pages()
+page = st.selectbox("Página", [None] + pages, format_func=lambda p: "Todas" if p is None else p)
+report = profiler.report(page)
+
+if not report:
+    st.info("Aún no hay consultas registradas. Navega por la app y vuelve a esta página.")
+    st.stop()
+
+n_plus_one = [r for r in report if r["n_plus_one"]]
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Sentencias", sum(r["count"] for r in report))
+col2.metric("Tiempo total", f"{sum(r['total_ms'] for r in report):.0f} ms")
+col3.metric("Más lenta", f"{max(r['max_ms'] for r in report):.1f} ms")
+col4.metric("Posibles N+1", len(n_plus_one))
+
+if n_plus_one:
+    st.warning(f"⚠️ Huellas repetidas {N_PLUS_ONE_MIN}+ veces en un mismo rerun (consulta por fila en un bucle):")
+    for r in n_plus_one:
+        st.markdown(f"- **{r['page']}** · {r['max_per_run']}× por rerun · `{r['fingerprint'][:160]}`")
+
+df = pd.DataFrame(report, columns=["page", "count", "total_ms", "avg_ms", "max_ms", "rows", "max_per_run",
+                                   "n_plus_one", "fingerprint"])
+st.dataframe(df.rename(columns={"page": "Página", "count": "Veces", "total_ms": "Total ms", "avg_ms": "Prom. ms",
+                                "max_ms": "Máx. ms", "rows": "Filas", "max_per_run": "Máx./rerun",
+                                "n_plus_one": "N+1", "fingerprint": "Huella"}),
+             use_container_width=True, hide_index=True)
+
+slow = [r for r in report if r["explain"]]
+if slow:
+    st.subheader(f"🐢 Planes de las consultas lentas (≥ {profiler.explain_ms:.0f} ms)")
+    for r in slow:
+        with st.expander(f"{r['max_ms']:.1f} ms · {r['page']} · {r['fingerprint'][:90]}"):
+            st.code(r["statement"], language="sql")
+            st.code(r["explain"], language="text")
+
+col_a, col_b = st.columns(2)
+with col_a:
+    st.download_button("📥 Descargar JSON", data=profiler.to_json, use_container_width=True,
+                       file_name=f"sql_profile_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                       mime="application/json")
+with col_b:
+    if st.button("🧹 Reiniciar mediciones", use_container_width=True):
+        profiler.reset()
+        st.rerun()
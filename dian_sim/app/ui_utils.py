@@ -1,6 +1,11 @@
 import streamlit as st
 import os
 
+from db.models import DEFAULT_USER_ID
+
+# Despliegues de un solo candidato pueden fijarlo por entorno
+USER_ENV = "DIAN_USER_ID"
+
 def load_css():
     """Inyecta el CSS personalizado en la aplicación."""
     # Build absolute path to styles.css assuming it's in the same directory as this file (app/)
@@ -57,3 +62,15 @@ def metric_card(label: str, value: str, sublabel: str = ""):
         <div style="font-size: 0.8rem; font-weight: 600; color: var(--text-muted); text-transform: uppercase;">{sublabel}</div>
     </div>
     """, unsafe_allow_html=True)
+
+def current_user_id() -> str:
+    """Candidato activo: el elegido en la barra lateral, si no DIAN_USER_ID, si no el usuario por defecto."""
+    return st.session_state.get("user_id") or os.environ.get(USER_ENV) or DEFAULT_USER_ID
+
+def render_user_selector():
+    """Campo de candidato en la barra lateral. El valor vive en session_state["user_id"] y se conserva entre páginas."""
+    def _apply():
+        st.session_state["user_id"] = st.session_state["_user_id_input"].strip() or None
+
+    st.sidebar.text_input("👤 Candidato", value=current_user_id(), key="_user_id_input", on_change=_apply,
+                          help="Identificador del candidato: puntos, rachas, habilidades e historial son de cada uno.")
@@ -0,0 +1,66 @@
+"""
+Benchmark: find_duplicates lineal (rapidfuzz sobre todo el banco) vs índice MinHash/LSH.
+
+Uso:
+    python benchmarks/bench_dedupe.py --size 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.dedupe import find_duplicates
+from core.dedupe_index import DedupeIndex
+from core.generators.templates import CONCEPTS, TOPICS
+
+VOCAB = sorted({w for topics in TOPICS.values() for t in topics for w in t.split()} |
+               {w for concepts in CONCEPTS.values() for c in concepts for w in c.split()} |
+               set("el la los contribuyente funcionario debe presentar declaracion plazo sancion norma articulo "
+                   "procedimiento ciudadano solicitud recurso acto administrativo notificacion dias habiles".split()))
+
+
+def synthetic_stems(size: int, seed: int = 3):
+    rng = random.Random(seed)
+    return [f"SITUACIÓN: {' '.join(rng.choice(VOCAB) for _ in range(rng.randint(25, 70)))}. "
+            f"PREGUNTA: ¿Qué debe hacer el funcionario en el caso {i}?" for i in range(size)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--linear-queries", type=int, default=3, help="Consultas para la versión lineal (lenta)")
+    args = parser.parse_args()
+
+    stems = synthetic_stems(args.size)
+    probes = [stems[i].upper().replace("PLAZO", "TERMINO") for i in range(0, args.size, max(1, args.size // args.queries))][:args.queries]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DedupeIndex(os.path.join(tmp, "bench_dedupe.db"))
+        t0 = time.perf_counter()
+        for i in range(0, args.size, 5000):
+            index.add_many((f"q{j}", stems[j]) for j in range(i, min(i + 5000, args.size)))
+        build_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        hits = sum(1 for p in probes if index.find_duplicates(p))
+        lsh_ms = (time.perf_counter() - t0) / len(probes) * 1000
+        index.close()
+
+    t0 = time.perf_counter()
+    for p in probes[:args.linear_queries]:
+        find_duplicates(p, stems)
+    linear_ms = (time.perf_counter() - t0) / max(1, min(args.linear_queries, len(probes))) * 1000
+
+    print(f"Banco: {args.size} enunciados | construcción índice: {build_s:.1f} s")
+    print(f"find_duplicates lineal: {linear_ms:.1f} ms/consulta")
+    print(f"Índice LSH:             {lsh_ms:.2f} ms/consulta (recall {hits}/{len(probes)})")
+
+
+if __name__ == "__main__":
+    main()
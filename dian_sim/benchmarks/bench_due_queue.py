@@ -0,0 +1,78 @@
+"""
+Benchmark: armar una sesión de repaso.
+
+- escaneo:  recorrer todas las preguntas con su review_state y ordenar por due_at
+            (lo que costaría sin índice).
+- cola:     due_question_ids sobre el índice (user_id, due_at, question_id), O(k log n).
+
+Uso:
+    python benchmarks/bench_due_queue.py --size 100000 --k 20
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.scheduler import due_question_ids, next_review
+from db.models import Base, Question, ReviewState
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'preguntas':>9} | {'escaneo (ms)':>12} | {'cola (ms)':>9} | {'pendientes':>10}")
+    print("-" * 51)
+    for size in args.size:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench_due.db')}")
+            Base.metadata.create_all(engine)
+            db = sessionmaker(bind=engine)()
+            now = datetime.datetime(2026, 3, 1)
+            for start in range(0, size, 10_000):
+                ids = range(start, min(start + 10_000, size))
+                db.execute(Question.__table__.insert(), [{
+                    "question_id": f"q{i:07d}", "track": "FUNCIONAL", "competency": "General", "topic": "General",
+                    "difficulty": 2, "stem": f"Pregunta {i}", "options_json": {"A": "a"}, "hash_norm": f"h{i}",
+                } for i in ids])
+                # Revisadas en los últimos 30 días: ~1/3 fallos (vencen pronto), el resto aciertos
+                reviews = [(f"q{i:07d}", next_review(None, i % 3 != 0, now - datetime.timedelta(hours=i % 720)))
+                           for i in ids]
+                db.execute(ReviewState.__table__.insert(), [
+                    {"question_id": qid, **r._asdict()} for qid, r in reviews])
+            db.commit()
+
+            def scan():
+                rows = db.execute(select(ReviewState.question_id, ReviewState.due_at)).all()
+                return [qid for qid, due in sorted(rows, key=lambda r: r[1]) if due <= now][:args.k]
+
+            scan_ms = timed(scan, args.repeat)
+            queue_ms = timed(lambda: due_question_ids(db, args.k, now), args.repeat)
+            assert scan() == due_question_ids(db, args.k, now)
+            n_due = db.query(ReviewState).filter(ReviewState.due_at <= now).count()
+            print(f"{size:>9} | {scan_ms:>12.1f} | {queue_ms:>9.2f} | {n_due:>10}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
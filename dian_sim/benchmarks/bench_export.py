@@ -0,0 +1,95 @@
+"""
+Benchmark: exportación del banco. Anterior (ORM .all() -> lista de dicts -> DataFrame ->
+ExcelWriter en BytesIO) vs streaming (yield_per + openpyxl write-only / CSV / Parquet).
+
+Mide tiempo y pico de memoria Python (tracemalloc) para cada tamaño de banco.
+
+Uso:
+    python benchmarks/bench_export.py --sizes 10000 100000 --formats xlsx csv parquet
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.export import EXPORT_COLUMNS, export_questions, parquet_available
+from db.models import Base, Question
+
+
+def legacy_xlsx(db) -> int:
+    rows = []
+    for q in db.query(Question).all():
+        opts = q.options_json or {}
+        rows.append({"track": q.track, "competency": q.competency, "topic": q.topic, "difficulty": q.difficulty,
+                     "stem": q.stem, **{f"options_{k}": opts.get(k, "") for k in "ABCD"},
+                     "correct_key": q.correct_key, "rationale": q.rationale})
+    out = io.BytesIO()
+    with pd.ExcelWriter(out, engine="openpyxl") as writer:
+        pd.DataFrame(rows, columns=EXPORT_COLUMNS).to_excel(writer, index=False)
+    return len(out.getvalue())
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2**20, size / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", default=["xlsx", "csv", "parquet"])
+    parser.add_argument("--skip-legacy", action="store_true", help="El método anterior es muy lento con 100k+")
+    args = parser.parse_args()
+    formats = [f for f in args.formats if f != "parquet" or parquet_available()]
+
+    print(f"{'banco':>8} | {'método':>17} | {'tiempo ms':>10} | {'pico MB':>8} | {'archivo MB':>10}")
+    print("-" * 67)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, f'bench_export_{size}.db')}")
+            Base.metadata.create_all(engine)
+            db = sessionmaker(bind=engine)()
+            for start in range(0, size, 10_000):
+                db.execute(Question.__table__.insert(), [{
+                    "question_id": f"q{i:07d}", "track": ("FUNCIONAL", "COMPORTAMENTAL", "INTEGRIDAD")[i % 3],
+                    "competency": "General", "topic": "General", "difficulty": 1 + i % 3,
+                    "stem": f"SITUACIÓN: caso sintético número {i}. " * 8,
+                    "options_json": {"A": "opción a", "B": "opción b", "C": "opción c", "D": "opción d"},
+                    "correct_key": "A", "rationale": "Justificación del caso. " * 4, "hash_norm": f"h{i}",
+                } for i in range(start, min(start + 10_000, size))])
+            db.commit()
+
+            if not args.skip_legacy:
+                ms, peak, mb = measure(lambda: legacy_xlsx(db))
+                print(f"{size:>8} | {'anterior xlsx':>17} | {ms:>10.0f} | {peak:>8.1f} | {mb:>10.1f}")
+                db.expunge_all()
+            for fmt in formats:
+                path = os.path.join(tmp, f"out.{fmt}")
+
+                def run():
+                    with open(path, "wb") as f:
+                        export_questions(db, fmt, dest=f)
+                    return os.path.getsize(path)
+                ms, peak, mb = measure(run)
+                print(f"{size:>8} | {'streaming ' + fmt:>17} | {ms:>10.0f} | {peak:>8.1f} | {mb:>10.1f}")
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
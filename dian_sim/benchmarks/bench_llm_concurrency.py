@@ -0,0 +1,45 @@
+"""
+Benchmark: generación secuencial vs concurrente con el proveedor falso (offline).
+
+Uso:
+    python benchmarks/bench_llm_concurrency.py --count 100 --latency 0.5 --workers 1 4 8
+    python benchmarks/bench_llm_concurrency.py --rate 2 --burst 2   # simular un límite estricto
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.generators.fake import FakeLLMBackend
+from core.generators.llm import LLMGenerator
+from core.generators.rate_limit import TokenBucket
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100, help="Preguntas a generar")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latencia simulada por lote (s)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rate", type=float, default=50.0, help="Solicitudes por segundo del token bucket")
+    parser.add_argument("--burst", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} | {'tiempo (s)':>10} | {'preguntas':>9} | {'preg/s':>8} | {'máx en vuelo':>12}")
+    print("-" * 58)
+    for workers in args.workers:
+        gen = LLMGenerator("fake", "")
+        gen.fake_backend = FakeLLMBackend(latency_s=args.latency)
+        gen.limiter = TokenBucket(args.rate, args.burst)
+
+        t0 = time.perf_counter()
+        results = gen.generate_from_text("Texto de prueba", args.count, concurrency=workers)
+        elapsed = time.perf_counter() - t0
+        print(f"{workers:>7} | {elapsed:>10.2f} | {len(results):>9} | {len(results) / elapsed:>8.1f} | "
+              f"{gen.fake_backend.max_in_flight:>12}")
+
+
+if __name__ == "__main__":
+    main()
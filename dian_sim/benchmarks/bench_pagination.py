@@ -0,0 +1,78 @@
+"""
+Benchmark: paginación OFFSET + COUNT (anterior) vs keyset + conteo cacheado.
+
+Uso:
+    python benchmarks/bench_pagination.py --size 100000 --pages 1 100 1000 4999
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core import bank_pages
+from db.models import Base, Question
+
+PAGE_SIZE = 20
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 4999])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench_pages.db')}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        base = datetime.datetime(2026, 1, 1)
+        for start in range(0, args.size, 10_000):
+            db.execute(Question.__table__.insert(), [{
+                "question_id": f"q{i:07d}", "track": ("FUNCIONAL", "COMPORTAMENTAL", "INTEGRIDAD")[i % 3],
+                "competency": "General", "topic": "General", "difficulty": 1 + i % 3,
+                "stem": f"SITUACIÓN: caso sintético número {i}. " * 8, "options_json": {"A": "a", "B": "b", "C": "c"},
+                "hash_norm": f"h{i}", "created_at": base + datetime.timedelta(seconds=i // 50),
+            } for i in range(start, min(start + 10_000, args.size))])
+        db.commit()
+
+        t0 = time.perf_counter()
+        bank_pages.page_boundaries(db)
+        bounds_ms = (time.perf_counter() - t0) * 1000
+        print(f"Banco: {args.size} preguntas | índice de páginas (una vez por versión): {bounds_ms:.1f} ms\n")
+
+        print(f"{'página':>7} | {'OFFSET+COUNT (ms)':>17} | {'keyset sig. (ms)':>16} | {'salto (ms)':>10} | {'conteo cache (ms)':>17}")
+        print("-" * 81)
+        for page in args.pages:
+            def legacy():
+                query = db.query(Question)
+                return query.count(), query.offset((page - 1) * PAGE_SIZE).limit(PAGE_SIZE).all()
+
+            _, start, _ = bank_pages.fetch_page_number(db, page)
+            legacy_ms = timed(legacy, args.repeat)
+            next_ms = timed(lambda: bank_pages.fetch_page(db, after=start), args.repeat)
+            jump_ms = timed(lambda: bank_pages.fetch_page_number(db, page), args.repeat)
+            count_ms = timed(lambda: bank_pages.count_questions(db), args.repeat)
+            print(f"{page:>7} | {legacy_ms:>17.2f} | {next_ms:>16.2f} | {jump_ms:>10.2f} | {count_ms:>17.3f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: extracción de texto de un PDF largo.
+
+- serial:   pypdf página por página en el hilo de Streamlit (comportamiento anterior).
+- paralelo: core.pdf_extract con pool de procesos, caché fría.
+- caché:    mismo archivo de nuevo (sha256 ya extraído).
+- rango:    solo --range páginas, caché fría.
+
+Uso:
+    python benchmarks/bench_pdf_extract.py --pages 300 --workers 1 2 4
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pypdf
+from fpdf import FPDF
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.pdf_extract import PdfTextCache, extract_text, parse_page_range
+
+PARAGRAPH = ("ARTICULO {n}. Los contribuyentes declarantes deberan presentar la declaracion dentro de los plazos "
+             "que senale el Gobierno Nacional. La omision dara lugar a la sancion por extemporaneidad. ")
+
+
+def synthetic_pdf(n_pages: int) -> bytes:
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=9)
+    for i in range(n_pages):
+        pdf.add_page()
+        pdf.multi_cell(0, 4, PARAGRAPH.format(n=i + 1) * 12)
+    return bytes(pdf.output())
+
+
+def serial(data: bytes) -> str:
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return "\n".join(page.extract_text() for page in reader.pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--range", default="100-120")
+    args = parser.parse_args()
+
+    data = synthetic_pdf(args.pages)
+    print(f"PDF sintético: {args.pages} páginas, {len(data) / 1024:.0f} KB | CPUs: {os.cpu_count()}\n")
+
+    t0 = time.perf_counter()
+    serial(data)
+    print(f"{'serial (anterior)':>22}: {(time.perf_counter() - t0) * 1000:8.0f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            cache = PdfTextCache(os.path.join(tmp, f"pdf_{workers}.db"))
+            t0 = time.perf_counter()
+            extract_text(data, cache=cache, workers=workers)
+            cold = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            extract_text(data, cache=cache, workers=workers)
+            warm = time.perf_counter() - t0
+            print(f"{f'paralelo x{workers}':>22}: {cold * 1000:8.0f} ms | caché: {warm * 1000:6.1f} ms")
+            cache.close()
+
+        cache = PdfTextCache(os.path.join(tmp, "pdf_range.db"))
+        pages = parse_page_range(args.range, args.pages)
+        t0 = time.perf_counter()
+        extract_text(data, pages, cache=cache)
+        print(f"{f'rango {args.range}':>22}: {(time.perf_counter() - t0) * 1000:8.0f} ms ({len(pages)} páginas)")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
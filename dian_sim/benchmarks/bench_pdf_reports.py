@@ -0,0 +1,95 @@
+"""
+Benchmark: motor de reportes PDF.
+
+- reporte grande: un simulacro de --questions preguntas, motor anterior vs actual.
+  El anterior cargaba el logo desde disco en cada página y copiaba el documento a un BytesIO.
+- lote: --reports reportes de 20 preguntas, en serie con el motor anterior vs generate_reports_batch.
+
+Uso:
+    python benchmarks/bench_pdf_reports.py --questions 200 --reports 500 --workers 1 4
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+from fpdf import FPDF
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core import pdf_utils
+from core.pdf_utils import DIANSimPDF, generate_exam_pdf, generate_reports_batch
+
+
+class LegacyPDF(DIANSimPDF):
+    """Réplica del header anterior: os.path.exists + image(ruta) en cada página, sin recurso precargado."""
+
+    def __init__(self, *args, **kwargs):
+        FPDF.__init__(self, *args, **kwargs)
+        self.generated_at = "2026-01-01 00:00"
+        self.has_logo = False
+
+    def header(self):
+        if os.path.exists(pdf_utils.LOGO_PATH):
+            self.image(pdf_utils.LOGO_PATH, 10, 8, 50)
+        DIANSimPDF.header(self)
+
+
+def legacy_report(results, details):
+    original = pdf_utils.DIANSimPDF
+    pdf_utils.DIANSimPDF = LegacyPDF
+    try:
+        buf = generate_exam_pdf(results, details)
+        return io.BytesIO(bytes(buf.getvalue()))  # copia extra del motor anterior
+    finally:
+        pdf_utils.DIANSimPDF = original
+
+
+def synthetic_session(n: int):
+    details = [{
+        "stem": f"SITUACIÓN: un contribuyente presenta la declaración {i} fuera de plazo. PREGUNTA: ¿qué procede?",
+        "user_ans": "A" if i % 3 else "B", "correct_key": "A",
+        "rationale": "Artículo 641 del Estatuto Tributario: sanción por extemporaneidad. " * 3,
+    } for i in range(n)]
+    correct = sum(d["user_ans"] == d["correct_key"] for d in details)
+    return {"total": n, "correct": correct, "score": correct * 100 / n}, details
+
+
+def timed(fn, repeat: int = 1) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--reports", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results, details = synthetic_session(args.questions)
+    pages = len(__import__("pypdf").PdfReader(generate_exam_pdf(results, details)).pages)
+    print(f"Reporte de {args.questions} preguntas ({pages} páginas) | CPUs: {os.cpu_count()}")
+    print(f"  anterior: {timed(lambda: legacy_report(results, details), args.repeat):8.1f} ms")
+    print(f"  actual:   {timed(lambda: generate_exam_pdf(results, details), args.repeat):8.1f} ms\n")
+
+    small = synthetic_session(20)
+    jobs = [(small[0], small[1], f"r{i:04d}.pdf") for i in range(args.reports)]
+    print(f"Lote de {args.reports} reportes de 20 preguntas")
+    print(f"  anterior (serie): {timed(lambda: [legacy_report(*small) for _ in jobs]) / 1000:6.2f} s")
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            ms = timed(lambda: generate_reports_batch(jobs, tmp, workers=workers))
+        print(f"  lote x{workers}:          {ms / 1000:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
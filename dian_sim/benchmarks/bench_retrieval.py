@@ -0,0 +1,62 @@
+"""
+Benchmark: contexto por lote del generador IA.
+
+- anterior: todos los lotes reciben text[:10000].
+- BM25:     plan_batch_contexts (fragmentos distintos por lote dentro del presupuesto).
+
+Reporta caracteres enviados, artículos cubiertos y tiempo de planificación.
+
+Uso:
+    python benchmarks/bench_retrieval.py --articles 900 --questions 20 50
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.generators.retrieval import DEFAULT_CONTEXT_TOKENS, plan_batch_contexts
+
+TOPICS = ["sanción por extemporaneidad", "régimen simple", "devolución de saldos", "zonas francas",
+          "facturación electrónica", "cobro coactivo", "retención en la fuente", "impuesto al patrimonio"]
+
+
+def synthetic_statute(n_articles: int) -> str:
+    return "\n".join(
+        f"ARTÍCULO {i + 1}. Sobre {TOPICS[i % len(TOPICS)]}. "
+        + f"El contribuyente obligado en materia de {TOPICS[i % len(TOPICS)]} deberá cumplir el inciso {i}. " * 6
+        for i in range(n_articles)
+    )
+
+
+def covered(contexts) -> int:
+    return len({m for c in contexts for m in re.findall(r"ARTÍCULO (\d+)\.", c)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=900)
+    parser.add_argument("--questions", type=int, nargs="+", default=[5, 20, 50])
+    parser.add_argument("--context-tokens", type=int, default=DEFAULT_CONTEXT_TOKENS)
+    args = parser.parse_args()
+
+    text = synthetic_statute(args.articles)
+    print(f"Documento: {len(text)} caracteres, {args.articles} artículos\n")
+    print(f"{'preguntas':>9} | {'lotes':>5} | {'chars anterior':>14} | {'arts. anterior':>14} | "
+          f"{'chars BM25':>10} | {'arts. BM25':>10} | {'plan (ms)':>9}")
+    print("-" * 92)
+    for count in args.questions:
+        n_batches = -(-count // 5)
+        legacy = [text[:10000]] * n_batches
+        t0 = time.perf_counter()
+        contexts = plan_batch_contexts(text, n_batches, args.context_tokens)
+        plan_ms = (time.perf_counter() - t0) * 1000
+        print(f"{count:>9} | {n_batches:>5} | {sum(map(len, legacy)):>14} | {covered(legacy):>14} | "
+              f"{sum(map(len, contexts)):>10} | {covered(contexts):>10} | {plan_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: búsqueda del explorador del banco, ILIKE '%term%' vs índice FTS5.
+Mide lo mismo que hace la página: total + primera página de 20.
+
+Uso:
+    python benchmarks/bench_search.py --size 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.bench_dedupe import synthetic_stems
+from core.bank_search import ensure_search_index, search_page
+from core.question_store import build_question_row, insert_questions
+from db.models import Base, Question
+
+TERMS = ["sanción", "notificacion habiles", "recurso acto", "declaracion plazo contribuyente", "caso 4242"]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench_search.db')}")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            ensure_search_index(conn)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+
+        t0 = time.perf_counter()
+        rows = [build_question_row({
+            "track": "FUNCIONAL", "competency": "General", "topic": "General", "difficulty": 2,
+            "stem": stem, "options_json": {"A": "a", "B": "b", "C": "c"}, "correct_key": "A",
+            "rationale": "Artículo 565 del Estatuto Tributario.",
+        }) for stem in synthetic_stems(args.size)]
+        insert_questions(db, rows, chunk_size=5000)
+        db.commit()
+        print(f"Banco: {args.size} preguntas | carga + índice FTS: {time.perf_counter() - t0:.1f} s\n")
+
+        print(f"{'término':>32} | {'ILIKE (ms)':>10} | {'FTS (ms)':>8} | {'FTS + eje (ms)':>14} | {'coincidencias':>13}")
+        print("-" * 91)
+        for term in TERMS:
+            def run_ilike():
+                q = db.query(Question).filter(Question.stem.ilike(f"%{term}%") | Question.rationale.ilike(f"%{term}%"))
+                return q.count(), q.limit(20).all()
+
+            def run_fts():
+                return search_page(db, term, limit=20)
+
+            def run_fts_filtered():
+                return search_page(db, term, track="FUNCIONAL", difficulties=[2], limit=20)
+
+            ilike_ms = timed(run_ilike, args.repeat)
+            fts_ms = timed(run_fts, args.repeat)
+            filtered_ms = timed(run_fts_filtered, args.repeat)
+            print(f"{term:>32} | {ilike_ms:>10.1f} | {fts_ms:>8.1f} | {filtered_ms:>14.1f} | {run_fts()[1]:>13}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
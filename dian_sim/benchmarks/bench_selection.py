@@ -0,0 +1,100 @@
+"""
+Benchmark: selector adaptativo legado (objetos ORM) vs QuestionPool (NumPy).
+
+Uso:
+    python benchmarks/bench_selection.py --sizes 10000 100000 1000000 --n 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.adaptive import select_questions_for_simulation
+from core.selection import QuestionPool
+
+N_SKILLS = 200
+
+
+class _Row:
+    """Sustituto liviano de Question para el selector legado."""
+    __slots__ = ("question_id", "track", "competency", "topic", "difficulty")
+
+    def __init__(self, question_id, track, competency, topic, difficulty):
+        self.question_id = question_id
+        self.track = track
+        self.competency = competency
+        self.topic = topic
+        self.difficulty = difficulty
+
+
+class _Skill:
+    __slots__ = ("mastery_score", "priority_weight")
+
+    def __init__(self, mastery_score, priority_weight):
+        self.mastery_score = mastery_score
+        self.priority_weight = priority_weight
+
+
+def build_bank(size: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    skill_keys = [("FUNCIONAL" if i % 3 == 0 else "COMPORTAMENTAL", f"Comp {i % 20}", f"Tema {i}") for i in range(N_SKILLS)]
+    skills_map = {k: _Skill(float(rng.uniform(0, 100)), float(rng.uniform(1, 5))) for k in skill_keys}
+    skill_idx = rng.integers(0, N_SKILLS, size=size, dtype=np.int32)
+    difficulty = rng.integers(1, 4, size=size, dtype=np.int8)
+    ids = np.array([f"q{i}" for i in range(size)], dtype=object)
+    return ids, skill_keys, skill_idx, difficulty, skills_map
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--n", type=int, default=20, help="Preguntas por simulacro")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy-above", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    print(f"{'preguntas':>10} | {'legado (ms)':>12} | {'pool build (ms)':>15} | {'pool select (ms)':>16} | {'update_skill (ms)':>17}")
+    print("-" * 84)
+    for size in args.sizes:
+        ids, skill_keys, skill_idx, difficulty, skills_map = build_bank(size)
+
+        legacy_ms = float("nan")
+        if size <= args.skip_legacy_above:
+            rows = [_Row(ids[i], *skill_keys[skill_idx[i]], int(difficulty[i])) for i in range(size)]
+            random.seed(1)
+            legacy_ms = timed(lambda: select_questions_for_simulation(rows, skills_map, n=args.n), args.repeat)
+            del rows
+
+        t0 = time.perf_counter()
+        pool = QuestionPool(ids, skill_keys, skill_idx, difficulty, skills_map=skills_map)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        rng = np.random.default_rng(1)
+        select_ms = timed(lambda: pool.select(args.n, rng=rng), args.repeat)
+
+        def flip():
+            for key in skill_keys[:10]:
+                pool.update_skill(key, 10.0)
+                pool.update_skill(key, 90.0)
+        update_ms = timed(flip, args.repeat) / 20
+
+        print(f"{size:>10} | {legacy_ms:>12.2f} | {build_ms:>15.2f} | {select_ms:>16.3f} | {update_ms:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark: costo de arranque del esquema al importar db.session.
+
+- legado:     create_all + introspección de 3 tablas en cada arranque (comportamiento anterior).
+- versionado: run_migrations con la BD al día (una consulta a schema_version).
+- omitido:    DIAN_SKIP_MIGRATIONS=1.
+
+--rtt-ms agrega una latencia artificial por sentencia para simular una BD remota (Supabase).
+Además mide `import db.session` completo en un proceso nuevo.
+
+Uso:
+    python benchmarks/bench_startup.py --rtt-ms 0 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.migrations import run_migrations, SKIP_ENV
+from db.models import Base
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def legacy_startup(engine):
+    """Réplica de la lógica que corría antes en cada import de db.session."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for table in ["questions", "skills", "configurations"]:
+            conn.execute(text(f"PRAGMA table_info({table})")).fetchall()
+
+
+def instrumented_engine(url: str, rtt_s: float):
+    engine = create_engine(url)
+    counter = {"statements": 0}
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _rtt(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+        if rtt_s:
+            time.sleep(rtt_s)
+
+    return engine, counter
+
+
+def measure(url: str, rtt_s: float, fn, repeat: int):
+    best, statements = float("inf"), 0
+    for _ in range(repeat):
+        engine, counter = instrumented_engine(url, rtt_s)
+        t0 = time.perf_counter()
+        fn(engine)
+        best = min(best, time.perf_counter() - t0)
+        statements = counter["statements"]
+        engine.dispose()
+    return best * 1000, statements
+
+
+def import_latency(url: str, skip: bool, repeat: int) -> float:
+    env = dict(os.environ, DATABASE_URL=url)
+    if skip:
+        env[SKIP_ENV] = "1"
+    else:
+        env.pop(SKIP_ENV, None)
+    code = "import time; t = time.perf_counter(); import db.session; print(time.perf_counter() - t)"
+    best = float("inf")
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+                             capture_output=True, text=True, check=True).stdout.strip().splitlines()
+        best = min(best, float(out[-1]))
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rtt-ms", type=float, nargs="+", default=[0.0, 30.0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench_startup.db')}"
+        engine = create_engine(url)
+        run_migrations(engine, force=True)  # BD al día
+        engine.dispose()
+
+        print(f"\n{'RTT (ms)':>8} | {'legado (ms)':>11} | {'sent.':>5} | {'versionado (ms)':>15} | {'sent.':>5}")
+        print("-" * 58)
+        for rtt in args.rtt_ms:
+            legacy_ms, legacy_n = measure(url, rtt / 1000, legacy_startup, args.repeat)
+            versioned_ms, versioned_n = measure(url, rtt / 1000, run_migrations, args.repeat)
+            print(f"{rtt:>8.0f} | {legacy_ms:>11.1f} | {legacy_n:>5} | {versioned_ms:>15.1f} | {versioned_n:>5}")
+
+        print("\nimport db.session (proceso nuevo, SQLite local):")
+        print(f"  versionado: {import_latency(url, False, args.repeat):.0f} ms")
+        print(f"  omitido ({SKIP_ENV}=1): {import_latency(url, True, args.repeat):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Suite de benchmarks de las rutas calientes, con resultados en JSON y umbrales de regresión.
+
+Para cada tamaño de banco carga un corpus sintético (core.generators.synthetic) en
+SQLite (archivo temporal, o en memoria con --memory) y mide cada caso. Sale con
+código 1 si algún caso supera su umbral absoluto (--thresholds) o empeora más de
+--max-regression respecto a una corrida anterior (--baseline).
+
+Uso:
+    python benchmarks/suite.py                                   # tamaños 1000 10000, umbrales por defecto
+    python benchmarks/suite.py --sizes 1000 10000 50000 --out results.json
+    python benchmarks/suite.py --baseline results.json --max-regression 0.3
+    python benchmarks/suite.py --cases selection.pool finalize.exam_batch --repeat 10
+"""
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.generators.synthetic import load_corpus
+from db.migrations import run_migrations
+from db.models import Question, UserStats
+
+DEFAULT_THRESHOLDS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+EXAM_SIZE = 20
+
+CASES: Dict[str, Callable] = {}
+
+
+def case(name: str):
+    """Registra un caso: fn(ctx) -> callable medido (la preparación no cuenta en el tiempo)."""
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+class Context:
+    """Banco sintético de un tamaño dado y datos derivados que comparten los casos."""
+
+    def __init__(self, session_factory, size: int, tmp: str, seed: int):
+        self.session_factory = session_factory
+        self.db = session_factory()
+        self.size = size
+        self.tmp = tmp
+        self.rng = np.random.default_rng(seed)
+        self._cache = {}
+
+    def lazy(self, key: str, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def question_ids(self) -> List[str]:
+        return self.lazy("ids", lambda: self.db.execute(select(Question.question_id)).scalars().all())
+
+    @property
+    def stems(self) -> List[str]:
+        return self.lazy("stems", lambda: self.db.execute(select(Question.stem)).scalars().all())
+
+    def exam(self) -> List[str]:
+        ids = self.question_ids
+        return [ids[i] for i in self.rng.choice(len(ids), min(EXAM_SIZE, len(ids)), replace=False)]
+
+
+@case("selection.legacy")
+def _selection_legacy(ctx):
+    from core.adaptive import select_questions_for_simulation, user_skills_map
+    # Sesión propia: miles de objetos en el identity map encarecerían los commits de los demás casos
+    db = ctx.lazy("orm_session", ctx.session_factory)
+    questions = ctx.lazy("orm_questions", lambda: db.query(Question).all())
+    skills = user_skills_map(db)
+    return lambda: select_questions_for_simulation(questions, skills, EXAM_SIZE)
+
+
+@case("selection.pool_build")
+def _selection_pool_build(ctx):
+    from core.selection import QuestionPool
+    return lambda: QuestionPool.from_db(ctx.db)
+
+
+@case("selection.pool")
+def _selection_pool(ctx):
+    from core.selection import QuestionPool
+    pool = ctx.lazy("pool", lambda: QuestionPool.from_db(ctx.db))
+    return lambda: pool.select(EXAM_SIZE, rng=ctx.rng)
+
+
+@case("finalize.exam_batch")
+def _finalize(ctx):
+    from core.finalize import finalize_exam_batch
+
+    def run():
+        q_ids = ctx.exam()
+        answers = {qid: "ABCD"[i % 4] for i, qid in enumerate(q_ids)}
+        finalize_exam_batch(ctx.db, q_ids, answers)
+    return run
+
+
+@case("dedupe.rapidfuzz")
+def _dedupe_rapidfuzz(ctx):
+    from core.dedupe import find_duplicates
+    stems = ctx.stems
+    probe = stems[len(stems) // 2]
+    return lambda: find_duplicates(probe, stems)
+
+
+@case("dedupe.lsh")
+def _dedupe_lsh(ctx):
+    from core.dedupe_index import DedupeIndex
+
+    def build():
+        index = DedupeIndex(os.path.join(ctx.tmp, f"suite_{ctx.size}_dedupe.db"))
+        index.ensure_synced(ctx.db)
+        return index
+    index = ctx.lazy("dedupe_index", build)
+    probe = ctx.stems[len(ctx.stems) // 2]
+    return lambda: index.find_duplicates(probe)
+
+
+@case("gamification.update_user_stats")
+def _update_user_stats(ctx):
+    from core.gamification import update_user_stats
+    breakdown = {"FUNCIONAL": (9, 12), "COMPORTAMENTAL": (3, 4), "INTEGRIDAD": (4, 4)}
+    return lambda: update_user_stats(ctx.db, datetime.date.today(), 16, EXAM_SIZE, breakdown)
+
+
+@case("gamification.check_new_achievements")
+def _check_achievements(ctx):
+    from core.gamification import check_new_achievements
+    stats = UserStats(current_streak=7, max_streak=7, total_points=2000, last_activity=datetime.datetime.utcnow())
+
+    def run():
+        stats.achievements_mask = 0  # todo bloqueado: cada repetición evalúa todas las reglas
+        check_new_achievements(ctx.db, stats, EXAM_SIZE, EXAM_SIZE)
+        ctx.db.rollback()
+    return run
+
+
+@case("import.validate")
+def _import_validate(ctx):
+    from core.import_utils import validate_import_errors
+    from core.export import EXPORT_COLUMNS, iter_export_rows
+
+    def frame():
+        df = pd.DataFrame(list(iter_export_rows(ctx.db)), columns=EXPORT_COLUMNS)
+        # ~1% de filas con errores típicos
+        bad = ctx.rng.choice(len(df), max(1, len(df) // 100), replace=False)
+        df.loc[bad[::2], "correct_key"] = "E"
+        df.loc[bad[1::2], "stem"] = ""
+        return df
+    df = ctx.lazy("import_df", frame)
+    return lambda: validate_import_errors(df)
+
+
+def measure(fn: Callable, repeat: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def run_suite(sizes: List[int], cases: List[str], repeat: int, seed: int = 0, memory: bool = False,
+              attempts_per_question: int = 2, log=print) -> List[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            url = "sqlite://" if memory else f"sqlite:///{os.path.join(tmp, f'suite_{size}.db')}"
+            engine = create_engine(url)
+            run_migrations(engine, force=True)
+            session_factory = sessionmaker(bind=engine)
+            with session_factory() as db:
+                t0 = time.perf_counter()
+                load_corpus(db, size, attempts_per_question * size, seed=seed)
+            log(f"Banco {size}: corpus cargado en {time.perf_counter() - t0:.1f} s")
+            ctx = Context(session_factory, size, tmp, seed)
+            for name in cases:
+                samples = measure(CASES[name](ctx), repeat)
+                results.append({
+                    "case": name, "size": size, "repeat": repeat,
+                    "min_ms": round(min(samples), 3), "median_ms": round(statistics.median(samples), 3),
+                    "max_ms": round(max(samples), 3),
+                })
+                log(f"  {name:<38} mediana {results[-1]['median_ms']:>10.2f} ms")
+            ctx.db.close()
+            if "orm_session" in ctx._cache:
+                ctx._cache["orm_session"].close()
+            engine.dispose()
+    return results
+
+
+def threshold_for(thresholds: dict, name: str, size: int):
+    """Umbral más específico: "caso@tamaño", luego "caso", luego patrones tipo "dedupe.*"."""
+    for key in (f"{name}@{size}", name):
+        if key in thresholds:
+            return thresholds[key]
+    for pattern, value in thresholds.items():
+        if "@" not in pattern and fnmatch.fnmatch(name, pattern):
+            return value
+    return None
+
+
+def check(results: List[dict], thresholds: dict = None, baseline: List[dict] = None,
+          max_regression: float = None) -> List[str]:
+    """Lista de fallos (vacía si todo está dentro de los umbrales)."""
+    failures = []
+    previous = {(r["case"], r["size"]): r for r in (baseline or [])}
+    for r in results:
+        limit = threshold_for(thresholds or {}, r["case"], r["size"])
+        if limit is not None and r["median_ms"] > limit:
+            failures.append(f"{r['case']}@{r['size']}: {r['median_ms']:.2f} ms > umbral {limit} ms")
+        prev = previous.get((r["case"], r["size"]))
+        if prev and max_regression is not None and r["median_ms"] > prev["median_ms"] * (1 + max_regression):
+            failures.append(f"{r['case']}@{r['size']}: {r['median_ms']:.2f} ms vs {prev['median_ms']:.2f} ms "
+                            f"de la línea base (+{r['median_ms'] / prev['median_ms'] - 1:.0%})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000])
+    parser.add_argument("--cases", nargs="+", default=list(CASES), help="Nombres o patrones (p. ej. 'dedupe.*')")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--memory", action="store_true", help="SQLite en memoria en lugar de archivo temporal")
+    parser.add_argument("--out", help="Archivo JSON de resultados (por defecto stdout)")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="JSON {caso[@tamaño]: ms}; '' desactiva")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--max-regression", type=float, default=0.5, help="Empeoramiento relativo tolerado vs --baseline")
+    args = parser.parse_args()
+
+    cases = [name for name in CASES if any(fnmatch.fnmatch(name, p) for p in args.cases)]
+    unknown = [p for p in args.cases if not any(fnmatch.fnmatch(name, p) for name in CASES)]
+    if unknown:
+        parser.error(f"Casos desconocidos: {', '.join(unknown)}. Disponibles: {', '.join(CASES)}")
+
+    log = (lambda msg: print(msg, file=sys.stderr)) if not args.out else print
+    # Los logs de la app (migraciones, finalize) no deben mezclarse con el JSON de stdout
+    with contextlib.redirect_stdout(sys.stderr if not args.out else sys.stdout):
+        results = run_suite(args.sizes, cases, args.repeat, args.seed, args.memory, log=log)
+
+    thresholds = {}
+    if args.thresholds:
+        with open(args.thresholds, encoding="utf-8") as f:
+            thresholds = json.load(f)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    failures = check(results, thresholds, baseline, args.max_regression if baseline else None)
+
+    report = {
+        "meta": {"created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count(), "sizes": args.sizes, "repeat": args.repeat,
+                 "storage": "memory" if args.memory else "tempfile"},
+        "results": results,
+        "failures": failures,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Resultados en {args.out}")
+    else:
+        print(text)
+
+    for failure in failures:
+        log(f"❌ {failure}")
+    if not failures:
+        log("✅ Todos los casos dentro de los umbrales.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
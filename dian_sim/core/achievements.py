@@ -0,0 +1,96 @@
+"""
+Motor de logros dirigido por eventos.
+
+Cada regla declara en qué eventos puede cambiar su resultado (la racha cambió,
+los puntos cruzaron un umbral, simulacro perfecto...). Al cerrar un simulacro solo
+se evalúan las reglas de los eventos que ocurrieron y que aún no están desbloqueadas.
+El estado de desbloqueo vive como bitset en user_stats.achievements_mask: no hace
+falta leer la tabla achievements para saber qué falta.
+"""
+from typing import Callable, FrozenSet, Iterable, List, NamedTuple, Set
+
+# Eventos
+EXAM_FINISHED = "exam_finished"
+STREAK_CHANGED = "streak_changed"
+POINTS_CROSSED = "points_crossed"
+PERFECT_EXAM = "perfect_exam"
+ALL_EVENTS = frozenset({EXAM_FINISHED, STREAK_CHANGED, POINTS_CROSSED, PERFECT_EXAM})
+
+
+class ExamOutcome(NamedTuple):
+    """Lo que las reglas pueden consultar tras un simulacro."""
+    correct: int
+    total: int
+    streak: int
+    points: int
+
+
+class Rule(NamedTuple):
+    bit: int  # posición fija en el bitset: nunca reutilizar ni reordenar
+    name: str
+    description: str
+    icon: str
+    events: FrozenSet[str]
+    check: Callable[[ExamOutcome], bool]
+    points_threshold: int = None  # reglas de puntos: umbral que dispara POINTS_CROSSED
+
+
+RULES = [
+    Rule(0, "Primer Paso", "Completaste tu primer simulacro.", "🚶",
+         frozenset({EXAM_FINISHED}), lambda o: True),
+    Rule(1, "Constancia", "Racha de 3 días aprendiendo.", "🔥",
+         frozenset({STREAK_CHANGED}), lambda o: o.streak >= 3),
+    Rule(2, "Imparable", "Racha de una semana completa.", "⚡",
+         frozenset({STREAK_CHANGED}), lambda o: o.streak >= 7),
+    Rule(3, "Perfección", "Simulacro perfecto (mínimo 10 preguntas).", "🎯",
+         frozenset({PERFECT_EXAM}), lambda o: o.total >= 10 and o.correct == o.total),
+    Rule(4, "Veterano", "Alcanzaste el rango de Auditor Senior.", "🛡️",
+         frozenset({POINTS_CROSSED}), lambda o: o.points >= 1500, points_threshold=1500),
+]
+RULES_BY_NAME = {r.name: r for r in RULES}
+RULES_BY_EVENT = {e: [r for r in RULES if e in r.events] for e in ALL_EVENTS}
+POINT_THRESHOLDS = sorted({r.points_threshold for r in RULES if r.points_threshold is not None})
+
+
+def bit(rule: Rule) -> int:
+    return 1 << rule.bit
+
+
+def detect_events(old_streak: int, new_streak: int, old_points: int, new_points: int,
+                  correct: int, total: int) -> Set[str]:
+    """Eventos que produjo un simulacro, a partir del antes/después de las estadísticas."""
+    events = {EXAM_FINISHED}
+    if new_streak != old_streak:
+        events.add(STREAK_CHANGED)
+    if any(old_points < t <= new_points for t in POINT_THRESHOLDS):
+        events.add(POINTS_CROSSED)
+    if total and correct == total:
+        events.add(PERFECT_EXAM)
+    return events
+
+
+def evaluate(mask: int, events: Iterable[str], outcome: ExamOutcome):
+    """(nuevo_mask, reglas recién desbloqueadas). Solo evalúa reglas de `events` aún bloqueadas."""
+    unlocked = []
+    for event in events:
+        for rule in RULES_BY_EVENT.get(event, ()):
+            if not mask & bit(rule) and rule.check(outcome):
+                mask |= bit(rule)
+                unlocked.append(rule)
+    unlocked.sort(key=lambda r: r.bit)
+    return mask, unlocked
+
+
+def unlocked_rules(mask: int) -> List[Rule]:
+    """Reglas desbloqueadas según el bitset, en orden de definición."""
+    return [r for r in RULES if (mask or 0) & bit(r)]
+
+
+def mask_from_names(names: Iterable[str]) -> int:
+    """Bitset equivalente a una lista de nombres de logros (para el backfill)."""
+    mask = 0
+    for name in names:
+        rule = RULES_BY_NAME.get(name)
+        if rule:
+            mask |= bit(rule)
+    return mask
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 import random
 from typing import List
-from db.models import Question, Skill
+from db.models import DEFAULT_USER_ID, Question, Skill
 
 def calculate_mastery_update(is_correct: bool, current_mastery: float) -> float:
     """
@@ -24,6 +24,14 @@ def update_priority(current_priority: float, is_correct: bool) -> float:
         # Decrease priority on success, but keep min 1.0
         return max(1.0, current_priority - 0.5)
 
+def user_skills_map(db, user_id: str = DEFAULT_USER_ID) -> dict:
+    """
+    {(track, competency, topic): Skill} del candidato, para select_questions_for_simulation
+    y QuestionPool. Usa el índice (user_id, track, competency, topic).
+    """
+    skills = db.query(Skill).filter(Skill.user_id == user_id).all()
+    return {(s.track, s.competency, s.topic): s for s in skills}
+
 def select_questions_for_simulation(
     all_questions: List[Question], 
     skills_map: dict, 
@@ -31,7 +39,7 @@ def select_questions_for_simulation(
 ) -> List[Question]:
     """
     Adaptive sampling algorithm.
-    skills_map: {(track, competency, topic): Skill}
+    skills_map: {(track, competency, topic): Skill} of one candidate (see user_skills_map)
     """
     # Categorize questions by user strength
     weak_questions = []
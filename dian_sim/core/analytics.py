@@ -0,0 +1,132 @@
+"""
+Tablas de analítica agregadas para el Dashboard.
+
+- daily_accuracy: intentos y aciertos por candidato y día (UTC).
+- skill_rollup:   número de habilidades y suma de dominio por candidato y nodo
+                  Eje / Macro-Dominio / Micro-Competencia.
+
+finalize_exam_batch las actualiza en la misma transacción del examen
+(record_exam), el borrado de preguntas descuenta sus intentos (forget_attempts)
+y rebuild_analytics las recalcula desde cero para backfill
+(scripts/rebuild_analytics.py). El Dashboard solo lee estas tablas, así que
+su costo no depende del número de intentos.
+"""
+import datetime
+from typing import Iterable, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import case, delete, func, insert, select
+
+from db.bulk import upsert_increment
+from db.models import DEFAULT_USER_ID, Attempt, DailyAccuracy, Skill, SkillRollup
+
+DEFAULT_MACRO = "Transversal"
+
+Label = Tuple[str, str, str]
+
+
+def rollup_label(track: str, macro_dominio: Optional[str], micro_competencia: Optional[str], topic: str) -> Label:
+    """Nodo del sunburst de una habilidad (mismas reglas que usaba el Dashboard)."""
+    return track, macro_dominio or DEFAULT_MACRO, micro_competencia or topic
+
+
+def record_exam(db, day: datetime.date, attempts: int, correct: int,
+                skill_changes: Iterable[Tuple[Optional[Label], float, Label, float]],
+                user_id: str = DEFAULT_USER_ID):
+    """
+    Aplica un examen de `user_id` a los agregados sin hacer commit.
+    skill_changes: (nodo_anterior | None si es nueva, dominio_anterior, nodo_nuevo, dominio_nuevo).
+    """
+    if attempts:
+        db.execute(upsert_increment(db, DailyAccuracy.__table__, ["user_id", "day"], ["attempts", "correct"]),
+                   [{"user_id": user_id, "day": day, "attempts": attempts, "correct": correct}])
+
+    deltas = {}  # {nodo: [Δhabilidades, Δdominio]}
+    for old_label, old_mastery, new_label, new_mastery in skill_changes:
+        if old_label is not None:
+            d = deltas.setdefault(old_label, [0, 0.0])
+            d[0] -= 1
+            d[1] -= old_mastery
+        d = deltas.setdefault(new_label, [0, 0.0])
+        d[0] += 1
+        d[1] += new_mastery
+    if not deltas:
+        return
+
+    db.execute(upsert_increment(db, SkillRollup.__table__, ["user_id", "track", "macro_dominio", "micro_competencia"],
+                                ["skills_count", "mastery_sum"]), [
+        {"user_id": user_id, "track": t, "macro_dominio": m, "micro_competencia": mc,
+         "skills_count": n, "mastery_sum": s}
+        for (t, m, mc), (n, s) in deltas.items()
+    ])
+    if any(n < 0 for n, _ in deltas.values()):
+        # Una habilidad cambió de nodo y el anterior quedó vacío
+        db.execute(delete(SkillRollup).where(SkillRollup.user_id == user_id, SkillRollup.skills_count <= 0))
+
+
+def forget_attempts(db, question_ids: Sequence[str]) -> int:
+    """
+    Descuenta de daily_accuracy (de cada candidato) los intentos de estas preguntas
+    antes de borrarlos (sin commit). Retorna cuántos intentos se descontaron.
+    """
+    day = func.date(Attempt.created_at)
+    rows = db.execute(
+        select(Attempt.user_id, day, func.count(), func.sum(case((Attempt.is_correct, 1), else_=0)))
+        .where(Attempt.question_id.in_(question_ids), Attempt.created_at.isnot(None))
+        .group_by(Attempt.user_id, day)
+    ).all()
+    if not rows:
+        return 0
+    db.execute(upsert_increment(db, DailyAccuracy.__table__, ["user_id", "day"], ["attempts", "correct"]), [
+        {"user_id": u, "day": d if isinstance(d, datetime.date) else datetime.date.fromisoformat(d),
+         "attempts": -n, "correct": -(c or 0)}
+        for u, d, n, c in rows
+    ])
+    db.execute(delete(DailyAccuracy).where(DailyAccuracy.attempts <= 0))
+    return sum(n for _, _, n, _ in rows)
+
+
+def rebuild_analytics(db) -> Tuple[int, int]:
+    """Recalcula ambos agregados desde attempts/skills (sin commit). Retorna (días, nodos)."""
+    db.execute(delete(DailyAccuracy))
+    db.execute(delete(SkillRollup))
+
+    day = func.date(Attempt.created_at)
+    db.execute(insert(DailyAccuracy).from_select(
+        ["user_id", "day", "attempts", "correct"],
+        select(Attempt.user_id, day, func.count(), func.sum(case((Attempt.is_correct, 1), else_=0)))
+        .where(Attempt.created_at.isnot(None)).group_by(Attempt.user_id, day),
+    ))
+
+    macro = func.coalesce(func.nullif(Skill.macro_dominio, ""), DEFAULT_MACRO)
+    micro = func.coalesce(func.nullif(Skill.micro_competencia, ""), Skill.topic)
+    db.execute(insert(SkillRollup).from_select(
+        ["user_id", "track", "macro_dominio", "micro_competencia", "skills_count", "mastery_sum"],
+        select(Skill.user_id, Skill.track, macro, micro, func.count(),
+               func.coalesce(func.sum(Skill.mastery_score), 0.0))
+        .group_by(Skill.user_id, Skill.track, macro, micro),
+    ))
+
+    days = db.execute(select(func.count()).select_from(DailyAccuracy)).scalar()
+    nodes = db.execute(select(func.count()).select_from(SkillRollup)).scalar()
+    return days, nodes
+
+
+def load_daily_accuracy(db, user_id: str = DEFAULT_USER_ID) -> pd.DataFrame:
+    """Columnas: Fecha, Intentos, Porcentaje. Una fila por día con actividad del candidato."""
+    rows = db.execute(select(DailyAccuracy.day, DailyAccuracy.attempts, DailyAccuracy.correct)
+                      .where(DailyAccuracy.user_id == user_id, DailyAccuracy.attempts > 0)
+                      .order_by(DailyAccuracy.day)).all()
+    return pd.DataFrame([{
+        "Fecha": r.day, "Intentos": r.attempts, "Porcentaje": r.correct * 100.0 / r.attempts,
+    } for r in rows], columns=["Fecha", "Intentos", "Porcentaje"])
+
+
+def load_skill_rollup(db, user_id: str = DEFAULT_USER_ID) -> pd.DataFrame:
+    """Columnas: Eje, Macro-Dominio, Micro-Competencia, Habilidades, Dominio (suma), Promedio."""
+    rows = db.execute(select(SkillRollup)
+                      .where(SkillRollup.user_id == user_id, SkillRollup.skills_count > 0)).scalars().all()
+    return pd.DataFrame([{
+        "Eje": r.track, "Macro-Dominio": r.macro_dominio, "Micro-Competencia": r.micro_competencia,
+        "Habilidades": r.skills_count, "Dominio": r.mastery_sum, "Promedio": r.mastery_sum / r.skills_count,
+    } for r in rows], columns=["Eje", "Macro-Dominio", "Micro-Competencia", "Habilidades", "Dominio", "Promedio"])
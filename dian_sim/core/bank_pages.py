@@ -0,0 +1,127 @@
+"""
+Paginación por llave (keyset) del explorador del banco.
+
+Orden: (created_at DESC, question_id DESC). Un cursor es la llave de la
+última fila de la página anterior, así que pasar de página cuesta lo mismo
+en la página 1 que en la 5000 (no hay OFFSET).
+
+Para "ir a la página N" se mantiene un índice disperso con el cursor de
+inicio de cada BOUNDARY_EVERY páginas; desde ahí solo se saltan unas pocas filas.
+Conteos e índice se cachean por filtro y se invalidan con la versión del banco
+(core.bank_version, en la BD: también la mueven otros procesos).
+"""
+import threading
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from db.models import Question
+from core.bank_version import get_bank_version
+
+PAGE_SIZE = 20
+BOUNDARY_EVERY = 10  # páginas entre entradas del índice disperso
+
+Cursor = Optional[Tuple]
+
+_cache = {}  # (kind, signature) -> (version, value)
+_cache_lock = threading.Lock()
+
+
+def filter_signature(track: str = None, difficulties: list = None) -> tuple:
+    return (track or None, tuple(sorted(difficulties)) if difficulties else ())
+
+
+def _cached(db: Session, kind: str, signature: tuple, compute):
+    version = get_bank_version(db)
+    with _cache_lock:
+        hit = _cache.get((kind, signature))
+        if hit and hit[0] == version:
+            return hit[1]
+    value = compute()
+    with _cache_lock:
+        _cache[(kind, signature)] = (version, value)
+    return value
+
+
+def _filters(track, difficulties) -> list:
+    conds = []
+    if track:
+        conds.append(Question.track == track)
+    if difficulties:
+        conds.append(Question.difficulty.in_(difficulties))
+    return conds
+
+
+def count_questions(db: Session, track: str = None, difficulties: list = None) -> int:
+    """Total para el filtro, calculado una vez por versión del banco."""
+    return _cached(db, "count", filter_signature(track, difficulties), lambda: db.execute(
+        select(func.count(Question.question_id)).where(*_filters(track, difficulties))
+    ).scalar())
+
+
+def _after(conds: list, after: Cursor) -> list:
+    if after is None:
+        return conds
+    return conds + [tuple_(Question.created_at, Question.question_id) < tuple_(*after)]
+
+
+_ORDER = (Question.created_at.desc(), Question.question_id.desc())
+
+
+def fetch_page(db: Session, track: str = None, difficulties: list = None, after: Cursor = None,
+               limit: int = PAGE_SIZE) -> Tuple[List[Question], Cursor]:
+    """Página que empieza después de `after` (None = inicio). Retorna (filas, cursor de la siguiente)."""
+    rows = (
+        db.query(Question).filter(*_after(_filters(track, difficulties), after))
+        .order_by(*_ORDER).limit(limit).all()
+    )
+    next_cursor = (rows[-1].created_at, rows[-1].question_id) if rows else None
+    return rows, next_cursor
+
+
+def page_boundaries(db: Session, track: str = None, difficulties: list = None,
+                    page_size: int = PAGE_SIZE) -> List[Cursor]:
+    """
+    boundaries[j] = cursor de inicio de la página j * BOUNDARY_EVERY + 1.
+    Un solo recorrido (row_number) sobre el índice (created_at, question_id).
+    """
+    def compute():
+        step = BOUNDARY_EVERY * page_size
+        numbered = select(
+            Question.created_at, Question.question_id,
+            func.row_number().over(order_by=_ORDER).label("rn"),
+        ).where(*_filters(track, difficulties)).subquery()
+        rows = db.execute(
+            select(numbered.c.created_at, numbered.c.question_id)
+            .where(numbered.c.rn % step == 0).order_by(numbered.c.rn)
+        ).all()
+        return [None] + [tuple(r) for r in rows]
+
+    return _cached(db, f"bounds:{page_size}", filter_signature(track, difficulties), compute)
+
+
+def fetch_page_number(db: Session, page: int, track: str = None, difficulties: list = None,
+                      limit: int = PAGE_SIZE) -> Tuple[List[Question], Cursor, Cursor]:
+    """Salto directo a la página `page` (1-based). Retorna (filas, cursor de inicio, cursor siguiente)."""
+    bounds = page_boundaries(db, track, difficulties, limit)
+    j = min((page - 1) // BOUNDARY_EVERY, len(bounds) - 1)
+    start = bounds[j]
+    skip_rows = (page - 1 - j * BOUNDARY_EVERY) * limit
+    if skip_rows:
+        # Desde el límite más cercano solo se recorren llaves (< BOUNDARY_EVERY páginas)
+        key = db.execute(
+            select(Question.created_at, Question.question_id)
+            .where(*_after(_filters(track, difficulties), start))
+            .order_by(*_ORDER).offset(skip_rows - 1).limit(1)
+        ).first()
+        if key is None:
+            return [], None, None
+        start = tuple(key)
+    rows, next_cursor = fetch_page(db, track, difficulties, after=start, limit=limit)
+    return rows, start, next_cursor
+
+
+def invalidate_page_cache():
+    with _cache_lock:
+        _cache.clear()
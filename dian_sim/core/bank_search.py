@@ -0,0 +1,194 @@
+"""
+Búsqueda de texto completo en el banco de preguntas.
+
+- SQLite: tabla virtual FTS5 `questions_fts` (external content sobre
+  questions.search_text), sincronizada con triggers. Su rowid es
+  questions.search_rowid, un entero que asigna el trigger de inserción: el rowid
+  implícito de questions (llave de texto) puede cambiar con VACUUM.
+- PostgreSQL: índice GIN sobre to_tsvector('simple', search_text).
+
+search_text = normalize_text(stem + rationale), así que la búsqueda ignora
+tildes y mayúsculas. Cada término se busca como prefijo y se combinan con AND.
+"""
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, bindparam, func, literal_column, select, text, update
+from sqlalchemy.orm import Query, Session
+
+from db.models import Question
+from core.dedupe import normalize_text, search_text_for
+
+FTS_TABLE = "questions_fts"
+BACKFILL_CHUNK = 2000
+# Por encima de este número de coincidencias no se ordena por relevancia
+RANKED_MAX = 2000
+
+# Metadata propia: create_all de los modelos no debe intentar crear la tabla virtual
+_fts = Table(FTS_TABLE, MetaData(), Column("rowid", Integer), Column("search_text", Text))
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        search_text, content='questions', content_rowid='search_rowid'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        UPDATE questions SET search_rowid = (SELECT coalesce(max(search_rowid), 0) + 1 FROM questions)
+            WHERE rowid = new.rowid AND search_rowid IS NULL;
+        INSERT INTO {FTS_TABLE}(rowid, search_text)
+            SELECT search_rowid, search_text FROM questions WHERE rowid = new.rowid;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.search_rowid, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF search_text ON questions BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_text) VALUES ('delete', old.search_rowid, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, search_text) VALUES (new.search_rowid, new.search_text);
+    END""",
+]
+
+_PG_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_questions_search_tsv "
+    "ON questions USING GIN (to_tsvector('simple', coalesce(search_text, '')))",
+]
+
+
+def _backfill_search_text(conn) -> int:
+    """Calcula search_text para filas antiguas (NULL). Retorna cuántas actualizó."""
+    total = 0
+    while True:
+        rows = conn.execute(
+            select(Question.question_id, Question.stem, Question.rationale)
+            .where(Question.search_text.is_(None)).limit(BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            return total
+        conn.execute(
+            update(Question.__table__)
+            .where(Question.__table__.c.question_id == bindparam("qid"))
+            .values(search_text=bindparam("text_norm")),
+            [{"qid": r.question_id, "text_norm": search_text_for(r.stem, r.rationale)} for r in rows]
+        )
+        total += len(rows)
+
+
+def ensure_search_index(conn) -> bool:
+    """
+    Crea el índice FTS (y rellena search_text) si hace falta. Idempotente.
+    Retorna True si el índice quedó disponible.
+    """
+    dialect = conn.dialect.name
+    filled = _backfill_search_text(conn)
+    if filled:
+        print(f"🔎 search_text calculado para {filled} preguntas.")
+
+    if dialect == "sqlite":
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for ddl in _SQLITE_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            rebuild_search_index(conn)
+        return True
+    if dialect == "postgresql":
+        for ddl in _PG_DDL:
+            conn.execute(text(ddl))
+        return True
+    return False
+
+
+def rebuild_search_index(conn):
+    """
+    Reconstruye el índice FTS5 desde questions (p. ej. tras cargar filas sin los
+    triggers); antes numera search_rowid de las filas que no lo tienen.
+    """
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("UPDATE questions SET search_rowid = rowid + "
+                          "(SELECT coalesce(max(search_rowid), 0) FROM questions) WHERE search_rowid IS NULL"))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def build_match_query(term: str, dialect: str) -> Optional[str]:
+    """Términos normalizados como prefijos combinados con AND (sintaxis FTS5 o tsquery)."""
+    tokens = normalize_text(term or "").split()
+    if not tokens:
+        return None
+    if dialect == "postgresql":
+        return " & ".join(f"{t}:*" for t in tokens)
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def apply_search(query: Query, term: str, ranked: bool = True) -> Query:
+    """
+    Filtra (y si ranked, ordena por relevancia) una consulta ORM sobre Question.
+    Las demás condiciones (eje, dificultad, paginación) se pueden encadenar después.
+    """
+    dialect = query.session.get_bind().dialect.name
+    match = build_match_query(term, dialect)
+    if match is None:
+        return query
+
+    if dialect == "sqlite":
+        matches = literal_column(FTS_TABLE).op("MATCH")(match)
+        if not ranked:
+            # Sin columna rank: evita calcular bm25 para cada coincidencia
+            return query.filter(Question.search_rowid.in_(select(_fts.c.rowid).where(matches)))
+        hits = select(_fts.c.rowid, literal_column("rank").label("rank")).where(matches).subquery()
+        return query.join(hits, hits.c.rowid == Question.search_rowid).order_by(hits.c.rank)
+    if dialect == "postgresql":
+        tsv = func.to_tsvector("simple", func.coalesce(Question.search_text, ""))
+        tsq = func.to_tsquery("simple", match)
+        query = query.filter(tsv.op("@@")(tsq))
+        return query.order_by(func.ts_rank(tsv, tsq).desc()) if ranked else query
+
+    # Otros motores: sin índice, al menos insensible a tildes vía search_text
+    for token in normalize_text(term).split():
+        query = query.filter(Question.search_text.like(f"%{token}%"))
+    return query
+
+
+def _fts_count(db: Session, match: str) -> int:
+    return db.execute(
+        text(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :m"), {"m": match}
+    ).scalar()
+
+
+def search_page(db: Session, term: str, track: str = None, difficulties: list = None,
+                offset: int = 0, limit: int = 20) -> Tuple[List[Question], int]:
+    """
+    Una página de resultados + total, para el explorador del banco.
+    En SQLite, sin filtros adicionales, el conteo y la página salen solo de la tabla FTS.
+    Si hay más de RANKED_MAX coincidencias se ordena por recencia en lugar de bm25:
+    ordenar por relevancia la mitad del banco no aporta y es lo más caro de la consulta.
+    """
+    dialect = db.get_bind().dialect.name
+    match = build_match_query(term, dialect)
+    query = db.query(Question)
+    if track:
+        query = query.filter(Question.track == track)
+    if difficulties:
+        query = query.filter(Question.difficulty.in_(difficulties))
+    if match is None:
+        return query.offset(offset).limit(limit).all(), query.count()
+
+    if dialect != "sqlite":
+        query = apply_search(query, term)
+        return query.offset(offset).limit(limit).all(), query.count()
+
+    n_matches = _fts_count(db, match)
+    ranked = n_matches <= RANKED_MAX
+    if not track and not difficulties:
+        order = "rank" if ranked else "rowid DESC"
+        rowids = db.execute(
+            text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :m ORDER BY {order} LIMIT :lim OFFSET :off"),
+            {"m": match, "lim": limit, "off": offset}
+        ).scalars().all()
+        if not rowids:
+            return [], n_matches
+        rows = db.query(Question, Question.search_rowid).filter(Question.search_rowid.in_(rowids)).all()
+        by_rowid = {rowid: q for q, rowid in rows}
+        return [by_rowid[r] for r in rowids if r in by_rowid], n_matches
+
+    query = apply_search(query, term, ranked=ranked)
+    if not ranked:
+        query = query.order_by(Question.search_rowid.desc())
+    return query.offset(offset).limit(limit).all(), query.count()
@@ -0,0 +1,24 @@
+"""
+Versión del banco de preguntas, guardada en la BD (tabla bank_version, una fila).
+
+Cada escritura del banco la incrementa en su misma transacción (core.question_store,
+eventos ORM, cargas sintéticas), así que la ven todos los procesos que comparten la
+BD. Las cachés derivadas del banco (conteos, índice de páginas, taxonomía) guardan
+la versión con la que se calcularon y la comparan con una lectura por llave primaria.
+"""
+from sqlalchemy import select
+
+from db.bulk import upsert_increment
+from db.models import BankVersion
+
+_ROW_ID = 1
+
+
+def bump_bank_version(db):
+    """Incrementa la versión dentro de la transacción de `db` (Session o Connection). No hace commit."""
+    db.execute(upsert_increment(db, BankVersion.__table__, ["id"], ["version"]), {"id": _ROW_ID, "version": 1})
+
+
+def get_bank_version(db) -> int:
+    """Versión vigente (0 si el banco nunca se escribió desde que existe la tabla)."""
+    return db.execute(select(BankVersion.version).where(BankVersion.id == _ROW_ID)).scalar() or 0
@@ -16,6 +16,12 @@ def normalize_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
+def search_text_for(stem: str, rationale: str = None) -> str:
+    """
+    Normalized text that feeds the full-text search index (stem + rationale).
+    """
+    return normalize_text(f"{stem or ''} {rationale or ''}")
+
 def compute_hash(text: str) -> str:
     """
     Compute SHA256 of normalized text.
@@ -0,0 +1,233 @@
+"""
+Índice persistente de casi-duplicados (MinHash + LSH) para el banco de preguntas.
+
+Cada enunciado normalizado se convierte en shingles de caracteres, se resume en
+una firma MinHash y se reparte en bandas LSH. Las bandas se guardan en un
+archivo SQLite junto a la base de datos, de modo que la búsqueda de candidatos
+es una consulta indexada (sublineal) y rapidfuzz solo verifica esos candidatos.
+"""
+import hashlib
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz
+
+from core.dedupe import normalize_text
+from db.models import Question
+from db.side_files import side_db_path
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+MAX_CANDIDATES = 50
+# Filas leídas por bucket: acota el costo cuando muchas preguntas comparten plantilla
+BUCKET_SAMPLE = 64
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_SHIFT32 = np.uint64(32)
+_perm_rng = np.random.default_rng(2667)  # semilla fija: las firmas deben ser estables entre procesos
+_PERM_A = _perm_rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _perm_rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _perm_rng.integers(1, 2**63, size=ROWS_PER_BAND + 1, dtype=np.uint64) | np.uint64(1)
+_POWERS = np.uint64(1099511628211) ** np.arange(SHINGLE_SIZE - 1, -1, -1, dtype=np.uint64)
+
+
+def _canonical(norm: str) -> str:
+    # token_sort_ratio ignora el orden de las palabras: los shingles también
+    return " ".join(sorted(norm.split()))
+
+
+def shingle_hashes(norm: str) -> np.ndarray:
+    """Hashes (32 bits) de los shingles de caracteres de un texto ya normalizado."""
+    data = np.frombuffer(_canonical(norm).encode("utf-8"), dtype=np.uint8)
+    if data.size < SHINGLE_SIZE:
+        data = np.pad(data, (0, SHINGLE_SIZE - data.size))
+    windows = np.lib.stride_tricks.sliding_window_view(data, SHINGLE_SIZE).astype(np.uint64)
+    h = (windows * _POWERS).sum(axis=1, dtype=np.uint64)
+    return np.unique((h >> np.uint64(16)) & _MASK32)
+
+
+def minhash_signature(norm: str) -> np.ndarray:
+    # Hashing multiply-shift: (a*x + b) mod 2^64, se toman los 32 bits altos
+    x = shingle_hashes(norm)
+    return ((_PERM_A[:, None] * x[None, :] + _PERM_B[:, None]) >> _SHIFT32).min(axis=1)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """
+    Una llave int64 por banda (incluye el número de banda para no mezclar buckets),
+    más una llave de firma completa para que los duplicados exactos nunca se pierdan
+    en un bucket saturado.
+    """
+    rows = signature.reshape(BANDS, ROWS_PER_BAND)
+    keys = np.arange(BANDS, dtype=np.uint64) * _BAND_MIX[-1]
+    for j in range(ROWS_PER_BAND):
+        keys ^= rows[:, j] * _BAND_MIX[j]
+        keys ^= keys >> np.uint64(31)
+    full = int.from_bytes(hashlib.blake2b(signature.tobytes(), digest_size=8).digest(), "big", signed=True)
+    return keys.view(np.int64).tolist() + [full]
+
+
+def default_index_path() -> str:
+    """Archivo del índice junto a la BD SQLite (o en la raíz del proyecto si la BD es remota)."""
+    return side_db_path("dedupe")
+
+
+class DedupeIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS stems (
+                doc_id INTEGER PRIMARY KEY,
+                question_id TEXT NOT NULL UNIQUE,
+                norm TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band_key INTEGER NOT NULL,
+                doc_id INTEGER NOT NULL,
+                PRIMARY KEY (band_key, doc_id)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM stems").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def _delete_docs(self, docs):
+        """docs: [(doc_id, norm)]. Borra sus bandas (recalculando las llaves) y sus filas."""
+        band_rows = [(k, doc_id) for doc_id, norm in docs for k in band_keys(minhash_signature(norm))]
+        self._conn.executemany("DELETE FROM bands WHERE band_key = ? AND doc_id = ?", band_rows)
+        self._conn.executemany("DELETE FROM stems WHERE doc_id = ?", [(d[0],) for d in docs])
+
+    def _lookup(self, question_ids: List[str]):
+        found = []
+        for i in range(0, len(question_ids), 500):
+            chunk = question_ids[i:i + 500]
+            found.extend(self._conn.execute(
+                f"SELECT doc_id, norm FROM stems WHERE question_id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return found
+
+    def add_many(self, items: Iterable[Tuple[str, str]]):
+        """items: (question_id, stem crudo). Reemplaza entradas existentes con el mismo id."""
+        prepared = []
+        for qid, stem in items:
+            norm = normalize_text(stem or "")
+            prepared.append((qid, norm, band_keys(minhash_signature(norm))))
+        if not prepared:
+            return
+        with self._lock, self._conn:
+            existing = self._lookup([p[0] for p in prepared])
+            if existing:
+                self._delete_docs(existing)
+            band_rows = []
+            for qid, norm, keys in prepared:
+                doc_id = self._conn.execute(
+                    "INSERT INTO stems(question_id, norm) VALUES (?, ?)", (qid, norm)
+                ).lastrowid
+                band_rows.extend((k, doc_id) for k in keys)
+            band_rows.sort()  # inserción en orden de llave: mucho más rápida en el B-tree
+            self._conn.executemany("INSERT OR IGNORE INTO bands(band_key, doc_id) VALUES (?, ?)", band_rows)
+
+    def add(self, question_id: str, stem: str):
+        self.add_many([(question_id, stem)])
+
+    def remove(self, question_ids: Iterable[str]):
+        with self._lock, self._conn:
+            existing = self._lookup(list(question_ids))
+            if existing:
+                self._delete_docs(existing)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bands")
+            self._conn.execute("DELETE FROM stems")
+
+    def candidates(self, norm: str, limit: int = MAX_CANDIDATES) -> List[Tuple[str, str]]:
+        """
+        Candidatos LSH ordenados por número de bandas compartidas: [(question_id, norm)].
+        Cada bucket se lee con LIMIT, así que el costo queda acotado ((BANDS + 1) x BUCKET_SAMPLE filas).
+        """
+        hits = {}
+        with self._lock:
+            for key in band_keys(minhash_signature(norm)):
+                for (doc_id,) in self._conn.execute(
+                    "SELECT doc_id FROM bands WHERE band_key = ? LIMIT ?", (key, BUCKET_SAMPLE)
+                ):
+                    hits[doc_id] = hits.get(doc_id, 0) + 1
+            if not hits:
+                return []
+            top = sorted(hits, key=hits.get, reverse=True)[:limit]
+            rows = self._conn.execute(
+                f"SELECT doc_id, question_id, norm FROM stems WHERE doc_id IN ({','.join('?' * len(top))})", top
+            ).fetchall()
+        by_doc = {r[0]: (r[1], r[2]) for r in rows}
+        return [by_doc[d] for d in top if d in by_doc]
+
+    def find_duplicates(self, new_stem: str, threshold: int = 90, limit: int = 5) -> List[Tuple[str, int, str]]:
+        """
+        Igual que core.dedupe.find_duplicates pero sobre el índice.
+        Retorna [(stem_normalizado, score, question_id)] con score >= threshold.
+        """
+        norm_new = normalize_text(new_stem)
+        matches = []
+        for qid, norm in self.candidates(norm_new):
+            score = fuzz.token_sort_ratio(norm_new, norm)
+            if score >= threshold:
+                matches.append((norm, score, qid))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches[:limit]
+
+    def ensure_synced(self, db) -> bool:
+        """Reconstruye el índice desde la BD si el número de entradas no coincide. Retorna True si reconstruyó."""
+        bank_count = db.query(Question.question_id).count()
+        if bank_count == len(self):
+            return False
+        self.clear()
+        batch = []
+        for qid, stem in db.query(Question.question_id, Question.stem).yield_per(2000):
+            batch.append((qid, stem))
+            if len(batch) >= 2000:
+                self.add_many(batch)
+                batch = []
+        self.add_many(batch)
+        return True
+
+
+_index: Optional[DedupeIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_dedupe_index(path: str = None) -> DedupeIndex:
+    """Índice compartido por proceso."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DedupeIndex(path or default_index_path())
+        return _index
+
+
+def index_questions(items: Iterable[Tuple[str, str]]):
+    """Agrega (question_id, stem) al índice compartido. Un fallo no debe tumbar el guardado."""
+    try:
+        get_dedupe_index().add_many(items)
+    except Exception as e:
+        print(f"⚠️ Dedupe index not updated (se reconstruirá luego): {e}")
+
+
+def unindex_questions(question_ids: Iterable[str]):
+    try:
+        get_dedupe_index().remove(question_ids)
+    except Exception as e:
+        print(f"⚠️ Dedupe index not updated (se reconstruirá luego): {e}")
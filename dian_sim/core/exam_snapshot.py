@@ -0,0 +1,104 @@
+"""
+Snapshot inmutable de un simulacro.
+
+Se construye una sola vez al iniciar el examen (una consulta) y se guarda en
+session_state; Ejecución y Resultados leen de aquí sin tocar la BD en cada clic.
+La situación y el enunciado vienen ya separados de la BD (core.stem_parts).
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.stem_parts import split_stem
+from db.models import Question
+
+
+class QuestionRecord:
+    """Registro compacto y de solo lectura de una pregunta del examen."""
+    __slots__ = (
+        "question_id", "track", "competency", "topic", "macro_dominio", "micro_competencia",
+        "difficulty", "stem", "situation", "question_text", "options", "correct_key", "rationale",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("QuestionRecord es inmutable")
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name in self.__slots__:
+            object.__setattr__(self, name, state.get(name))
+
+    @classmethod
+    def from_row(cls, row) -> "QuestionRecord":
+        situation, question_text = row.situation_text, row.prompt_text
+        if question_text is None:  # fila aún sin backfill
+            situation, question_text = split_stem(row.stem)
+        return cls(
+            question_id=row.question_id, track=row.track, competency=row.competency, topic=row.topic,
+            macro_dominio=row.macro_dominio, micro_competencia=row.micro_competencia,
+            difficulty=row.difficulty, stem=row.stem, situation=situation, question_text=question_text,
+            options=dict(row.options_json or {}), correct_key=row.correct_key, rationale=row.rationale,
+        )
+
+    def to_dict(self) -> dict:
+        """Formato que esperan explain_question y el PDF (options_json como en el modelo)."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["options_json"] = data.pop("options")
+        return data
+
+
+class ExamSnapshot:
+    __slots__ = ("question_ids", "records")
+
+    def __init__(self, records: List[QuestionRecord]):
+        self.question_ids = tuple(r.question_id for r in records)
+        self.records: Dict[str, QuestionRecord] = {r.question_id: r for r in records}
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def __getitem__(self, idx: int) -> QuestionRecord:
+        return self.records[self.question_ids[idx]]
+
+    def __iter__(self):
+        return (self.records[qid] for qid in self.question_ids)
+
+    def get(self, question_id: str) -> Optional[QuestionRecord]:
+        return self.records.get(question_id)
+
+
+_COLUMNS = (
+    Question.question_id, Question.track, Question.competency, Question.topic,
+    Question.macro_dominio, Question.micro_competencia, Question.difficulty,
+    Question.stem, Question.situation_text, Question.prompt_text,
+    Question.options_json, Question.correct_key, Question.rationale,
+)
+
+
+def build_exam_snapshot(db: Session, q_ids: List[str]) -> ExamSnapshot:
+    """Una consulta; conserva el orden de q_ids y omite preguntas que ya no existan."""
+    rows = {r.question_id: r for r in db.execute(select(*_COLUMNS).where(Question.question_id.in_(q_ids)))}
+    return ExamSnapshot([QuestionRecord.from_row(rows[qid]) for qid in q_ids if qid in rows])
+
+
+def snapshot_for(state, q_ids: List[str], session_factory) -> ExamSnapshot:
+    """
+    Snapshot guardado en `state` (session_state) si corresponde a q_ids.
+    Si no existe (sesión iniciada antes del snapshot) se construye una vez y se guarda.
+    """
+    snapshot = state.get("exam_snapshot")
+    if snapshot is None or snapshot.question_ids != tuple(q_ids):
+        db = session_factory()
+        try:
+            snapshot = build_exam_snapshot(db, q_ids)
+        finally:
+            db.close()
+        state["exam_snapshot"] = snapshot
+    return snapshot
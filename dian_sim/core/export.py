@@ -0,0 +1,147 @@
+"""
+Exportación del banco de preguntas en streaming (XLSX, CSV, Parquet y texto con |).
+
+Las filas se leen con un cursor por lotes (yield_per) y se escriben directo al
+destino: XLSX en modo write-only de openpyxl, Parquet por row groups. La memoria
+no crece con el tamaño del banco (no hay lista de dicts ni DataFrame intermedio).
+Las columnas son las de la plantilla de carga masiva, así que el archivo se puede
+volver a importar.
+"""
+import csv
+import io
+import itertools
+import tempfile
+from typing import Iterable, Iterator, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from db.bulk import chunked
+from db.models import Question
+
+EXPORT_COLUMNS = ["track", "competency", "topic", "difficulty", "stem", "options_A", "options_B",
+                  "options_C", "options_D", "correct_key", "rationale"]
+TEXT_COLUMNS = ["track", "competency", "topic", "stem", "options_A", "options_B", "options_C",
+                "options_D", "correct_key", "rationale", "difficulty"]
+OPTION_KEYS = ["A", "B", "C", "D"]
+
+BATCH_SIZE = 1000
+ID_CHUNK_SIZE = 500  # límite holgado de parámetros por IN (...) en SQLite
+SPOOL_MAX_BYTES = 8 * 1024 * 1024  # por encima, el archivo temporal pasa a disco
+
+
+def iter_export_rows(db: Session, question_ids: Sequence[str] = None,
+                     batch_size: int = BATCH_SIZE) -> Iterator[tuple]:
+    """Filas en el orden de EXPORT_COLUMNS. question_ids=None exporta todo el banco."""
+    cols = select(Question.track, Question.competency, Question.topic, Question.difficulty,
+                  Question.stem, Question.options_json, Question.correct_key, Question.rationale)
+    if question_ids is None:
+        queries = [cols.order_by(Question.question_id)]
+    else:
+        ids = sorted(set(question_ids))
+        queries = [cols.where(Question.question_id.in_(chunk)).order_by(Question.question_id)
+                   for chunk in chunked(ids, ID_CHUNK_SIZE)]
+
+    for query in queries:
+        for track, competency, topic, difficulty, stem, opts, correct_key, rationale in \
+                db.execute(query.execution_options(yield_per=batch_size)):
+            opts = opts or {}
+            yield (track, competency, topic, difficulty, stem, *(opts.get(k, "") for k in OPTION_KEYS),
+                   correct_key, rationale)
+
+
+def write_xlsx(rows: Iterable[tuple], dest):
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Banco_Preguntas")
+    ws.append(EXPORT_COLUMNS)
+    for row in rows:
+        # Caracteres de control (p. ej. de PDFs pegados) harían fallar a openpyxl
+        ws.append([ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in row])
+    wb.save(dest)
+
+
+def write_csv(rows: Iterable[tuple], dest):
+    text = io.TextIOWrapper(dest, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+    text.flush()
+    text.detach()  # no cerrar `dest` al liberar el wrapper
+
+
+def _clean_pipe(value) -> str:
+    return "" if value is None else str(value).replace("\n", " ").replace("|", " ")
+
+
+def write_text(rows: Iterable[tuple], dest):
+    """Formato de Copiar/Pegar delimitado por |, en el orden de TEXT_COLUMNS."""
+    order = [EXPORT_COLUMNS.index(c) for c in TEXT_COLUMNS]
+    dest.write("|".join(TEXT_COLUMNS).encode("utf-8"))
+    for row in rows:
+        dest.write(("\n" + "|".join(_clean_pipe(row[i]) for i in order)).encode("utf-8"))
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def write_parquet(rows: Iterable[tuple], dest, batch_size: int = BATCH_SIZE):
+    """Un row group por lote. Requiere pyarrow (opcional)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.int64() if c == "difficulty" else pa.string()) for c in EXPORT_COLUMNS])
+    rows = iter(rows)
+    with pq.ParquetWriter(dest, schema) as writer:
+        while batch := list(itertools.islice(rows, batch_size)):
+            columns = list(zip(*batch))
+            writer.write_batch(pa.record_batch([pa.array(col, type=f.type) for col, f in zip(columns, schema)],
+                                               schema=schema))
+
+
+# formato -> (writer, extensión, mime)
+FORMATS = {
+    "xlsx": (write_xlsx, "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (write_csv, "csv", "text/csv"),
+    "parquet": (write_parquet, "parquet", "application/vnd.apache.parquet"),
+    "txt": (write_text, "txt", "text/plain"),
+}
+
+
+def export_questions(db: Session, fmt: str, dest=None, question_ids: Sequence[str] = None):
+    """
+    Escribe la exportación en `dest` (binario, con seek). Por defecto un archivo
+    temporal que se queda en memoria si es pequeño y pasa a disco si no.
+    Retorna dest posicionado al inicio.
+    """
+    writer = FORMATS[fmt][0]
+    if dest is None:
+        dest = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    writer(iter_export_rows(db, question_ids), dest)
+    dest.seek(0)
+    return dest
+
+
+def deferred_export(session_factory, fmt: str, question_ids: Sequence[str] = None):
+    """
+    Callable para st.download_button(data=...) (Streamlit >= 1.52): el archivo se genera
+    solo al hacer clic, con una sesión propia (la de la página ya puede estar cerrada).
+    Retorna bytes: Streamlit necesita el archivo completo para servirlo.
+    """
+    ids = None if question_ids is None else list(question_ids)
+
+    def build():
+        db = session_factory()
+        try:
+            with export_questions(db, fmt, question_ids=ids) as out:
+                return out.read()
+        finally:
+            db.close()
+    return build
@@ -0,0 +1,164 @@
+import datetime
+import time
+import uuid
+
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from db.models import DEFAULT_USER_ID, Question, Attempt, Skill
+from core.adaptive import calculate_mastery_update, update_priority
+from core.analytics import record_exam, rollup_label
+from core.gamification import update_user_stats
+from core.scheduler import record_reviews
+
+
+def finalize_exam_batch(db: Session, q_ids: list, answers_dict: dict, user_id: str = DEFAULT_USER_ID) -> dict:
+    """
+    Cierre de simulacro orientado a conjuntos, para el candidato `user_id`:
+    1. load:    preguntas del examen y habilidades tocadas del candidato (2 consultas).
+    2. compute: mastery/prioridad en memoria.
+    3. write:   INSERT masivo de Attempt + UPDATE/INSERT masivo de Skill + repaso espaciado
+                (core.scheduler) + agregados del Dashboard (core.analytics) + estadísticas,
+                todo en una sola transacción
+                (update_user_stats hace el commit).
+    Retorna un dict con el resumen del examen y los tiempos por fase (ms).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+
+    # --- 1. LOAD ---
+    rows = db.execute(
+        select(
+            Question.question_id, Question.track, Question.competency, Question.topic,
+            Question.macro_dominio, Question.micro_competencia, Question.correct_key
+        ).where(Question.question_id.in_(q_ids))
+    ).all()
+    questions = {r.question_id: r for r in rows}
+
+    skill_keys = {(r.track, r.competency, r.topic) for r in rows}
+    skills = {}
+    if skill_keys:
+        skill_rows = db.execute(
+            select(
+                Skill.skill_id, Skill.track, Skill.competency, Skill.topic,
+                Skill.macro_dominio, Skill.micro_competencia, Skill.mastery_score, Skill.priority_weight
+            ).where(Skill.user_id == user_id,
+                    tuple_(Skill.track, Skill.competency, Skill.topic).in_(list(skill_keys)))
+        ).all()
+        for s in skill_rows:
+            # Igual que el .first() anterior: si hay duplicados se usa el primero
+            skills.setdefault((s.track, s.competency, s.topic), {
+                "skill_id": s.skill_id,
+                "track": s.track,
+                "competency": s.competency,
+                "topic": s.topic,
+                "mastery_score": s.mastery_score or 0.0,
+                "priority_weight": s.priority_weight or 1.0,
+                "old_label": rollup_label(s.track, s.macro_dominio, s.micro_competencia, s.topic),
+                "old_mastery": s.mastery_score or 0.0,
+            })
+    t1 = time.perf_counter()
+    timings["load_ms"] = (t1 - t0) * 1000
+
+    # --- 2. COMPUTE ---
+    now = datetime.datetime.utcnow()
+    correct_count = 0
+    eje_results = {}  # {"FUNCIONAL": [correct, total], ...}
+    attempt_rows = []
+    existing_ids = {s["skill_id"] for s in skills.values()}
+
+    for qid in q_ids:
+        q = questions.get(qid)
+        if q is None:
+            # Pregunta borrada mientras el examen estaba en curso
+            continue
+        key_chosen = answers_dict.get(qid, "NONE")
+        is_right = (key_chosen == q.correct_key)
+        if is_right:
+            correct_count += 1
+
+        track = q.track or "FUNCIONAL"
+        eje_results.setdefault(track, [0, 0])
+        eje_results[track][1] += 1
+        if is_right:
+            eje_results[track][0] += 1
+
+        attempt_rows.append({
+            "attempt_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "question_id": qid,
+            "chosen_key": key_chosen,
+            "is_correct": is_right,
+            "created_at": now,
+        })
+
+        key = (q.track, q.competency, q.topic)
+        skill = skills.get(key)
+        if skill is None:
+            skill = skills[key] = {
+                "skill_id": str(uuid.uuid4()),
+                "user_id": user_id,
+                "track": q.track,
+                "competency": q.competency,
+                "topic": q.topic,
+                "mastery_score": 0.0,
+                "priority_weight": 1.0,
+            }
+        # Sync taxonomy update
+        skill["macro_dominio"] = q.macro_dominio
+        skill["micro_competencia"] = q.micro_competencia
+        skill["mastery_score"] = calculate_mastery_update(is_right, skill["mastery_score"])
+        skill["priority_weight"] = update_priority(skill["priority_weight"], is_right)
+        skill["last_seen"] = now
+        skill["updated_at"] = now
+
+    total_q = len(attempt_rows)
+    breakdown = {k: (v[0], v[1]) for k, v in eje_results.items()}
+    skill_updates = [s for s in skills.values() if "last_seen" in s]
+    t2 = time.perf_counter()
+    timings["compute_ms"] = (t2 - t1) * 1000
+
+    # --- 3. WRITE (una transacción) ---
+    if attempt_rows:
+        db.execute(insert(Attempt), attempt_rows)
+    to_update = [s for s in skill_updates if s["skill_id"] in existing_ids]
+    to_insert = [s for s in skill_updates if s["skill_id"] not in existing_ids]
+    if to_update:
+        db.execute(update(Skill), [
+            {k: s[k] for k in ("skill_id", "macro_dominio", "micro_competencia", "mastery_score",
+                               "priority_weight", "last_seen", "updated_at")}
+            for s in to_update
+        ])
+    if to_insert:
+        db.execute(insert(Skill), to_insert)
+    record_reviews(db, [(r["question_id"], r["is_correct"]) for r in attempt_rows], now, user_id=user_id)
+    record_exam(db, now.date(), total_q, correct_count, [
+        (s.get("old_label"), s.get("old_mastery", 0.0),
+         rollup_label(s["track"], s["macro_dominio"], s["micro_competencia"], s["topic"]), s["mastery_score"])
+        for s in skill_updates
+    ], user_id=user_id)
+
+    stats, points_earned, new_achievements, rank_up, is_passed = update_user_stats(
+        db, datetime.date.today(), correct_count, total_q, eje_breakdown=breakdown, user_id=user_id
+    )
+    timings["write_ms"] = (time.perf_counter() - t2) * 1000
+
+    print("⏱️ finalize_exam: " + " | ".join(f"{k}={v:.1f}" for k, v in timings.items())
+          + f" ({total_q} preguntas, {len(skill_updates)} habilidades)")
+
+    return {
+        "total": total_q,
+        "correct": correct_count,
+        "score": (correct_count / total_q) * 100 if total_q > 0 else 0,
+        "points_earned": points_earned,
+        "new_streak": stats.current_streak,
+        "rank_up": rank_up,
+        "is_passed": is_passed,
+        "new_achievements": [a.name for a in new_achievements],
+        "breakdown": breakdown,
+        "timings": timings,
+        "skill_updates": {
+            (s["track"], s["competency"], s["topic"]): (s["mastery_score"], s["priority_weight"])
+            for s in skill_updates
+        },
+    }
@@ -1,20 +1,29 @@
 import datetime
 from sqlalchemy.orm import Session
-from db.models import UserStats, Attempt, Achievement
+from db.models import DEFAULT_USER_ID, UserStats, Attempt, Achievement
 import uuid
 
+from core.achievements import ALL_EVENTS, ExamOutcome, detect_events, evaluate
 from core.rank_system import get_rank_info
 
-def update_user_stats(db: Session, last_session_date: datetime.date, correct_count: int, total_questions: int, eje_breakdown: dict = None):
+def get_user_stats(db: Session, user_id: str = DEFAULT_USER_ID):
+    """Fila de estadísticas del candidato (None si aún no ha presentado simulacros)."""
+    return db.query(UserStats).filter(UserStats.user_id == user_id).first()
+
+
+def update_user_stats(db: Session, last_session_date: datetime.date, correct_count: int, total_questions: int,
+                      eje_breakdown: dict = None, user_id: str = DEFAULT_USER_ID):
     """
-    Actualiza puntos y rachas del usuario aplicando pesos GOA:
+    Actualiza puntos y rachas del candidato aplicando pesos GOA:
     Funcional (60%), Comportamental (20%), Integridad (20%)
     """
-    stats = db.query(UserStats).first()
+    stats = get_user_stats(db, user_id)
     if not stats:
-        stats = UserStats(current_streak=0, max_streak=0, total_points=0, last_activity=datetime.datetime.utcnow())
+        stats = UserStats(user_id=user_id, current_streak=0, max_streak=0, total_points=0, achievements_mask=0,
+                          last_activity=datetime.datetime.utcnow())
         db.add(stats)
         db.flush()
+    old_streak, old_points = stats.current_streak, stats.total_points
 
     today = datetime.date.today()
     yesterday = today - datetime.timedelta(days=1)
@@ -67,37 +76,25 @@ def update_user_stats(db: Session, last_session_date: datetime.date, correct_cou
     
     stats.last_activity = datetime.datetime.utcnow()
     
-    # Verificar logros
-    new_achievements = check_new_achievements(db, stats, correct_count, total_questions)
+    # Verificar logros: solo las reglas afectadas por lo que cambió en este simulacro
+    events = detect_events(old_streak, stats.current_streak, old_points, stats.total_points,
+                           correct_count, total_questions)
+    new_achievements = check_new_achievements(db, stats, correct_count, total_questions, events)
     
     db.commit()
     
     return stats, session_points, new_achievements, (new_rank['name'] if new_rank['name'] != old_rank['name'] else None), is_passed
 
-def check_new_achievements(db: Session, stats: UserStats, correct_count: int, total_questions: int):
-    """Verifica y desbloquea nuevos logros."""
-    already_unlocked = [a.name for a in db.query(Achievement).all()]
-    new_ones = []
-
-    def unlock(name, desc, icon):
-        if name not in already_unlocked:
-            ach = Achievement(name=name, description=desc, icon=icon)
-            db.add(ach)
-            new_ones.append(ach)
-
-    # REGLAS DE LOGROS
-    unlock("Primer Paso", "Completaste tu primer simulacro.", "🚶")
-    
-    if stats.current_streak >= 3:
-        unlock("Constancia", "Racha de 3 días aprendiendo.", "🔥")
-        
-    if stats.current_streak >= 7:
-        unlock("Imparable", "Racha de una semana completa.", "⚡")
-
-    if total_questions >= 10 and correct_count == total_questions:
-        unlock("Perfección", "Simulacro perfecto (mínimo 10 preguntas).", "🎯")
-
-    if stats.total_points >= 1500:
-        unlock("Veterano", "Alcanzaste el rango de Auditor Senior.", "🛡️")
-
+def check_new_achievements(db: Session, stats: UserStats, correct_count: int, total_questions: int,
+                           events=ALL_EVENTS):
+    """
+    Desbloquea los logros cuyas reglas (core.achievements) se cumplen para `events`.
+    El estado sale del bitset de `stats`, sin consultar la tabla achievements; esta solo
+    recibe una fila por logro nuevo como historial (fecha de desbloqueo).
+    """
+    outcome = ExamOutcome(correct_count, total_questions, stats.current_streak, stats.total_points)
+    stats.achievements_mask, unlocked = evaluate(stats.achievements_mask or 0, events, outcome)
+    new_ones = [Achievement(user_id=stats.user_id or DEFAULT_USER_ID, name=r.name, description=r.description,
+                            icon=r.icon) for r in unlocked]
+    db.add_all(new_ones)
     return new_ones
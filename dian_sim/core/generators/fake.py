@@ -0,0 +1,57 @@
+"""
+Proveedor LLM local (sin red) para pruebas y benchmarks del generador.
+
+Responde con el mismo JSON que pide el prompt real, simulando latencia y,
+opcionalmente, fallos periódicos.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+
+
+class FakeLLMBackend:
+    def __init__(self, latency_s: float = 0.2, fail_every: int = 0):
+        self.latency_s = latency_s
+        self.fail_every = fail_every
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def complete(self, prompt: str) -> str:
+        call_no = next(self._counter)
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency_s)
+            if self.fail_every and call_no % self.fail_every == 0:
+                raise Exception("429 rate_limit_exceeded (fake)")
+
+            match = re.search(r"EXACTAMENTE (\d+)", prompt)
+            count = int(match.group(1)) if match else 5
+            match = re.search(r"DIFICULTAD: (\d)", prompt)
+            difficulty = int(match.group(1)) if match else 2
+
+            questions = [{
+                "track": "FUNCIONAL",
+                "macro_dominio": "Tributario",
+                "micro_competencia": "Procedimiento de Cobro",
+                "topic": "Fake",
+                "difficulty": difficulty,
+                "stem": f"SITUACIÓN: Caso simulado {call_no}-{i}. PREGUNTA: ¿Cuál es la acción correcta?",
+                "options": {"A": "Opción 1", "B": "Opción 2", "C": "Opción 3"},
+                "correct_key": "A",
+                "rationale": "Respuesta simulada.",
+            } for i in range(count)]
+            return json.dumps({"questions": questions}, ensure_ascii=False)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def explain(self, prompt: str) -> str:
+        next(self._counter)
+        time.sleep(self.latency_s)
+        return "Explicación simulada: revisa la norma aplicable al caso."
@@ -2,15 +2,19 @@ import os
 import json
 import uuid
 import datetime
-import time
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List
 from db.models import Question
 from core.dedupe import compute_hash
+from core.generators.fake import FakeLLMBackend
+from core.generators.rate_limit import get_limiter, get_max_concurrency
+from core.generators.retrieval import DEFAULT_CONTEXT_TOKENS, plan_batch_contexts
+from core.llm_cache import get_llm_cache, make_key
 import openai
 import google.generativeai as genai
 
 class LLMGenerator:
-    def __init__(self, provider: str, api_key: str, model_name: str = None):
+    def __init__(self, provider: str, api_key: str, model_name: str = None, cache=None):
         self.provider = provider.lower()
         self.api_key = api_key.strip() if api_key else ""
         self.model_name = model_name
@@ -28,23 +32,86 @@ class LLMGenerator:
                 api_key=self.api_key,
                 base_url="https://api.groq.com/openai/v1"
             )
+
+        # Proveedor local para pruebas offline (no requiere API Key)
+        self.fake_backend = FakeLLMBackend() if self.provider == "fake" else None
+
+        # Un limitador compartido por proveedor: varias sesiones no multiplican la cuota
+        self.limiter = get_limiter(self.provider)
+        self.max_concurrency = get_max_concurrency(self.provider)
+
+        # Caché persistente de respuestas (el proveedor falso no la usa por defecto: mide latencia)
+        if cache is None and self.provider != "fake":
+            cache = get_llm_cache()
+        self.cache = cache
             
-    def generate_from_text(self, text: str, count: int = 5, difficulty: int = 2) -> List[dict]:
-        """Generates questions by splitting into smaller chunks for reliability."""
-        all_results = []
+    def generate_from_text(self, text: str, count: int = 5, difficulty: int = 2,
+                           concurrency: int = None,
+                           on_batch: Callable[[List[dict], int, int], None] = None,
+                           use_cache: bool = True,
+                           context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+                           query: str = None) -> List[dict]:
+        """
+        Generates questions by splitting into smaller chunks for reliability.
+        Cada lote recibe su propio contexto (core.generators.retrieval): fragmentos
+        distintos del documento, hasta `context_tokens`, priorizando `query` si se indica.
+        Los lotes se envían en paralelo (hasta `concurrency`, por defecto el del proveedor)
+        bajo el token bucket del proveedor. on_batch(resultados_lote, lotes_listos, total_lotes)
+        se invoca en el hilo que llama a medida que llegan los lotes.
+        Con use_cache=False se ignoran las respuestas guardadas (pero se refrescan).
+        """
         batch_size = 5 # Reliable size for JSON generation
-        
-        remaining = count
-        while remaining > 0:
-            current_batch = min(remaining, batch_size)
+        sizes = [min(batch_size, count - start) for start in range(0, count, batch_size)]
+        contexts = plan_batch_contexts(text, len(sizes), context_tokens, query)
+        workers = min(concurrency or self.max_concurrency, len(sizes))
+        if workers <= 1:
+            return self._generate_sequential(contexts, sizes, difficulty, on_batch, use_cache)
+
+        all_results = []
+        errors = []
+        done = 0
+        print(f"DEBUG: Generating {count} questions in {len(sizes)} batches ({workers} concurrent)...")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self._generate_batch, contexts[i], n, difficulty, i, use_cache)
+                       for i, n in enumerate(sizes)]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    # No se lanzó por un error previo
+                    continue
+                try:
+                    batch_results = future.result()
+                except Exception as e:
+                    if not errors:
+                        # No lanzar más lotes; los que ya están en vuelo se recogen igual
+                        for f in futures:
+                            f.cancel()
+                    errors.append(e)
+                    continue
+                all_results.extend(batch_results)
+                done += 1
+                if on_batch:
+                    on_batch(batch_results, done, len(sizes))
+
+        if errors:
+            # If we have some results already, return them instead of failing completely
+            if all_results:
+                print(f"WARNING: Generation interrupted, but returning {len(all_results)} questions already generated. Error: {errors[0]}")
+            else:
+                raise errors[0]
+        return all_results
+
+    def _generate_sequential(self, contexts: List[str], sizes: List[int], difficulty: int, on_batch=None,
+                             use_cache: bool = True) -> List[dict]:
+        all_results = []
+        remaining = sum(sizes)
+        for i, current_batch in enumerate(sizes, start=1):
             print(f"DEBUG: Generating batch of {current_batch} questions (Remaining: {remaining})...")
             try:
-                batch_results = self._generate_batch(text, current_batch, difficulty)
+                batch_results = self._generate_batch(contexts[i - 1], current_batch, difficulty, i - 1, use_cache)
                 all_results.extend(batch_results)
                 remaining -= current_batch
-                # Small delay to avoid aggressive rate limits in some providers
-                if remaining > 0:
-                    time.sleep(1)
+                if on_batch:
+                    on_batch(batch_results, i, len(sizes))
             except Exception as e:
                 # If we have some results already, return them instead of failing completely
                 if all_results:
@@ -52,13 +119,13 @@ class LLMGenerator:
                     break
                 else:
                     raise e
-                    
+
         return all_results
 
-    def _generate_batch(self, text: str, count: int = 5, difficulty: int = 2) -> List[dict]:
-        # Increase context window to 10000 characters for better results
-        context = text[:10000]
-        
+    def _generate_batch(self, context: str, count: int = 5, difficulty: int = 2,
+                        batch_no: int = 0, use_cache: bool = True) -> List[dict]:
+        # `context` ya viene recortado al presupuesto del lote (plan_batch_contexts)
+
         prompt = f"""
         Actúa como un Experto Constructor de Ítems de la CNSC para los procesos de selección de la DIAN.
         Tu misión es generar EXACTAMENTE {count} preguntas de selección múltiple con un nivel de DIFICULTAD: {difficulty} (1=Básico, 2=Intermedio, 3=Avanzado).
@@ -103,9 +170,19 @@ class LLMGenerator:
         IMPORTANTE: No respondas con nada que no sea el JSON. La densidad léxica debe ser técnica (Acto Administrativo, Título Ejecutivo, Sujeto Pasivo, etc.).
         """
         
+        # El número de lote entra en la llave: los lotes de una misma solicitud comparten prompt
+        cache_key = make_key("batch", self.provider, self.model_name, prompt, batch_no)
+        cached = self.cache.get(cache_key, "batch") if (self.cache and use_cache) else None
+
         try:
-            content = ""
-            if self.provider == "openai" and self.openai_client:
+            content = cached or ""
+            if not cached:
+                # Espera turno en el token bucket del proveedor (reemplaza el sleep fijo entre lotes)
+                self.limiter.acquire()
+
+            if cached:
+                print(f"DEBUG: Lote {batch_no + 1} servido desde caché.")
+            elif self.provider == "openai" and self.openai_client:
                 model = self.model_name if self.model_name else "gpt-4o-mini"
                 print(f"DEBUG: Enviando lote a OpenAI ({model})...")
                 try:
@@ -194,6 +271,9 @@ class LLMGenerator:
                     content = content.replace("```json", "").split("```")[0]
                 elif "```" in content:
                     content = content.replace("```", "")
+
+            elif self.provider == "fake" and self.fake_backend:
+                content = self.fake_backend.complete(prompt)
         
             # Parse JSON
             try:
@@ -244,7 +324,9 @@ class LLMGenerator:
                     "hash_norm": compute_hash(item.get("stem", ""))
                 }
                 results.append(q_dict)
-                
+
+            if results and self.cache and not cached:
+                self.cache.set(cache_key, content, "batch")
             return results
             
         except Exception as e:
@@ -275,28 +357,47 @@ class LLMGenerator:
         
         IDIOMA: ESPAÑOL.
         """
+
+        # Misma pregunta + misma justificación => misma explicación
+        cache_key = make_key(
+            "explain", self.provider,
+            question_data.get("question_id") or compute_hash(question_data.get("stem") or ""),
+            compute_hash(question_data.get("rationale") or ""),
+        )
+        if self.cache:
+            cached = self.cache.get(cache_key, "explain")
+            if cached:
+                return cached
         
         try:
+            explanation = None
             if self.provider == "openai" and self.openai_client:
                 response = self.openai_client.chat.completions.create(
                     model="gpt-4o-mini",
                     messages=[{"role": "user", "content": prompt}]
                 )
-                return response.choices[0].message.content
+                explanation = response.choices[0].message.content
                 
             elif self.provider == "groq" and self.openai_client:
                 response = self.openai_client.chat.completions.create(
                     model="llama-3.3-70b-versatile",
                     messages=[{"role": "user", "content": prompt}]
                 )
-                return response.choices[0].message.content
+                explanation = response.choices[0].message.content
                 
             elif self.provider == "gemini":
                 model = genai.GenerativeModel("models/gemini-1.5-flash")
                 response = model.generate_content(prompt)
-                return response.text
-                
-            return "No se pudo conectar con el proveedor de IA para la explicación."
+                explanation = response.text
+
+            elif self.provider == "fake" and self.fake_backend:
+                explanation = self.fake_backend.explain(prompt)
+
+            if not explanation:
+                return "No se pudo conectar con el proveedor de IA para la explicación."
+            if self.cache:
+                self.cache.set(cache_key, explanation, "explain")
+            return explanation
         except Exception as e:
             return f"El tutor tuvo un pequeño problema: {str(e)}"
 
@@ -0,0 +1,75 @@
+"""
+Limitador token-bucket por proveedor de LLM.
+
+Los límites por defecto son conservadores para los niveles gratuitos:
+ajustar PROVIDER_LIMITS si la cuenta tiene más cuota.
+"""
+import threading
+import time
+
+# provider -> (solicitudes por segundo, ráfaga máxima, lotes concurrentes)
+PROVIDER_LIMITS = {
+    "openai": (5.0, 5, 4),
+    "groq": (0.5, 2, 2),     # ~30 RPM en el nivel gratuito
+    "gemini": (0.25, 2, 2),  # ~15 RPM en el nivel gratuito
+    "fake": (50.0, 10, 8),
+}
+DEFAULT_LIMIT = (1.0, 1, 1)
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate` tokens/segundo con capacidad `capacity`."""
+
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """Bloquea hasta obtener `tokens`. Retorna False si se agota el timeout."""
+        deadline = None if timeout is None else self._clock() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None and self._clock() + wait > deadline:
+                return False
+            self._sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> TokenBucket:
+    """Un bucket compartido por proveedor en todo el proceso (todas las sesiones de Streamlit)."""
+    provider = provider.lower()
+    with _limiters_lock:
+        if provider not in _limiters:
+            rate, burst, _ = PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT)
+            _limiters[provider] = TokenBucket(rate, burst)
+        return _limiters[provider]
+
+
+def get_max_concurrency(provider: str) -> int:
+    return PROVIDER_LIMITS.get(provider.lower(), DEFAULT_LIMIT)[2]
@@ -0,0 +1,170 @@
+"""
+Recuperación de fragmentos del documento fuente para los lotes del generador IA.
+
+En lugar de enviar siempre text[:10000], el documento se parte en fragmentos
+por artículo (o por párrafos si no hay artículos), se indexa con BM25 en memoria
+y cada lote recibe un conjunto distinto de fragmentos relacionados entre sí,
+dentro de un presupuesto de tokens. Así los lotes cubren todo el documento y
+cada prompt es más corto.
+"""
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+from core.dedupe import normalize_text
+
+CHARS_PER_TOKEN = 4  # aproximación para español
+DEFAULT_CONTEXT_TOKENS = 1500
+MAX_CHUNK_CHARS = 1500
+
+# Encabezados de artículo: "ARTÍCULO 565.", "Art. 14-1", "ARTICULO 2.2.1" ...
+ARTICLE_RE = re.compile(r"(?im)^[ \t]*(?:art[íi]culo|art\.)[ \t]+\d")
+
+STOPWORDS = frozenset("""
+a al ante bajo con contra de del desde durante el en entre es esta este hasta la las lo los
+o para por que se segun sin sobre su sus un una y ya no le les como mas o u cual cuando donde
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in normalize_text(text).split() if len(t) > 1 and t not in STOPWORDS]
+
+
+def _split_long(segment: str, max_chars: int) -> List[str]:
+    """Parte un segmento largo en límites de oración (o de espacio si no hay)."""
+    out, current = [], ""
+    for sentence in re.split(r"(?<=[.;:])\s+", segment):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                out.append(current)
+                current = ""
+            out.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            out.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        out.append(current)
+    return out
+
+
+def split_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """
+    Fragmentos en orden del documento. Con encabezados de artículo cada artículo
+    es un fragmento (los largos se parten); si no, se agrupan párrafos hasta max_chars.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    starts = [m.start() for m in ARTICLE_RE.finditer(text)]
+    if starts:
+        bounds = ([0] if starts[0] > 0 else []) + starts + [len(text)]
+        segments = [text[a:b].strip() for a, b in zip(bounds, bounds[1:])]
+    else:
+        segments = [p.strip() for p in re.split(r"\n\s*\n", text)]
+
+    chunks, current = [], ""
+    for segment in filter(None, segments):
+        if starts:
+            # Un artículo nunca se mezcla con otro
+            chunks.extend(_split_long(segment, max_chars))
+            continue
+        if len(segment) > max_chars:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend(_split_long(segment, max_chars))
+        elif current and len(current) + len(segment) + 2 > max_chars:
+            chunks.append(current)
+            current = segment
+        else:
+            current = f"{current}\n\n{segment}" if current else segment
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BM25Index:
+    """Índice BM25 en memoria sobre una lista de fragmentos."""
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1, self.b = k1, b
+        self.term_freqs = [Counter(tokenize(c)) for c in chunks]
+        self.lengths = np.array([sum(tf.values()) for tf in self.term_freqs], dtype=np.float64)
+        self.avg_len = float(self.lengths.mean()) if len(chunks) else 0.0
+        df = Counter(term for tf in self.term_freqs for term in tf)
+        n = len(chunks)
+        self.idf = {term: math.log(1 + (n - d + 0.5) / (d + 0.5)) for term, d in df.items()}
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def scores(self, query_tokens: List[str]) -> np.ndarray:
+        out = np.zeros(len(self.chunks), dtype=np.float64)
+        if not self.chunks:
+            return out
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / max(self.avg_len, 1e-9))
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            tf = np.array([freqs.get(term, 0) for freqs in self.term_freqs], dtype=np.float64)
+            out += idf * tf * (self.k1 + 1) / (tf + norm)
+        return out
+
+
+def plan_batch_contexts(text: str, n_batches: int, context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+                        query: Optional[str] = None) -> List[str]:
+    """
+    Un contexto por lote. Si el texto cabe en el presupuesto todos los lotes lo reciben completo.
+    Si no, cada lote parte de un fragmento semilla distinto (el más relevante para `query`,
+    o repartidos a lo largo del documento) y se completa con los fragmentos aún no usados
+    más parecidos a la semilla según BM25, sin pasar del presupuesto. Los fragmentos
+    se presentan en orden del documento.
+    """
+    budget = max(1, context_tokens) * CHARS_PER_TOKEN
+    if n_batches <= 0:
+        return []
+    if len(text) <= budget:
+        return [text] * n_batches
+
+    chunks = split_chunks(text, min(MAX_CHUNK_CHARS, budget))
+    index = BM25Index(chunks)
+    uses = np.zeros(len(chunks), dtype=np.int64)
+    if query and tokenize(query):
+        seed_order = list(np.argsort(-index.scores(tokenize(query)), kind="stable"))
+    else:
+        seed_order = None
+
+    contexts = []
+    for batch in range(n_batches):
+        # Semilla: el fragmento menos usado (y más relevante / mejor repartido)
+        least = uses.min()
+        if seed_order is not None:
+            seed = int(next(i for i in seed_order if uses[i] == least))
+        else:
+            target = (batch * len(chunks)) // n_batches
+            candidates = np.flatnonzero(uses == least)
+            seed = int(candidates[np.argmin(np.abs(candidates - target))])
+
+        similarity = index.scores(list(index.term_freqs[seed]))
+        # Se completa con fragmentos igual de poco usados que la semilla, del más parecido al menos
+        picked, size = [seed], len(chunks[seed])
+        for i in np.argsort(-similarity, kind="stable"):
+            if similarity[i] <= 0:
+                break
+            if i == seed or uses[i] != least or size + len(chunks[i]) + 2 > budget:
+                continue
+            picked.append(int(i))
+            size += len(chunks[i]) + 2
+        uses[picked] += 1
+        contexts.append("\n\n".join(chunks[i] for i in sorted(picked)))
+    return contexts
@@ -0,0 +1,288 @@
+"""
+Corpus sintético a escala de producción (100k–1M preguntas + historial de intentos)
+para pruebas de carga de selección, dedupe, búsqueda y Dashboard.
+
+- Todo el muestreo es vectorizado con numpy por lote y reproducible con `seed`
+  (incluidos los question_id / attempt_id).
+- hash_norm y search_text salen de piezas ya normalizadas (plantillas y catálogo
+  se normalizan una sola vez): no se llama normalize_text por fila. El resultado
+  es idéntico a compute_hash / search_text_for.
+- Una fracción `near_dup_rate` de las preguntas repite otra del mismo lote
+  cambiando solo el monto: casi-duplicados reales para el índice de dedupe.
+- Los intentos se agrupan en simulacros (mismo created_at, como finalize_exam_batch)
+  y aciertan según una habilidad latente por tema que mejora con el tiempo.
+- load_corpus escribe por lotes con la ruta de inserción del banco
+  (insert_questions, ON CONFLICT DO NOTHING) y recalcula habilidades, analítica
+  y repaso espaciado.
+"""
+import datetime
+import hashlib
+import itertools
+import string
+import uuid
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+from sqlalchemy import case, delete, func, select, tuple_
+from sqlalchemy.orm import Session
+
+from core.dedupe import normalize_text
+from core.generators.templates import COMPETENCIES, CONCEPTS, TOPICS, TRACKS
+from core.stem_parts import stem_parts
+from db.models import DEFAULT_USER_ID, Attempt, Question, Skill
+
+DEFAULT_BATCH_SIZE = 10_000
+OPTION_KEYS = "ABCD"
+PERMUTATIONS = np.array(list(itertools.permutations(range(4))), dtype=np.int8)  # 24 x 4
+DIFFICULTY_P = [0.3, 0.45, 0.25]
+
+ACTORS = ["contribuyente", "importador", "exportador", "agente retenedor", "usuario aduanero",
+          "declarante", "servidor público", "ciudadano", "representante legal", "contador"]
+CITIES = ["Bogotá", "Medellín", "Cali", "Barranquilla", "Cartagena", "Bucaramanga", "Cúcuta",
+          "Pereira", "Ibagué", "Santa Marta", "Pasto", "Manizales"]
+
+STEM_TEMPLATES = [
+    "SITUACIÓN: Un {actor} de {city} consulta sobre {topic} en relación con {concept}, por un valor de "
+    "{amount} pesos (expediente {case}). Usted, como funcionario encargado, identifica una posible "
+    "inconsistencia. PREGUNTA: ¿Cuál es la acción correcta según el procedimiento establecido?",
+    "SITUACIÓN: Durante una auditoría interna de {topic} en la seccional {city}, se detecta que no se aplicó "
+    "correctamente el concepto de {concept} a un {actor} (expediente {case}, cuantía {amount} pesos). "
+    "PREGUNTA: ¿Qué medida de corrección es la más adecuada?",
+    "SITUACIÓN: En {city}, un {actor} presenta un recurso por {amount} pesos alegando una interpretación "
+    "distinta de {concept} dentro de {topic} (expediente {case}). PREGUNTA: ¿Cómo debe proceder la DIAN?",
+]
+OPTION_TEMPLATES = [
+    "Aplicar la normativa específica vigente para el caso de {concept}.",
+    "Solicitar una aclaración informal al {actor} sin dejar registro.",
+    "Ignorar la inconsistencia y proceder con el trámite estándar.",
+    "Remitir el caso a otra dependencia sin análisis previo.",
+]
+RATIONALE_TEMPLATE = ("La respuesta correcta aplica {concept} conforme a las reglas de {topic}; "
+                      "las demás opciones omiten el procedimiento o el registro exigido.")
+
+# Catálogo plano: un tema por fila (eje, competencia, tema) y sus conceptos
+CATALOG = [(t, c, topic) for t in TRACKS for c in COMPETENCIES[t] for topic in TOPICS.get(c, ["General"])]
+CATALOG_CONCEPTS = [CONCEPTS.get(topic, ["Concepto General"]) for _, _, topic in CATALOG]
+
+
+class _Template:
+    """Plantilla con sus trozos literales ya normalizados."""
+
+    def __init__(self, text: str):
+        self.parts = [(lit, field) for lit, field, _, _ in string.Formatter().parse(text)]
+        self.norm_literals = [normalize_text(lit) for lit, _ in self.parts]
+
+    def render(self, values: Dict[str, str], norm_values: Dict[str, str]) -> Tuple[str, List[str]]:
+        """(texto, tokens normalizados). Cada campo debe estar separado de las letras vecinas."""
+        raw, norm = [], []
+        for (lit, field), norm_lit in zip(self.parts, self.norm_literals):
+            raw.append(lit)
+            if norm_lit:
+                norm.append(norm_lit)
+            if field:
+                raw.append(values[field])
+                if norm_values[field]:
+                    norm.append(norm_values[field])
+        return "".join(raw), norm
+
+
+_STEMS = [_Template(t) for t in STEM_TEMPLATES]
+_RATIONALE = _Template(RATIONALE_TEMPLATE)
+_NORM = {s: normalize_text(s) for s in
+         ACTORS + CITIES + [t for _, _, t in CATALOG] + [c for cs in CATALOG_CONCEPTS for c in cs]}
+
+
+def _uuids(rng: np.random.Generator, n: int) -> List[str]:
+    raw = rng.bytes(16 * n)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+
+
+def _format_amount(amount: int) -> str:
+    return f"{amount:,}".replace(",", ".")
+
+
+def question_batches(n: int, seed: int = 0, batch_size: int = DEFAULT_BATCH_SIZE, days: int = 365,
+                     near_dup_rate: float = 0.02, end: datetime.datetime = None) -> Iterator[List[dict]]:
+    """Filas listas para insert_questions, en lotes de batch_size."""
+    rng = np.random.default_rng(seed)
+    end = end or datetime.datetime(2026, 1, 1)
+    start = end - datetime.timedelta(days=days)
+    n_concepts = np.array([len(c) for c in CATALOG_CONCEPTS])
+
+    for offset in range(0, n, batch_size):
+        size = min(batch_size, n - offset)
+        topic = rng.integers(0, len(CATALOG), size)
+        concept = (rng.random(size) * n_concepts[topic]).astype(np.int64)
+        template = rng.integers(0, len(_STEMS), size)
+        actor = rng.integers(0, len(ACTORS), size)
+        city = rng.integers(0, len(CITIES), size)
+        amount = rng.integers(100, 500_000, size) * 1000
+        case_no = np.arange(offset, offset + size)
+        difficulty = rng.choice([1, 2, 3], size=size, p=DIFFICULTY_P)
+        perm = PERMUTATIONS[rng.integers(0, len(PERMUTATIONS), size)]
+        seconds = rng.random(size) * days * 86400
+
+        # Casi-duplicados: copian todo de una fila anterior del lote salvo el monto
+        dup = np.flatnonzero(rng.random(size) < near_dup_rate)
+        dup = dup[dup > 0]
+        source = (rng.random(len(dup)) * dup).astype(np.int64)
+        for arr in (topic, concept, template, actor, city, case_no):
+            arr[dup] = arr[source]
+
+        ids = _uuids(rng, size)
+        rows = []
+        for i in range(size):
+            track, competency, topic_name = CATALOG[topic[i]]
+            concept_name = CATALOG_CONCEPTS[topic[i]][concept[i]]
+            values = {"actor": ACTORS[actor[i]], "city": CITIES[city[i]], "topic": topic_name,
+                      "concept": concept_name, "amount": _format_amount(int(amount[i])), "case": str(case_no[i])}
+            norm_values = {"actor": _NORM[values["actor"]], "city": _NORM[values["city"]],
+                           "topic": _NORM[topic_name], "concept": _NORM[concept_name],
+                           "amount": str(amount[i]), "case": values["case"]}
+            stem, stem_norm = _STEMS[template[i]].render(values, norm_values)
+            rationale, rationale_norm = _RATIONALE.render(values, norm_values)
+            # La opción 0 de la plantilla es la correcta; perm[i][k] = opción que va en la letra k
+            options = {OPTION_KEYS[k]: OPTION_TEMPLATES[perm[i][k]].format(**values) for k in range(4)}
+            rows.append({
+                "question_id": ids[i],
+                "track": track,
+                "competency": competency,
+                "topic": topic_name,
+                "macro_dominio": competency,
+                "micro_competencia": topic_name,
+                "difficulty": int(difficulty[i]),
+                "stem": stem,
+                "options_json": options,
+                "correct_key": OPTION_KEYS[int(np.argmin(perm[i]))],
+                "rationale": rationale,
+                "source_refs": "Corpus sintético",
+                "created_at": start + datetime.timedelta(seconds=float(seconds[i])),
+                "hash_norm": hashlib.sha256(" ".join(stem_norm).encode("utf-8")).hexdigest(),
+                "search_text": " ".join(stem_norm + rationale_norm),
+                **stem_parts(stem),
+            })
+        yield rows
+
+
+def attempt_batches(question_ids: np.ndarray, topics: np.ndarray, difficulties: np.ndarray,
+                    correct_keys: np.ndarray, n: int, seed: int = 0, days: int = 365, exam_size: int = 20,
+                    end: datetime.datetime = None, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[List[dict]]:
+    """
+    Historial de `n` intentos en simulacros de exam_size preguntas repartidos en `days` días.
+    question_ids (bytes S36), topics (índice en CATALOG), difficulties y correct_keys (0-3) van alineados.
+    P(acierto) = sigmoid(habilidad_tema + 2 * avance - 0.8 * (dificultad - 2)).
+    """
+    rng = np.random.default_rng(seed + 1)
+    end = end or datetime.datetime(2026, 1, 1)
+    start = end - datetime.timedelta(days=days)
+    ability = rng.normal(-0.5, 0.8, len(CATALOG))
+    n_sessions = -(-n // exam_size)
+    session_seconds = np.sort(rng.random(n_sessions)) * days * 86400
+    # Lotes de simulacros completos: un examen nunca queda partido entre dos lotes
+    sessions_per_batch = max(1, batch_size // exam_size)
+
+    for first in range(0, n_sessions, sessions_per_batch):
+        sessions = np.arange(first, min(first + sessions_per_batch, n_sessions))
+        size = min(len(sessions) * exam_size, n - first * exam_size)
+        session = np.repeat(sessions, exam_size)[:size]
+        q = rng.integers(0, len(question_ids), size)
+        progress = session_seconds[session] / (days * 86400)
+        logit = ability[topics[q]] + 2.0 * progress - 0.8 * (difficulties[q].astype(np.float64) - 2)
+        correct = rng.random(size) < 1 / (1 + np.exp(-logit))
+        wrong_key = (correct_keys[q] + rng.integers(1, 4, size)) % 4
+        chosen = np.where(correct, correct_keys[q], wrong_key)
+        time_sec = np.clip(rng.lognormal(np.log(45), 0.6, size), 5, 600).astype(np.int64)
+        confidence = np.clip(np.round(rng.normal(np.where(correct, 3.8, 2.4), 0.9)), 1, 5).astype(np.int64)
+
+        ids = _uuids(rng, size)
+        created = [start + datetime.timedelta(seconds=float(s)) for s in session_seconds[sessions]]
+        yield [{
+            "attempt_id": ids[i],
+            "question_id": question_ids[q[i]].decode("ascii"),
+            "created_at": created[session[i] - first],
+            "chosen_key": OPTION_KEYS[chosen[i]],
+            "is_correct": bool(correct[i]),
+            "time_sec": int(time_sec[i]),
+            "confidence_1_5": int(confidence[i]),
+        } for i in range(size)]
+
+
+def load_corpus(db: Session, n_questions: int, n_attempts: int = 0, seed: int = 0, days: int = 365,
+                batch_size: int = DEFAULT_BATCH_SIZE, near_dup_rate: float = 0.02,
+                progress_cb: Callable[[str, int, int], None] = None) -> dict:
+    """
+    Inserta el corpus por lotes (commit por lote) y recalcula skills, analítica y
+    review_state. progress_cb(fase, hechas, total). Retorna conteos por tabla.
+    """
+    from core.analytics import rebuild_analytics
+    from core.question_store import insert_questions
+    from core.scheduler import rebuild_review_state
+
+    topic_of = {key: i for i, key in enumerate(CATALOG)}
+    meta_ids, meta_topic, meta_diff, meta_key = [], [], [], []
+    inserted_total, done = 0, 0
+    for rows in question_batches(n_questions, seed, batch_size, days, near_dup_rate):
+        inserted = {qid for qid, _ in insert_questions(db, rows, batch_size)}
+        db.commit()
+        kept = [r for r in rows if r["question_id"] in inserted]
+        meta_ids += [r["question_id"].encode("ascii") for r in kept]
+        meta_topic += [topic_of[(r["track"], r["competency"], r["topic"])] for r in kept]
+        meta_diff += [r["difficulty"] for r in kept]
+        meta_key += [OPTION_KEYS.index(r["correct_key"]) for r in kept]
+        inserted_total += len(kept)
+        done += len(rows)
+        if progress_cb:
+            progress_cb("questions", done, n_questions)
+
+    attempts_total = 0
+    if n_attempts and meta_ids:
+        ids = np.array(meta_ids, dtype="S36")
+        args = (np.array(meta_topic), np.array(meta_diff, dtype=np.int8), np.array(meta_key, dtype=np.int64))
+        del meta_ids, meta_topic, meta_diff, meta_key
+        for rows in attempt_batches(ids, *args, n=n_attempts, seed=seed, days=days, batch_size=batch_size):
+            db.execute(Attempt.__table__.insert(), rows)
+            db.commit()
+            attempts_total += len(rows)
+            if progress_cb:
+                progress_cb("attempts", attempts_total, n_attempts)
+
+    skills = rebuild_synthetic_skills(db)
+    rebuild_analytics(db)
+    review = rebuild_review_state(db)
+    db.commit()
+    return {"questions": inserted_total, "attempts": attempts_total, "skills": skills, "review_state": review}
+
+
+def rebuild_synthetic_skills(db: Session) -> int:
+    """
+    Reemplaza las habilidades de los temas del catálogo del candidato por defecto
+    (el corpus es de un solo candidato): una por tema, con dominio = % de aciertos
+    en attempts (sin commit).
+    """
+    stats = {
+        (r.track, r.competency, r.topic): r for r in db.execute(
+            select(Question.track, Question.competency, Question.topic, func.count().label("n"),
+                   func.sum(case((Attempt.is_correct, 1), else_=0)).label("ok"),
+                   func.max(Attempt.created_at).label("last"))
+            .join(Attempt, Attempt.question_id == Question.question_id)
+            .where(Attempt.user_id == DEFAULT_USER_ID)
+            .group_by(Question.track, Question.competency, Question.topic)
+        )
+    }
+    db.execute(delete(Skill).where(Skill.user_id == DEFAULT_USER_ID,
+                                   tuple_(Skill.track, Skill.competency, Skill.topic).in_(CATALOG)))
+    now = datetime.datetime.utcnow()
+    rows = []
+    for i, (track, competency, topic) in enumerate(CATALOG):
+        s = stats.get((track, competency, topic))
+        rows.append({
+            "skill_id": str(uuid.UUID(int=i + 1, version=4)),
+            "track": track, "competency": competency, "topic": topic,
+            "macro_dominio": competency, "micro_competencia": topic,
+            "mastery_score": round(100.0 * s.ok / s.n, 1) if s else 0.0,
+            "priority_weight": 1.0,
+            "last_seen": s.last if s else None,
+            "updated_at": now,
+        })
+    db.execute(Skill.__table__.insert(), rows)
+    return len(rows)
@@ -1,56 +1,79 @@
+import numpy as np
 import pandas as pd
 
 REQUIRED_COLUMNS = [
-    'track', 
-    'competency', 
-    'topic', 
-    'stem', 
-    'options_A', 
-    'options_B', 
-    'options_C', 
+    'track',
+    'competency',
+    'topic',
+    'stem',
+    'options_A',
+    'options_B',
+    'options_C',
     'correct_key'
 ]
 
-def validate_import_df(df: pd.DataFrame):
+# Campos que no pueden ser nulos
+CRITICAL_FIELDS = ['track', 'stem', 'correct_key', 'options_A', 'options_B', 'options_C']
+VALID_KEYS = ['A', 'B', 'C', 'D']
+
+ERROR_COLUMNS = ['fila', 'campo', 'error']
+
+
+def _is_blank(series: pd.Series) -> pd.Series:
+    return series.isna() | series.astype(str).str.strip().eq("")
+
+
+def validate_import_errors(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Valida que el DataFrame tenga las columnas requeridas y no tenga celdas críticas vacías.
-    Retorna (es_valido, lista_errores)
+    Validación vectorizada (por columnas, sin iterrows).
+    Retorna un DataFrame con una fila por error: fila (numeración Excel), campo, error.
+    Vacío si el archivo es válido.
     """
-    errors = []
-    
-    # 1. Verificar columnas
     missing_cols = [c for c in REQUIRED_COLUMNS if c not in df.columns]
     if missing_cols:
-        errors.append(f"Faltan las columnas: {', '.join(missing_cols)}")
-        return False, errors
-
-    # 2. Verificar filas
-    for index, row in df.iterrows():
-        row_num = index + 2 # Excel starts at 1, +1 for header
-        
-        # Campos que no pueden ser nulos
-        critical_fields = ['track', 'stem', 'correct_key', 'options_A', 'options_B', 'options_C']
-        for field in critical_fields:
-            if pd.isna(row[field]) or str(row[field]).strip() == "":
-                errors.append(f"Fila {row_num}: El campo '{field}' está vacío.")
-        
-        # Opciones D es opcional (algunas IAs generan 3 opciones)
-        if 'options_D' in row and not pd.isna(row['options_D']) and str(row['options_D']).strip() != "":
-            pass # Válido
-        
-        # Validar llave de respuesta
-        if not pd.isna(row['correct_key']):
-            if str(row['correct_key']).strip().upper() not in ['A', 'B', 'C', 'D']:
-                errors.append(f"Fila {row_num}: La respuesta correcta debe ser A, B, C o D.")
-
-        # Validar dificultad (opcional pero debe ser entero si existe)
-        if 'difficulty' in row and not pd.isna(row['difficulty']):
-            try:
-                d = int(float(row['difficulty']))
-                if d < 1 or d > 5:
-                    errors.append(f"Fila {row_num}: La dificultad debe estar entre 1 y 5.")
-            except (ValueError, TypeError):
-                errors.append(f"Fila {row_num}: La dificultad debe ser un número entero.")
+        return pd.DataFrame([{'fila': None, 'campo': ', '.join(missing_cols),
+                              'error': f"Faltan las columnas: {', '.join(missing_cols)}"}], columns=ERROR_COLUMNS)
+
+    row_nums = df.index.to_numpy() + 2 # Excel starts at 1, +1 for header
+    frames = []
+
+    def add(mask, field, message, order):
+        mask = np.asarray(mask, dtype=bool)
+        if mask.any():
+            frames.append(pd.DataFrame({'fila': row_nums[mask], 'campo': field, 'error': message, '_orden': order}))
 
+    for order, field in enumerate(CRITICAL_FIELDS):
+        add(_is_blank(df[field]), field, f"El campo '{field}' está vacío.", order)
+
+    # Validar llave de respuesta
+    keys = df['correct_key']
+    bad_key = keys.notna() & ~keys.astype(str).str.strip().str.upper().isin(VALID_KEYS)
+    add(bad_key, 'correct_key', "La respuesta correcta debe ser A, B, C o D.", len(CRITICAL_FIELDS))
+
+    # Validar dificultad (opcional pero debe ser entero si existe)
+    if 'difficulty' in df.columns:
+        raw = df['difficulty']
+        numeric = pd.to_numeric(raw, errors='coerce')
+        add(raw.notna() & numeric.isna(), 'difficulty', "La dificultad debe ser un número entero.", len(CRITICAL_FIELDS) + 1)
+        truncated = np.trunc(numeric)
+        add(numeric.notna() & ((truncated < 1) | (truncated > 5)), 'difficulty',
+            "La dificultad debe estar entre 1 y 5.", len(CRITICAL_FIELDS) + 1)
+
+    if not frames:
+        return pd.DataFrame(columns=ERROR_COLUMNS)
+    errors = pd.concat(frames, ignore_index=True)
+    return errors.sort_values(['fila', '_orden'], kind='stable').drop(columns='_orden').reset_index(drop=True)
+
+
+def validate_import_df(df: pd.DataFrame):
+    """
+    Valida que el DataFrame tenga las columnas requeridas y no tenga celdas críticas vacías.
+    Retorna (es_valido, lista_errores)
+    """
+    errors_df = validate_import_errors(df)
+    errors = [
+        err if pd.isna(fila) else f"Fila {int(fila)}: {err}"
+        for fila, err in zip(errors_df['fila'], errors_df['error'])
+    ]
     is_valid = len(errors) == 0
     return is_valid, errors
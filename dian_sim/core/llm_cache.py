@@ -0,0 +1,148 @@
+"""
+Caché persistente de respuestas LLM (direccionada por contenido).
+
+Las llaves son sha256 de las partes que determinan la respuesta
+(proveedor, modelo, prompt...). Se guarda en un archivo SQLite junto a la BD
+con expiración por TTL, desalojo LRU y contadores de aciertos/fallos.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from db.side_files import side_db_path
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_TTL_S = 30 * 24 * 3600
+# Cada cuántas escrituras se ejecuta el desalojo
+EVICT_EVERY = 50
+
+
+def make_key(*parts) -> str:
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def default_cache_path() -> str:
+    return side_db_path("llm_cache")
+
+
+class LLMCache:
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_s: float = DEFAULT_TTL_S,
+                 clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries(last_access);
+            CREATE TABLE IF NOT EXISTS counters (
+                kind TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self._conn.commit()
+        self.evict()
+
+    def close(self):
+        self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _count(self, kind: str, hit: bool):
+        col = "hits" if hit else "misses"
+        self._conn.execute(
+            f"INSERT INTO counters(kind, {col}) VALUES (?, 1) "
+            f"ON CONFLICT(kind) DO UPDATE SET {col} = {col} + 1", (kind,)
+        )
+
+    def get(self, key: str, kind: str = "generic") -> Optional[str]:
+        now = self._clock()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl_s:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            self._count(kind, row is not None)
+            if row is None:
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str, kind: str = "generic"):
+        now = self._clock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO entries(key, kind, value, created_at, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, created_at = excluded.created_at, "
+                "last_access = excluded.last_access",
+                (key, kind, value, now, now)
+            )
+            self._writes += 1
+        if self._writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Borra entradas vencidas y las menos usadas recientemente por encima de max_entries."""
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (self._clock() - self.ttl_s,)
+            ).rowcount
+            excess = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += self._conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                    (excess,)
+                ).rowcount
+        return removed
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM counters")
+
+    def stats(self) -> dict:
+        """{kind: {"hits", "misses", "hit_rate"}} más el total de entradas."""
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, hits, misses FROM counters").fetchall()
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        out = {"entries": entries}
+        for kind, hits, misses in rows:
+            total = hits + misses
+            out[kind] = {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+        return out
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache(path: str = None) -> Optional[LLMCache]:
+    """Caché compartida por proceso. None si no se pudo abrir (la app sigue sin caché)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCache(path or default_cache_path())
+            except Exception as e:
+                print(f"⚠️ LLM cache disabled: {e}")
+                return None
+        return _cache
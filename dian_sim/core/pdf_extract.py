@@ -0,0 +1,210 @@
+"""
+Extracción de texto de PDFs en paralelo y con caché en disco.
+
+- Las páginas se reparten en bloques entre un pool de procesos (pypdf es
+  Python puro: con hilos no hay paralelismo real por el GIL).
+- El texto se guarda por página en un SQLite auxiliar indexado por el sha256
+  del archivo: volver a subir el mismo PDF, o pedir otro rango de páginas ya
+  leídas, no vuelve a parsear nada.
+- iter_pages entrega las páginas en orden a medida que terminan, para que la
+  UI vaya mostrando el texto.
+"""
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import pypdf
+
+from db.side_files import side_db_path
+
+CHUNK_PAGES = 8
+# Por debajo de este número de páginas pendientes no compensa arrancar procesos
+MIN_PAGES_FOR_POOL = 16
+
+
+def file_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_page_range(spec: str, n_pages: int) -> List[int]:
+    """
+    '1-5, 10, 20-' -> índices 0-based ordenados y sin repetir (páginas 1-based en el texto).
+    Vacío = todas. ValueError si el rango es inválido.
+    """
+    spec = (spec or "").strip()
+    if not spec:
+        return list(range(n_pages))
+    pages = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start_s, end_s = (p.strip() for p in part.split("-", 1))
+            start = int(start_s) if start_s else 1
+            end = int(end_s) if end_s else n_pages
+        else:
+            start = end = int(part)
+        if start < 1 or end > n_pages or start > end:
+            raise ValueError(f"Rango inválido '{part}' (el documento tiene {n_pages} páginas)")
+        pages.update(range(start - 1, end))
+    return sorted(pages)
+
+
+class PdfTextCache:
+    """Texto por página: (sha256, página) -> texto, más el número de páginas de cada archivo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                sha256 TEXT PRIMARY KEY,
+                n_pages INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                sha256 TEXT NOT NULL,
+                page_no INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (sha256, page_no)
+            );
+        """)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def get_page_count(self, sha: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT n_pages FROM documents WHERE sha256 = ?", (sha,)).fetchone()
+        return row[0] if row else None
+
+    def set_page_count(self, sha: str, n_pages: int):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO documents(sha256, n_pages) VALUES (?, ?)", (sha, n_pages))
+
+    def get_pages(self, sha: str, pages: Sequence[int]) -> dict:
+        """{página: texto} de las que ya están en caché."""
+        out = {}
+        with self._lock:
+            for start in range(0, len(pages), 500):
+                chunk = list(pages[start:start + 500])
+                marks = ",".join("?" * len(chunk))
+                out.update(self._conn.execute(
+                    f"SELECT page_no, text FROM pages WHERE sha256 = ? AND page_no IN ({marks})", (sha, *chunk)
+                ).fetchall())
+        return out
+
+    def set_pages(self, sha: str, items: Sequence[Tuple[int, str]]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages(sha256, page_no, text) VALUES (?, ?, ?)",
+                [(sha, page_no, text) for page_no, text in items]
+            )
+
+
+_cache: Optional[PdfTextCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache(path: str = None) -> Optional[PdfTextCache]:
+    """Caché compartida por proceso. None si no se pudo abrir (se extrae sin caché)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = PdfTextCache(path or side_db_path("pdf_text"))
+            except Exception as e:
+                print(f"⚠️ PDF text cache disabled: {e}")
+                return None
+        return _cache
+
+
+# --- Trabajo en los procesos del pool ---
+_worker_reader: Optional[pypdf.PdfReader] = None
+
+
+def _init_worker(data: bytes):
+    # El PDF viaja una sola vez por proceso, no una vez por bloque
+    global _worker_reader
+    _worker_reader = pypdf.PdfReader(io.BytesIO(data))
+
+
+def _extract_pages(reader: pypdf.PdfReader, pages: Sequence[int]) -> List[Tuple[int, str]]:
+    return [(i, reader.pages[i].extract_text() or "") for i in pages]
+
+
+def _extract_chunk(pages: Sequence[int]) -> List[Tuple[int, str]]:
+    return _extract_pages(_worker_reader, pages)
+
+
+def page_count(data: bytes, sha: str = None, cache: Optional[PdfTextCache] = None) -> int:
+    sha = sha or file_sha256(data)
+    n = cache.get_page_count(sha) if cache else None
+    if n is None:
+        n = len(pypdf.PdfReader(io.BytesIO(data)).pages)
+        if cache:
+            cache.set_page_count(sha, n)
+    return n
+
+
+def iter_pages(data: bytes, pages: Sequence[int] = None, workers: int = None,
+               cache: Optional[PdfTextCache] = None, chunk_pages: int = CHUNK_PAGES) -> Iterator[Tuple[int, str]]:
+    """
+    Genera (página, texto) en orden de página para `pages` (0-based; None = todas).
+    Las páginas en caché salen de inmediato; las demás se extraen en paralelo
+    y se guardan en la caché al terminar cada bloque.
+    """
+    sha = file_sha256(data)
+    if pages is None:
+        pages = range(page_count(data, sha, cache))
+    pages = list(pages)
+    done = cache.get_pages(sha, pages) if cache else {}
+    missing = [p for p in pages if p not in done]
+
+    def drain(pos):
+        # Entrega en orden todo lo contiguo que ya esté disponible
+        while pos < len(pages) and pages[pos] in done:
+            yield pages[pos], done[pages[pos]]
+            pos += 1
+        return pos
+
+    pos = yield from drain(0)
+    if not missing:
+        return
+
+    chunks = [missing[i:i + chunk_pages] for i in range(0, len(missing), chunk_pages)]
+    workers = workers if workers is not None else min(os.cpu_count() or 1, len(chunks))
+    if workers <= 1 or len(missing) < MIN_PAGES_FOR_POOL:
+        reader = pypdf.PdfReader(io.BytesIO(data))
+        for chunk in chunks:
+            items = _extract_pages(reader, chunk)
+            if cache:
+                cache.set_pages(sha, items)
+            done.update(items)
+            pos = yield from drain(pos)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        futures = [pool.submit(_extract_chunk, chunk) for chunk in chunks]
+        try:
+            for future in as_completed(futures):
+                items = future.result()
+                if cache:
+                    cache.set_pages(sha, items)
+                done.update(items)
+                pos = yield from drain(pos)
+        finally:
+            # Si el consumidor abandona el generador, no seguir parseando
+            for future in futures:
+                future.cancel()
+
+
+def extract_text(data: bytes, pages: Sequence[int] = None, **kwargs) -> str:
+    return "\n".join(text for _, text in iter_pages(data, pages, **kwargs))
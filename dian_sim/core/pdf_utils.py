@@ -1,17 +1,47 @@
 from fpdf import FPDF
+from concurrent.futures import ProcessPoolExecutor
 import datetime
+import io
 import os
+import threading
+
+# Logo - Relativizado para el despliegue
+# Subir logo.png a app/assets/ en el repo
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+LOGO_PATH = os.path.join(BASE_DIR, "app", "assets", "logo.png")
+
+_logo_bytes = None  # contenido de logo.png leído una sola vez por proceso (b"" si no hay logo)
+_logo_lock = threading.Lock()
+
+
+def _logo_data():
+    """Bytes del logo (una lectura de disco por proceso). None si no existe o no se puede leer."""
+    global _logo_bytes
+    with _logo_lock:
+        if _logo_bytes is None:
+            try:
+                with open(LOGO_PATH, "rb") as f:
+                    _logo_bytes = f.read()
+            except OSError as e:
+                if os.path.exists(LOGO_PATH):
+                    print(f"⚠️ PDF logo disabled: {e}")
+                _logo_bytes = b""
+        return _logo_bytes or None
+
 
 class DIANSimPDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        # El logo llega desde memoria: header() no vuelve a tocar el disco y fpdf2 lo
+        # decodifica una vez por documento (mismo recurso de imagen en todas las páginas)
+        self.logo = _logo_data()
+        self.has_logo = self.logo is not None
+
     def header(self):
-        # Logo - Relativizado para el despliegue
-        # Subir logo.png a app/assets/ en el repo
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        logo_path = os.path.join(base_dir, "app", "assets", "logo.png")
-        
-        if os.path.exists(logo_path):
-            self.image(logo_path, 10, 8, 50)
-        
+        if self.has_logo:
+            self.image(io.BytesIO(self.logo), 10, 8, 50)
+
         self.set_font('helvetica', 'B', 15)
         self.cell(80)
         self.cell(30, 10, 'Reporte de Simulacro - DIAN Sim', 0, 0, 'C')
@@ -20,69 +50,185 @@ class DIANSimPDF(FPDF):
     def footer(self):
         self.set_y(-15)
         self.set_font('helvetica', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()} | Generado el {datetime.datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 0, 'C')
+        self.cell(0, 10, f'Página {self.page_no()} | Generado el {self.generated_at}', 0, 0, 'C')
+
+
+def clean_text(text):
+    if not text: return ""
+    # Keep latin-1 (Spanish characters) but remove emojis/special symbols
+    try:
+        return str(text).encode('latin-1', 'ignore').decode('latin-1')
+    except:
+        return str(text).encode('ascii', 'ignore').decode('ascii')
 
-def generate_exam_pdf(results_data, questions_details):
+
+def generate_exam_pdf(results_data, questions_details, dest=None):
     """
     Genera un PDF con los resultados del simulacro.
     results_data: dict con total, correct, score, etc.
     questions_details: list de dicts con stem, user_ans, correct_key, rationale.
+    dest: buffer binario o ruta donde escribir; por defecto un BytesIO nuevo.
+    Retorna dest (los buffers quedan posicionados al inicio).
     """
     pdf = DIANSimPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
-    
+
     # Resumen Ejecutivo
     pdf.set_font('helvetica', 'B', 14)
     pdf.cell(0, 10, 'Resumen de Desempeño', 0, 1)
-    
+
     score = results_data.get('score')
     if score is None and results_data.get('total', 0) > 0:
         score = (results_data.get('correct', 0) / results_data['total']) * 100
-    
+
     pdf.set_font('helvetica', '', 12)
     pdf.cell(0, 10, f"Puntaje Total: {score if score is not None else 0:.1f}%", 0, 1)
     pdf.cell(0, 10, f"Respuestas Correctas: {results_data.get('correct', 0)} de {results_data.get('total', 0)}", 0, 1)
     pdf.cell(0, 10, f"Puntos Ganados: +{results_data.get('points_earned', 0)}", 0, 1)
-    
+
     pdf.ln(10)
     pdf.set_font('helvetica', 'B', 14)
     pdf.cell(0, 10, 'Detalle de Preguntas', 0, 1)
     pdf.ln(5)
-    
-    def clean_text(text):
-        if not text: return ""
-        # Keep latin-1 (Spanish characters) but remove emojis/special symbols
-        try:
-            return str(text).encode('latin-1', 'ignore').decode('latin-1')
-        except:
-            return str(text).encode('ascii', 'ignore').decode('ascii')
-    
+
     for i, q in enumerate(questions_details):
         is_right = q['user_ans'] == q['correct_key']
         color = (0, 128, 0) if is_right else (200, 0, 0) # Green or Red
-        
+
         pdf.set_font('helvetica', 'B', 11)
         stem_clean = clean_text(q['stem'])
         pdf.multi_cell(0, 7, f"Pregunta {i+1}: {stem_clean[:150]}...")
-        
+
         pdf.set_font('helvetica', '', 10)
         pdf.set_text_color(*color)
         status = "CORRECTA" if is_right else "INCORRECTA"
         pdf.cell(0, 7, f"Estado: {status}", 0, 1)
-        
+
         pdf.set_text_color(0, 0, 0)
         pdf.cell(0, 7, f"Tu respuesta: {q['user_ans']} | Correcta: {q['correct_key']}", 0, 1)
-        
+
         if q.get('rationale'):
             pdf.set_font('helvetica', 'I', 9)
             rationale_clean = clean_text(q['rationale'])
             pdf.multi_cell(0, 5, f"Justificación: {rationale_clean}")
-        
+
         pdf.ln(5)
         pdf.line(10, pdf.get_y(), 200, pdf.get_y())
         pdf.ln(5)
 
-    import io
-    raw_pdf = pdf.output()
-    return io.BytesIO(bytes(raw_pdf))
+    # Se escribe directo en el destino, sin copiar el documento a un BytesIO intermedio
+    if dest is None:
+        dest = io.BytesIO()
+    pdf.output(dest)
+    if hasattr(dest, "seek"):
+        dest.seek(0)
+    return dest
+
+
+# --- Modo lote: muchos reportes en un pool de procesos ---
+
+def _render_report_job(job):
+    results_data, questions_details, path = job
+    if path is None:
+        return generate_exam_pdf(results_data, questions_details).getvalue()
+    generate_exam_pdf(results_data, questions_details, path)
+    return path
+
+
+def generate_reports_batch(jobs, out_dir=None, workers=None, chunksize=8):
+    """
+    Renderiza varios reportes en paralelo.
+    jobs: lista de (results_data, questions_details, nombre_archivo).
+    Con out_dir cada worker escribe su archivo y se retornan las rutas
+    (los PDFs no viajan de vuelta al proceso principal); sin out_dir se retornan los bytes.
+    """
+    jobs = [(r, d, os.path.join(out_dir, name) if out_dir else None) for r, d, name in jobs]
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    workers = workers if workers is not None else min(os.cpu_count() or 1, len(jobs))
+    if workers <= 1 or len(jobs) <= 1:
+        return [_render_report_job(job) for job in jobs]
+    # Cada proceso decodifica el logo una vez y lo reutiliza en todos sus reportes
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_report_job, jobs, chunksize=chunksize))
+
+
+# Intentos de un mismo candidato separados por menos que esto forman un simulacro.
+# finalize_exam_batch escribe todo el simulacro con el mismo created_at; el finalize
+# anterior escribía una fila tras otra (milisegundos entre respuestas).
+SESSION_GAP_SECONDS = 30
+
+
+def _session_index(db, limit, user_id, gap):
+    """
+    {(user_id, created_at): n° de simulacro}, numerados del más reciente al más antiguo.
+    Recorre los created_at distintos en orden descendente y se detiene en cuanto los
+    `limit` simulacros más recientes quedaron cerrados (se vio un hueco mayor que `gap`).
+    """
+    from sqlalchemy import select
+    from db.models import Attempt
+
+    stamps = select(Attempt.user_id, Attempt.created_at).where(Attempt.created_at.isnot(None))
+    if user_id is not None:
+        stamps = stamps.where(Attempt.user_id == user_id)
+    stamps = stamps.group_by(Attempt.user_id, Attempt.created_at).order_by(Attempt.created_at.desc())
+
+    index, open_sessions, n_sessions = {}, {}, 0  # open_sessions: {user: (n°, created_at más antiguo)}
+    for user, created_at in db.execute(stamps.execution_options(yield_per=1000)):
+        current = open_sessions.get(user)
+        if current is not None and current[1] - created_at <= gap:
+            open_sessions[user] = (current[0], created_at)
+            index[(user, created_at)] = current[0]
+            continue
+        open_sessions.pop(user, None)  # hueco: el simulacro de este candidato terminó
+        if limit and n_sessions >= limit:
+            if not open_sessions:
+                break
+            continue
+        open_sessions[user] = (n_sessions, created_at)
+        index[(user, created_at)] = n_sessions
+        n_sessions += 1
+    return index
+
+
+def session_report_jobs(db, limit=None, user_id=None, gap_seconds=SESSION_GAP_SECONDS):
+    """
+    Trabajos de generate_reports_batch para los simulacros guardados (de `user_id`, o de todos).
+    Un simulacro son los intentos consecutivos de un candidato separados por menos de
+    `gap_seconds` (ver SESSION_GAP_SECONDS).
+    Retorna [(results_data, questions_details, nombre_archivo)], del más reciente al más antiguo.
+    """
+    import re
+    from sqlalchemy import select
+    from db.models import DEFAULT_USER_ID, Attempt, Question
+
+    index = _session_index(db, limit, user_id, datetime.timedelta(seconds=gap_seconds))
+    if not index:
+        return []
+    rows = db.execute(
+        select(Attempt.user_id, Attempt.created_at, Attempt.chosen_key, Attempt.is_correct,
+               Question.stem, Question.correct_key, Question.rationale)
+        .join(Question, Question.question_id == Attempt.question_id)
+        .where(Attempt.created_at >= min(created_at for _, created_at in index),
+               Attempt.user_id.in_({user for user, _ in index}))
+        .order_by(Attempt.created_at, Attempt.attempt_id)
+    ).all()
+
+    grouped = {}
+    for r in rows:
+        n = index.get((r.user_id, r.created_at))
+        if n is not None:
+            grouped.setdefault(n, []).append(r)
+    jobs = []
+    for n in sorted(grouped):
+        items = grouped[n]
+        correct = sum(1 for r in items if r.is_correct)
+        results_data = {"total": len(items), "correct": correct, "score": correct * 100 / len(items)}
+        details = [{"stem": r.stem, "user_ans": r.chosen_key, "correct_key": r.correct_key,
+                    "rationale": r.rationale} for r in items]
+        user, finished_at = items[-1].user_id, items[-1].created_at
+        prefix = "" if user == DEFAULT_USER_ID else re.sub(r"[^\w.-]", "_", user) + "_"
+        jobs.append((results_data, details,
+                     f"Resultado_Simulacro_{prefix}{finished_at.strftime('%Y%m%d_%H%M%S_%f')}.pdf"))
+    return jobs
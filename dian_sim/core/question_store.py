@@ -0,0 +1,295 @@
+"""
+Ruta única de escritura de preguntas al banco.
+
+Todas las altas (generador IA, carga masiva, creación manual) pasan por
+`insert_questions`, que usa INSERT ... ON CONFLICT(hash_norm) DO NOTHING por
+lotes, y por `after_questions_committed` para mantener los índices auxiliares.
+Los borrados pasan por `delete_questions` / `delete_matching` (DELETE ... IN por
+lotes) y `after_questions_deleted`. `backfill_stem_parts` completa las partes del
+enunciado (core.stem_parts) de filas anteriores a esas columnas.
+
+Las altas, bajas y ediciones sueltas por ORM (pruebas, ediciones manuales) pasan
+por los eventos de Question que este módulo registra al importarse: calculan
+search_text y las partes del enunciado, y mantienen taxonomy_facets.
+Toda escritura incrementa la versión del banco (core.bank_version) en su misma
+transacción.
+"""
+import datetime
+import threading
+import time
+import uuid
+from typing import Callable, List, Tuple
+
+import pandas as pd
+from sqlalchemy import bindparam, delete, event, select, update
+from sqlalchemy.orm import Session
+
+from db.bulk import chunked, insert_ignore
+from db.models import Attempt, Question, ReviewState
+from core.analytics import forget_attempts
+from core.bank_search import apply_search
+from core.dedupe import compute_hash, search_text_for
+from core.stem_parts import stem_parts
+from core.taxonomy import facet_key_changed, forget_questions, record_facets
+from core.bank_version import bump_bank_version
+from core.dedupe_index import index_questions, unindex_questions
+
+DEFAULT_CHUNK_SIZE = 1000
+DELETE_CHUNK_SIZE = 500  # ids por DELETE ... IN (...), holgado bajo el límite de parámetros de SQLite
+
+QUESTION_COLUMNS = (
+    "question_id", "track", "competency", "topic", "macro_dominio", "micro_competencia",
+    "difficulty", "stem", "options_json", "correct_key", "rationale", "source_refs",
+    "created_at", "hash_norm", "search_text", "is_situational", "situation_text", "prompt_text",
+)
+BACKFILL_CHUNK = 1000
+
+
+def build_question_row(data: dict) -> dict:
+    """Completa un dict de pregunta (id, hash, fecha) con solo columnas de `questions`."""
+    row = {k: data.get(k) for k in QUESTION_COLUMNS}
+    row["question_id"] = row["question_id"] or str(uuid.uuid4())
+    row["hash_norm"] = row["hash_norm"] or compute_hash(row["stem"] or "")
+    row["created_at"] = row["created_at"] or datetime.datetime.utcnow()
+    row["search_text"] = search_text_for(row["stem"], row["rationale"])
+    row.update(stem_parts(row["stem"]))
+    return row
+
+
+@event.listens_for(Question, "before_insert")
+@event.listens_for(Question, "before_update")
+def _sync_derived_text(mapper, connection, target):
+    # Las inserciones masivas lo calculan en build_question_row
+    target.search_text = search_text_for(target.stem, target.rationale)
+    for name, value in stem_parts(target.stem).items():
+        setattr(target, name, value)
+
+
+# taxonomy_facets y versión del banco para altas/bajas por ORM (insert_questions / _delete_chunk los llevan aparte)
+@event.listens_for(Question, "after_insert")
+def _facet_insert(mapper, connection, target):
+    record_facets(connection, [target], +1)
+    bump_bank_version(connection)
+
+
+@event.listens_for(Question, "after_delete")
+def _facet_delete(mapper, connection, target):
+    record_facets(connection, [target], -1)
+    bump_bank_version(connection)
+
+
+@event.listens_for(Question, "after_update")
+def _facet_update(mapper, connection, target):
+    old = facet_key_changed(target)
+    if old is not None:
+        record_facets(connection, [old], -1)
+        record_facets(connection, [target], +1)
+    bump_bank_version(connection)
+
+
+def insert_questions(db: Session, rows: List[dict], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Tuple[str, str]]:
+    """
+    Inserta filas ya preparadas por lotes, ignorando hash_norm repetidos
+    (contra el banco y dentro del mismo lote), las suma a taxonomy_facets e incrementa la
+    versión del banco. No hace commit.
+    Retorna [(question_id, stem)] de las filas realmente insertadas.
+    """
+    row_by_id = {r["question_id"]: r for r in rows}
+    stmt = insert_ignore(db, Question.__table__, ["hash_norm"], returning=[Question.question_id])
+    inserted = []
+    for chunk in chunked(rows, chunk_size):
+        result = db.execute(stmt, chunk)
+        ids = result.scalars().all()
+        record_facets(db, [row_by_id[qid] for qid in ids])
+        inserted.extend((qid, row_by_id[qid]["stem"]) for qid in ids)
+    if inserted:
+        bump_bank_version(db)
+    return inserted
+
+
+# Por encima de este tamaño el índice de casi-duplicados se actualiza en segundo plano
+BACKGROUND_INDEX_THRESHOLD = 500
+
+
+def after_questions_committed(inserted: List[Tuple[str, str]]):
+    """Hooks posteriores al commit de nuevas preguntas."""
+    if len(inserted) > BACKGROUND_INDEX_THRESHOLD:
+        threading.Thread(target=index_questions, args=(inserted,), daemon=True).start()
+    else:
+        index_questions(inserted)
+
+
+def backfill_stem_parts(conn, recompute: bool = False) -> int:
+    """
+    Calcula is_situational / situation_text / prompt_text por lotes. Sin `recompute`
+    solo toca filas sin calcular (prompt_text NULL). Retorna cuántas actualizó e
+    incrementa la versión del banco si tocó alguna. No hace commit.
+    """
+    table = Question.__table__
+    stmt = (update(table).where(table.c.question_id == bindparam("qid"))
+            .values(is_situational=bindparam("sit"), situation_text=bindparam("situation"),
+                    prompt_text=bindparam("prompt")))
+    query = select(Question.question_id, Question.stem).order_by(Question.question_id).limit(BACKFILL_CHUNK)
+    if not recompute:
+        query = query.where(Question.prompt_text.is_(None))
+    total, last = 0, None
+    while True:
+        # Keyset por question_id: con `recompute` las filas siguen cumpliendo el filtro
+        rows = conn.execute(query if last is None else query.where(Question.question_id > last)).all()
+        if not rows:
+            if total:
+                bump_bank_version(conn)
+            return total
+        params = []
+        for r in rows:
+            parts = stem_parts(r.stem)
+            params.append({"qid": r.question_id, "sit": parts["is_situational"],
+                           "situation": parts["situation_text"], "prompt": parts["prompt_text"]})
+        conn.execute(stmt, params)
+        total += len(rows)
+        last = rows[-1].question_id
+
+
+def after_questions_deleted(question_ids: List[str]):
+    """Hooks posteriores al commit de un borrado."""
+    unindex_questions(question_ids)
+
+
+def _delete_chunk(db: Session, ids: List[str], delete_attempts: bool) -> Tuple[int, int]:
+    if delete_attempts:
+        forget_attempts(db, ids)
+        n_attempts = db.execute(delete(Attempt).where(Attempt.question_id.in_(ids))).rowcount
+    else:
+        # El historial se conserva sin pregunta (lo mismo que hacía db.delete del ORM)
+        db.execute(update(Attempt).where(Attempt.question_id.in_(ids)).values(question_id=None))
+        n_attempts = 0
+    db.execute(delete(ReviewState).where(ReviewState.question_id.in_(ids)))
+    forget_questions(db, ids)
+    n_questions = db.execute(delete(Question).where(Question.question_id.in_(ids))).rowcount
+    if n_questions:
+        bump_bank_version(db)
+    return n_questions, n_attempts
+
+
+def delete_questions(db: Session, question_ids: List[str], delete_attempts: bool = False,
+                     chunk_size: int = DELETE_CHUNK_SIZE) -> dict:
+    """
+    Borra preguntas por lotes de `chunk_size` ids (un DELETE por tabla y lote). No hace commit.
+    Con delete_attempts también borra sus intentos (y los descuenta de la analítica);
+    si no, los intentos quedan con question_id NULL.
+    Retorna {"questions", "attempts", "ids"}; pasar "ids" a after_questions_deleted tras el commit.
+    """
+    ids = sorted(set(question_ids))
+    n_questions = n_attempts = 0
+    for chunk in chunked(ids, chunk_size):
+        q, a = _delete_chunk(db, chunk, delete_attempts)
+        n_questions += q
+        n_attempts += a
+    return {"questions": n_questions, "attempts": n_attempts, "ids": ids}
+
+
+def delete_matching(db: Session, track: str = None, difficulties: list = None, search: str = None,
+                    delete_attempts: bool = False, chunk_size: int = DELETE_CHUNK_SIZE) -> dict:
+    """
+    Borra todas las preguntas que cumplen los filtros del explorador (eje, dificultad,
+    búsqueda FTS) sin cargarlas: cada vuelta toma los siguientes `chunk_size` ids
+    que aún coinciden y los borra. No hace commit. Mismo retorno que delete_questions.
+    """
+    query = db.query(Question.question_id)
+    if track:
+        query = query.filter(Question.track == track)
+    if difficulties:
+        query = query.filter(Question.difficulty.in_(difficulties))
+    if search:
+        query = apply_search(query, search, ranked=False)
+    query = query.order_by(Question.question_id)
+
+    deleted, n_attempts, last = [], 0, None
+    while True:
+        page = query if last is None else query.filter(Question.question_id > last)
+        chunk = [qid for (qid,) in page.limit(chunk_size)]
+        if not chunk:
+            break
+        _, a = _delete_chunk(db, chunk, delete_attempts)
+        n_attempts += a
+        deleted.extend(chunk)
+        last = chunk[-1]
+    return {"questions": len(deleted), "attempts": n_attempts, "ids": deleted}
+
+
+def question_rows_from_import_df(df: pd.DataFrame) -> List[dict]:
+    """
+    Convierte un DataFrame de carga masiva (ya validado) en filas de `questions`,
+    operando por columnas en lugar de df.iterrows().
+    """
+    n = len(df)
+    if n == 0:
+        return []
+
+    def col(name, default=""):
+        if name not in df.columns:
+            return pd.Series([default] * n, index=df.index)
+        return df[name].where(df[name].notna(), default).astype(str)
+
+    stems = df["stem"].astype(str)
+    hashes = stems.map(compute_hash)
+    difficulty = pd.to_numeric(df["difficulty"], errors="coerce") if "difficulty" in df.columns else pd.Series(2, index=df.index)
+    difficulty = difficulty.fillna(2).astype(int)
+    tracks = df["track"].astype(str).str.upper()
+    keys = df["correct_key"].astype(str).str.strip().str.upper()
+    competencies = col("competency", "General")
+    topics = col("topic", "General")
+    rationales = col("rationale", "")
+    opt_a, opt_b, opt_c, opt_d = col("options_A"), col("options_B"), col("options_C"), col("options_D")
+
+    now = datetime.datetime.utcnow()
+    rows = []
+    for stem, h, diff, track, key, comp, topic, rat, a, b, c, d in zip(
+        stems, hashes, difficulty, tracks, keys, competencies, topics, rationales, opt_a, opt_b, opt_c, opt_d
+    ):
+        options = {"A": a, "B": b, "C": c}
+        if d.strip():
+            options["D"] = d
+        rows.append({
+            "question_id": str(uuid.uuid4()),
+            "track": track,
+            "competency": comp,
+            "topic": topic,
+            "macro_dominio": None,
+            "micro_competencia": None,
+            "difficulty": int(diff),
+            "stem": stem,
+            "options_json": options,
+            "correct_key": key,
+            "rationale": rat,
+            "source_refs": None,
+            "created_at": now,
+            "hash_norm": h,
+            "search_text": search_text_for(stem, rat),
+            **stem_parts(stem),
+        })
+    return rows
+
+
+def import_dataframe(db: Session, df: pd.DataFrame, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     progress_cb: Callable[[int, int], None] = None) -> dict:
+    """
+    Carga masiva por bloques: cada bloque se prepara por columnas y se inserta con
+    un único INSERT ... ON CONFLICT DO NOTHING. Hace commit al final.
+    progress_cb(filas_procesadas, total) se invoca tras cada bloque.
+    """
+    t0 = time.perf_counter()
+    total = len(df)
+    inserted = []
+    for start in range(0, total, chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        inserted.extend(insert_questions(db, question_rows_from_import_df(chunk), chunk_size))
+        if progress_cb:
+            progress_cb(min(start + chunk_size, total), total)
+    db.commit()
+    after_questions_committed(inserted)
+    return {
+        "inserted": len(inserted),
+        "duplicates": total - len(inserted),
+        "elapsed_s": time.perf_counter() - t0,
+    }
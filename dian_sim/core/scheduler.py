@@ -0,0 +1,179 @@
+"""
+Programador de repaso espaciado (estilo SM-2) por candidato y pregunta.
+
+Cada respuesta actualiza en review_state la estabilidad (días hasta el próximo
+repaso), el factor de crecimiento y la fecha de vencimiento `due_at`. La cola
+de pendientes es el índice (user_id, due_at, question_id): armar una sesión de k
+preguntas cuesta un recorrido de rango O(k log n), sin escanear el banco.
+
+Modos de selección del simulacro:
+- MODE_REVIEW:   primero las pendientes más vencidas; el resto se completa con
+                 la mezcla adaptativa 60/25/15 (core.selection).
+- MODE_ADAPTIVE: solo la mezcla 60/25/15 (comportamiento anterior).
+"""
+import datetime
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select, tuple_
+
+from db.bulk import chunked, upsert
+from db.models import DEFAULT_USER_ID, Attempt, Question, ReviewState
+
+MODE_REVIEW = "review"
+MODE_ADAPTIVE = "adaptive"
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+MAX_EASE = 3.0
+EASE_STEP_UP = 0.1
+EASE_STEP_DOWN = 0.2
+FIRST_INTERVAL_DAYS = 1.0
+SECOND_INTERVAL_DAYS = 3.0
+LAPSE_FACTOR = 0.3            # la estabilidad se reduce al 30% tras un error
+MIN_STABILITY_DAYS = 1 / 24   # una pregunta fallada vuelve a estar pendiente en ~1 hora
+
+DUE_BATCH_SIZE = 200
+WRITE_CHUNK_SIZE = 1000
+
+
+class Review(NamedTuple):
+    stability: float
+    ease: float
+    reps: int
+    lapses: int
+    last_review: datetime.datetime
+    due_at: datetime.datetime
+
+
+def next_review(prev: Optional[Review], is_correct: bool, now: datetime.datetime) -> Review:
+    """Nuevo estado de una pregunta tras responderla en `now`."""
+    if prev is None:
+        stability, ease, reps, lapses = 0.0, INITIAL_EASE, 0, 0
+    else:
+        stability, ease, reps, lapses = prev.stability, prev.ease, prev.reps, prev.lapses
+
+    if is_correct:
+        reps += 1
+        if reps == 1:
+            stability = max(FIRST_INTERVAL_DAYS, stability)
+        elif reps == 2:
+            stability = max(SECOND_INTERVAL_DAYS, stability)
+        else:
+            stability = stability * ease
+        ease = min(MAX_EASE, ease + EASE_STEP_UP)
+    else:
+        reps = 0
+        lapses += 1
+        ease = max(MIN_EASE, ease - EASE_STEP_DOWN)
+        stability = max(MIN_STABILITY_DAYS, stability * LAPSE_FACTOR)
+
+    return Review(stability, ease, reps, lapses, now, now + datetime.timedelta(days=stability))
+
+
+def _review_rows(states: dict) -> List[dict]:
+    """states: {(user_id, question_id): Review}."""
+    return [{"user_id": user_id, "question_id": qid, **r._asdict()} for (user_id, qid), r in states.items()]
+
+
+def _upsert_reviews(db):
+    return upsert(db, ReviewState.__table__, ["user_id", "question_id"], list(Review._fields))
+
+
+def record_reviews(db, results: Iterable[Tuple[str, bool]], now: datetime.datetime = None,
+                   user_id: str = DEFAULT_USER_ID) -> int:
+    """
+    Aplica las respuestas de un examen de `user_id` [(question_id, is_correct)] a
+    review_state (una consulta + un upsert, sin commit). Retorna cuántas preguntas se programaron.
+    """
+    results = list(results)
+    if not results:
+        return 0
+    now = now or datetime.datetime.utcnow()
+    ids = list({qid for qid, _ in results})
+    states = {
+        (user_id, r.question_id): Review(r.stability, r.ease, r.reps, r.lapses, r.last_review, r.due_at)
+        for r in db.execute(select(ReviewState).where(ReviewState.user_id == user_id,
+                                                      ReviewState.question_id.in_(ids))).scalars()
+    }
+    for qid, is_correct in results:
+        states[(user_id, qid)] = next_review(states.get((user_id, qid)), is_correct, now)
+
+    db.execute(_upsert_reviews(db), _review_rows(states))
+    return len(states)
+
+
+def due_question_ids(db, k: int, now: datetime.datetime = None,
+                     accept: Callable[[str], bool] = None, batch_size: int = DUE_BATCH_SIZE,
+                     user_id: str = DEFAULT_USER_ID) -> List[str]:
+    """
+    Hasta k preguntas vencidas de `user_id`, las más atrasadas primero.
+    Recorre el índice por llave (due_at, question_id) en lotes; `accept` permite
+    descartar las que no pasan los filtros del formulario sin cargar el banco.
+    """
+    if k <= 0:
+        return []
+    now = now or datetime.datetime.utcnow()
+    selected, cursor = [], None
+    while len(selected) < k:
+        stmt = select(ReviewState.due_at, ReviewState.question_id) \
+            .where(ReviewState.user_id == user_id, ReviewState.due_at <= now)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(ReviewState.due_at, ReviewState.question_id) > tuple_(*cursor))
+        rows = db.execute(stmt.order_by(ReviewState.due_at, ReviewState.question_id).limit(batch_size)).all()
+        for _, qid in rows:
+            if accept is None or accept(qid):
+                selected.append(qid)
+                if len(selected) == k:
+                    break
+        if len(rows) < batch_size:
+            break
+        cursor = tuple(rows[-1])
+    return selected
+
+
+def count_due(db, now: datetime.datetime = None, user_id: str = DEFAULT_USER_ID) -> int:
+    now = now or datetime.datetime.utcnow()
+    return db.execute(select(func.count()).select_from(ReviewState)
+                      .where(ReviewState.user_id == user_id, ReviewState.due_at <= now)).scalar() or 0
+
+
+def select_review_session(db, pool, n: int, mask: np.ndarray = None, now: datetime.datetime = None,
+                          rng: np.random.Generator = None, user_id: str = DEFAULT_USER_ID) -> Tuple[List[str], int]:
+    """
+    Sesión de repaso: pendientes primero y el resto con pool.select (60/25/15).
+    Retorna (question_ids barajados, cuántas eran pendientes).
+    """
+    rng = rng or np.random.default_rng()
+
+    def accept(qid):
+        i = pool.index_of(qid)
+        return i is not None and (mask is None or bool(mask[i]))
+
+    due = due_question_ids(db, n, now, accept=accept, user_id=user_id)
+    selected = list(due)
+    if len(selected) < n:
+        remaining = np.ones(len(pool), dtype=bool) if mask is None else mask.copy()
+        remaining[[pool.index_of(qid) for qid in due]] = False
+        selected += pool.select(n - len(selected), mask=remaining, rng=rng)
+    rng.shuffle(selected)
+    return selected, len(due)
+
+
+def rebuild_review_state(db) -> int:
+    """Reconstruye review_state reproduciendo el historial de attempts (backfill, sin commit)."""
+    db.execute(ReviewState.__table__.delete())
+    rows = db.execute(
+        select(Attempt.user_id, Attempt.question_id, Attempt.is_correct, Attempt.created_at)
+        .join(Question, Question.question_id == Attempt.question_id)  # omite preguntas borradas
+        .where(Attempt.created_at.isnot(None))
+        .order_by(Attempt.created_at)
+    )
+    states = {}
+    for user_id, qid, is_correct, created_at in rows:
+        states[(user_id, qid)] = next_review(states.get((user_id, qid)), bool(is_correct), created_at)
+
+    stmt = _upsert_reviews(db)
+    for chunk in chunked(_review_rows(states), WRITE_CHUNK_SIZE):
+        db.execute(stmt, chunk)
+    return len(states)
@@ -0,0 +1,274 @@
+"""
+Motor de selección adaptativa sobre un snapshot compacto del banco.
+
+En lugar de recorrer objetos ORM, el banco se representa como arreglos NumPy
+(question_id, índice de habilidad, dificultad) y cada bucket de dominio
+(débil / medio / fuerte) mantiene su propio arreglo de índices. Cuando cambia
+el `mastery_score` de una habilidad solo se mueven las preguntas de esa
+habilidad entre buckets.
+
+La estructura del banco es común a todos los candidatos; el dominio y la
+prioridad son de cada uno. get_question_pool(db, user_id) comparte los arreglos
+del banco entre candidatos y solo calcula por candidato su capa de habilidades.
+"""
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.adaptive import user_skills_map
+from core.bank_version import get_bank_version
+from db.models import DEFAULT_USER_ID, Question
+
+# Umbrales de dominio (mismos que select_questions_for_simulation)
+WEAK_THRESHOLD = 50.0
+STRONG_THRESHOLD = 80.0
+
+BUCKET_WEAK, BUCKET_MEDIUM, BUCKET_STRONG = 0, 1, 2
+
+# Mezcla objetivo: 60% débiles, 25% medias, 15% fuertes
+TARGET_MIX = (0.60, 0.25)
+
+
+def mastery_bucket(mastery):
+    """Bucket de dominio para un escalar o un arreglo de mastery_score."""
+    mastery = np.asarray(mastery, dtype=np.float32)
+    return np.where(mastery < WEAK_THRESHOLD, BUCKET_WEAK,
+                    np.where(mastery < STRONG_THRESHOLD, BUCKET_MEDIUM, BUCKET_STRONG)).astype(np.int8)
+
+
+def weighted_sample(rng: np.random.Generator, pool: np.ndarray, weights: np.ndarray, k: int) -> np.ndarray:
+    """
+    Muestreo ponderado sin reemplazo (Efraimidis-Spirakis).
+    pool: índices candidatos, weights: peso de cada candidato (alineado con pool).
+    """
+    if k <= 0 or pool.size == 0:
+        return pool[:0]
+    if k >= pool.size:
+        return rng.permutation(pool)
+    w = np.maximum(weights, 1e-6)
+    keys = np.log(rng.random(pool.size)) / w
+    top = np.argpartition(keys, pool.size - k)[pool.size - k:]
+    return pool[top]
+
+
+class QuestionPool:
+    """
+    Snapshot en memoria del banco para selección adaptativa.
+    skill_keys: lista de (track, competency, topic); skill_idx apunta a ella.
+    """
+
+    def __init__(self, question_ids, skill_keys, skill_idx, difficulty, situational=None, skills_map: dict = None):
+        self.question_ids = np.asarray(question_ids, dtype=object)
+        self.skill_keys = list(skill_keys)
+        self._key_to_idx = {k: i for i, k in enumerate(self.skill_keys)}
+        self.skill_idx = np.asarray(skill_idx, dtype=np.int32)
+        self.difficulty = np.asarray(difficulty, dtype=np.int8)
+        n = self.question_ids.size
+        self.situational = np.ones(n, dtype=bool) if situational is None else np.asarray(situational, dtype=bool)
+
+        n_skills = len(self.skill_keys)
+        self.mastery = np.zeros(n_skills, dtype=np.float32)
+        self.priority = np.ones(n_skills, dtype=np.float32)
+        for key, skill in (skills_map or {}).items():
+            i = self._key_to_idx.get(key)
+            if i is not None:
+                self.mastery[i] = skill.mastery_score or 0.0
+                self.priority[i] = skill.priority_weight or 1.0
+        self.skill_bucket = mastery_bucket(self.mastery)
+
+        # Preguntas agrupadas por habilidad: _members[_bounds[i]:_bounds[i+1]]
+        self._members = np.argsort(self.skill_idx, kind="stable").astype(np.int64)
+        self._bounds = np.searchsorted(self.skill_idx[self._members], np.arange(n_skills + 1))
+
+        self._init_buckets()
+        self._id_to_idx = None  # se construye al primer index_of (modo repaso)
+
+    def _init_buckets(self):
+        q_bucket = self.skill_bucket[self.skill_idx] if len(self) else np.zeros(0, dtype=np.int8)
+        self.buckets = [np.flatnonzero(q_bucket == b) for b in (BUCKET_WEAK, BUCKET_MEDIUM, BUCKET_STRONG)]
+        self._lock = threading.Lock()
+
+    def with_skills(self, skills_map: dict) -> "QuestionPool":
+        """
+        Copia con el dominio/prioridad de otro candidato. Comparte los arreglos del
+        banco (ids, habilidad, dificultad, agrupación); solo recalcula los buckets.
+        """
+        pool = object.__new__(QuestionPool)
+        pool.__dict__.update({k: v for k, v in self.__dict__.items() if k not in ("buckets", "_lock")})
+        pool.mastery = np.zeros(len(self.skill_keys), dtype=np.float32)
+        pool.priority = np.ones(len(self.skill_keys), dtype=np.float32)
+        for key, skill in skills_map.items():
+            i = self._key_to_idx.get(key)
+            if i is not None:
+                pool.mastery[i] = skill.mastery_score or 0.0
+                pool.priority[i] = skill.priority_weight or 1.0
+        pool.skill_bucket = mastery_bucket(pool.mastery)
+        pool._init_buckets()
+        return pool
+
+    def __len__(self):
+        return int(self.question_ids.size)
+
+    @classmethod
+    def from_db(cls, db: Session, user_id: Optional[str] = DEFAULT_USER_ID) -> "QuestionPool":
+        """
+        Snapshot con el dominio de `user_id`: una consulta de columnas (sin objetos ORM)
+        + sus habilidades. user_id=None: solo el banco, todo en dominio 0.
+        """
+        rows = db.execute(select(
+            Question.question_id,
+            Question.track,
+            Question.competency,
+            Question.topic,
+            Question.difficulty,
+            Question.is_situational,
+        )).all()
+        df = pd.DataFrame(rows, columns=["question_id", "track", "competency", "topic", "difficulty", "situational"])
+        skills_map = user_skills_map(db, user_id) if user_id is not None else {}
+        if df.empty:
+            return cls([], [], [], [], [], skills_map)
+
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(df[["track", "competency", "topic"]]))
+        return cls(
+            df["question_id"].to_numpy(dtype=object),
+            list(uniques),
+            codes,
+            df["difficulty"].fillna(2).to_numpy(dtype=np.int8),
+            df["situational"].fillna(False).to_numpy(dtype=bool),
+            skills_map,
+        )
+
+    def index_of(self, question_id: str) -> Optional[int]:
+        """Posición de una pregunta en el snapshot (None si no está)."""
+        if self._id_to_idx is None:
+            self._id_to_idx = {qid: i for i, qid in enumerate(self.question_ids.tolist())}
+        return self._id_to_idx.get(question_id)
+
+    def _skill_members(self, i: int) -> np.ndarray:
+        return self._members[self._bounds[i]:self._bounds[i + 1]]
+
+    def update_skill(self, key: tuple, mastery_score: float, priority_weight: float = None):
+        """Actualiza una habilidad y mueve sus preguntas de bucket si cambió de nivel."""
+        i = self._key_to_idx.get(key)
+        if i is None:
+            return
+        with self._lock:
+            self.mastery[i] = mastery_score
+            if priority_weight is not None:
+                self.priority[i] = priority_weight
+            new_bucket = int(mastery_bucket(mastery_score))
+            old_bucket = int(self.skill_bucket[i])
+            if new_bucket == old_bucket:
+                return
+            members = self._skill_members(i)
+            old = self.buckets[old_bucket]
+            self.buckets[old_bucket] = old[self.skill_idx[old] != i]
+            self.buckets[new_bucket] = np.concatenate([self.buckets[new_bucket], members])
+            self.skill_bucket[i] = new_bucket
+
+    def mask(self, tracks=None, competencies=None, topics=None, difficulties=None, only_situational=False) -> Optional[np.ndarray]:
+        """Máscara booleana por pregunta para los filtros del formulario (None = sin filtro)."""
+        allowed_skill = None
+        for pos, values in ((0, tracks), (1, competencies), (2, topics)):
+            if values:
+                values = set(values)
+                hit = np.fromiter((k[pos] in values for k in self.skill_keys), dtype=bool, count=len(self.skill_keys))
+                allowed_skill = hit if allowed_skill is None else (allowed_skill & hit)
+
+        mask = None
+        if allowed_skill is not None:
+            mask = allowed_skill[self.skill_idx]
+        if difficulties:
+            diff_mask = np.isin(self.difficulty, list(difficulties))
+            mask = diff_mask if mask is None else (mask & diff_mask)
+        if only_situational:
+            mask = self.situational if mask is None else (mask & self.situational)
+        return mask
+
+    def count(self, mask: np.ndarray = None) -> int:
+        return len(self) if mask is None else int(mask.sum())
+
+    def select(self, n: int = 20, mask: np.ndarray = None, rng: np.random.Generator = None) -> List[str]:
+        """
+        Selección adaptativa 60/25/15 ponderada por priority_weight.
+        Devuelve la lista de question_id seleccionados (barajada).
+        """
+        rng = rng or np.random.default_rng()
+        with self._lock:
+            priority = self.priority.copy()
+            pools = [b if mask is None else b[mask[b]] for b in self.buckets]
+
+        def sample(pool, k):
+            return weighted_sample(rng, pool, priority[self.skill_idx[pool]], k)
+
+        n_weak = int(n * TARGET_MIX[0])
+        n_medium = int(n * TARGET_MIX[1])
+
+        chosen = [sample(pools[BUCKET_WEAK], n_weak)]
+        # Si faltan débiles, se completan con medias
+        remaining_weak = n_weak - chosen[0].size
+        chosen.append(sample(pools[BUCKET_MEDIUM], n_medium + remaining_weak))
+        taken = sum(c.size for c in chosen)
+        chosen.append(sample(pools[BUCKET_STRONG], n - taken))
+        selected = np.concatenate(chosen)
+
+        # Respaldo final: completar con cualquier pregunta no seleccionada
+        if selected.size < n:
+            available = np.ones(len(self), dtype=bool) if mask is None else mask.copy()
+            available[selected] = False
+            extra = sample(np.flatnonzero(available), n - selected.size)
+            selected = np.concatenate([selected, extra])
+
+        rng.shuffle(selected)
+        return self.question_ids[selected].tolist()
+
+
+# --- Snapshot compartido por proceso (Streamlit ejecuta las sesiones en hilos) ---
+# _pool: banco sin habilidades; _user_pools: {user_id: copia con su dominio}
+_pool: Optional[QuestionPool] = None
+_user_pools: Dict[str, QuestionPool] = {}
+_pool_version = None
+_pool_lock = threading.Lock()
+
+
+def get_question_pool(db: Session, user_id: str = DEFAULT_USER_ID) -> QuestionPool:
+    """
+    Snapshot vigente de `user_id`. El banco se reconstruye solo si cambió su versión
+    (core.bank_version: inserciones, borrados y recálculos como el de is_situational);
+    la capa de habilidades del candidato se carga la primera vez que la pide.
+    """
+    global _pool, _pool_version
+    version = get_bank_version(db)
+    with _pool_lock:
+        if _pool is None or version != _pool_version:
+            _pool = QuestionPool.from_db(db, user_id=None)
+            _user_pools.clear()
+            _pool_version = version
+        pool = _user_pools.get(user_id)
+        if pool is None:
+            pool = _user_pools[user_id] = _pool.with_skills(user_skills_map(db, user_id))
+        return pool
+
+
+def invalidate_question_pool():
+    global _pool, _pool_version
+    with _pool_lock:
+        _pool = None
+        _user_pools.clear()
+        _pool_version = None
+
+
+def update_pool_skills(skill_updates: dict, user_id: str = DEFAULT_USER_ID):
+    """
+    Propaga cambios de mastery/priority al snapshot cargado del candidato (si existe).
+    skill_updates: {(track, competency, topic): (mastery_score, priority_weight)}
+    """
+    pool = _user_pools.get(user_id)
+    if pool is None:
+        return
+    for key, (mastery, priority) in skill_updates.items():
+        pool.update_skill(key, mastery or 0.0, priority)
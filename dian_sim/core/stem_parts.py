@@ -0,0 +1,36 @@
+"""
+Partes del enunciado de una pregunta, calculadas una sola vez al insertar.
+
+Los enunciados situacionales tienen la forma 'SITUACIÓN: caso... PREGUNTA: enunciado'.
+questions.is_situational / situation_text / prompt_text guardan el resultado para que
+la selección filtre con un índice y la ejecución no vuelva a partir el texto.
+"""
+from typing import Optional, Tuple
+
+SITUATION_MARK = "SITUACIÓN:"
+QUESTION_MARK = "PREGUNTA:"
+SITUATION_WORD = "SITUACIÓN"
+
+STEM_PART_COLUMNS = ("is_situational", "situation_text", "prompt_text")
+
+
+def split_stem(stem: str) -> Tuple[Optional[str], str]:
+    """'SITUACIÓN: caso... PREGUNTA: enunciado' -> (caso, enunciado). Sin marcas: (None, stem)."""
+    stem = stem or ""
+    if SITUATION_MARK in stem and QUESTION_MARK in stem:
+        situation, question = stem.split(QUESTION_MARK, 1)
+        return situation.replace(SITUATION_MARK, "").strip(), question.strip()
+    return None, stem
+
+
+def stem_parts(stem: str) -> dict:
+    """
+    {is_situational, situation_text, prompt_text} de un enunciado.
+    is_situational conserva el criterio del filtro anterior (stem ILIKE '%SITUACIÓN%').
+    """
+    situation, prompt = split_stem(stem)
+    return {
+        "is_situational": SITUATION_WORD in (stem or "").upper(),
+        "situation_text": situation,
+        "prompt_text": prompt,
+    }
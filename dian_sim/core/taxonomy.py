@@ -0,0 +1,151 @@
+"""
+Catálogo de taxonomía del banco para el formulario de simulacro.
+
+taxonomy_facets guarda cuántas preguntas hay por (eje, competencia, tema,
+macro-dominio, micro-competencia, dificultad, situacional). Lo mantienen las
+rutas de escritura del banco en la misma transacción:
+- core.question_store: insert_questions suma las filas insertadas y
+  _delete_chunk descuenta (forget_questions) antes de borrar.
+- Altas, bajas y ediciones por ORM: eventos de Question registrados en
+  core.question_store.
+rebuild_taxonomy lo recalcula desde cero (copia a la nube, backfill de partes
+del enunciado).
+
+get_taxonomy cachea el catálogo en el proceso con la versión del banco
+(core.bank_version, guardada en la BD): por rerun solo se lee esa versión, y el
+catálogo se recarga cuando cualquier proceso escribe el banco o lo reconstruye.
+"""
+import threading
+from collections import Counter
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from sqlalchemy import delete, func, inspect, insert, select
+
+from db.bulk import upsert_increment
+from db.models import Question, TaxonomyFacet
+from core.bank_version import bump_bank_version, get_bank_version
+
+FACET_COLUMNS = ("track", "competency", "topic", "macro_dominio", "micro_competencia", "difficulty", "is_situational")
+
+
+def facet_key(row) -> tuple:
+    """Llave de faceta de una pregunta (dict, fila o objeto ORM). Macro/micro NULL -> ""."""
+    get = row.get if isinstance(row, Mapping) else (lambda col: getattr(row, col))
+    return (get("track"), get("competency"), get("topic"), get("macro_dominio") or "",
+            get("micro_competencia") or "", int(get("difficulty") or 0), bool(get("is_situational")))
+
+
+def apply_facet_deltas(db, deltas: Dict[tuple, int]):
+    """Suma deltas {llave: Δpreguntas} a taxonomy_facets sin hacer commit."""
+    deltas = {k: n for k, n in deltas.items() if n}
+    if not deltas:
+        return
+    db.execute(upsert_increment(db, TaxonomyFacet.__table__, FACET_COLUMNS, ["question_count"]),
+               [{**dict(zip(FACET_COLUMNS, key)), "question_count": n} for key, n in deltas.items()])
+    if any(n < 0 for n in deltas.values()):
+        db.execute(delete(TaxonomyFacet).where(TaxonomyFacet.question_count <= 0))
+
+
+def record_facets(db, rows: Iterable, sign: int = 1):
+    """Cuenta (sign=1) o descuenta (sign=-1) estas preguntas."""
+    apply_facet_deltas(db, {key: sign * n for key, n in Counter(facet_key(r) for r in rows).items()})
+
+
+def forget_questions(db, question_ids: List[str]):
+    """Descuenta estas preguntas antes de borrarlas (una consulta agrupada, sin commit)."""
+    cols = [Question.__table__.c[c] for c in FACET_COLUMNS]
+    rows = db.execute(select(*cols, func.count()).where(Question.question_id.in_(question_ids))
+                      .group_by(*cols)).all()
+    apply_facet_deltas(db, {facet_key(r): -r[-1] for r in rows})
+
+
+def facet_key_changed(target) -> Optional[dict]:
+    """Valores anteriores de las columnas de faceta de un objeto ORM editado (None si no cambiaron)."""
+    state = inspect(target)
+    old, changed = {}, False
+    for col in FACET_COLUMNS:
+        history = state.attrs[col].history
+        if history.deleted:
+            old[col], changed = history.deleted[0], True
+        else:
+            old[col] = getattr(target, col)
+    return old if changed else None
+
+
+def rebuild_taxonomy(db) -> int:
+    """
+    Recalcula taxonomy_facets desde questions e incrementa la versión del banco para
+    que los catálogos cacheados se recarguen (sin commit). Retorna el número de facetas.
+    """
+    q = Question.__table__.c
+    db.execute(delete(TaxonomyFacet))
+    db.execute(insert(TaxonomyFacet).from_select(
+        list(FACET_COLUMNS) + ["question_count"],
+        select(q.track, q.competency, q.topic, func.coalesce(q.macro_dominio, ""),
+               func.coalesce(q.micro_competencia, ""), func.coalesce(q.difficulty, 0), q.is_situational,
+               func.count())
+        .group_by(q.track, q.competency, q.topic, func.coalesce(q.macro_dominio, ""),
+                  func.coalesce(q.micro_competencia, ""), func.coalesce(q.difficulty, 0), q.is_situational)
+    ))
+    bump_bank_version(db)
+    return db.execute(select(func.count()).select_from(TaxonomyFacet)).scalar()
+
+
+class TaxonomyCatalog:
+    """Facetas del banco en memoria (inmutable); los conteos por filtro se memorizan."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.tracks = sorted(t for t in df["track"].unique() if t)
+        self.competencies = sorted(c for c in df["competency"].unique() if c)
+        self.topics = sorted(t for t in df["topic"].unique() if t)
+        self.total = int(df["question_count"].sum())
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def count(self, tracks=None, competencies=None, topics=None, difficulties=None, only_situational=False) -> int:
+        """Preguntas disponibles para los filtros del formulario (vacío = sin filtro)."""
+        signature = tuple(tuple(sorted(v)) if v else () for v in (tracks, competencies, topics, difficulties)) \
+            + (bool(only_situational),)
+        with self._lock:
+            hit = self._counts.get(signature)
+        if hit is not None:
+            return hit
+        mask = pd.Series(True, index=self.df.index)
+        for col, values in (("track", tracks), ("competency", competencies), ("topic", topics),
+                            ("difficulty", difficulties)):
+            if values:
+                mask &= self.df[col].isin(list(values))
+        if only_situational:
+            mask &= self.df["is_situational"]
+        value = int(self.df.loc[mask, "question_count"].sum())
+        with self._lock:
+            self._counts[signature] = value
+        return value
+
+
+_cache = None  # (versión del banco, TaxonomyCatalog)
+_cache_lock = threading.Lock()
+
+
+def load_taxonomy(db) -> TaxonomyCatalog:
+    rows = db.execute(select(*[TaxonomyFacet.__table__.c[c] for c in FACET_COLUMNS],
+                             TaxonomyFacet.question_count)).all()
+    df = pd.DataFrame(rows, columns=list(FACET_COLUMNS) + ["question_count"])
+    df["is_situational"] = df["is_situational"].astype(bool)
+    return TaxonomyCatalog(df)
+
+
+def get_taxonomy(db) -> TaxonomyCatalog:
+    """Catálogo cacheado; se vuelve a leer (una consulta) solo si cambió la versión del banco."""
+    global _cache
+    version = get_bank_version(db)
+    with _cache_lock:
+        if _cache is not None and _cache[0] == version:
+            return _cache[1]
+    catalog = load_taxonomy(db)
+    with _cache_lock:
+        _cache = (version, catalog)
+    return catalog
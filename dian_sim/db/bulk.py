@@ -0,0 +1,56 @@
+"""
+Utilidades de escritura masiva independientes del motor (SQLite / PostgreSQL).
+"""
+from typing import Iterable, List, Sequence
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def _dialect_insert(bind, table: Table, caller: str):
+    """INSERT del dialecto del `bind` (Session, Connection o Engine), con soporte ON CONFLICT."""
+    dialect = bind.get_bind().dialect.name if hasattr(bind, "get_bind") else bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"{caller} no soporta el dialecto '{dialect}'")
+
+
+def insert_ignore(bind, table: Table, conflict_cols: Sequence[str], returning: Sequence = None):
+    """
+    INSERT ... ON CONFLICT (conflict_cols) DO NOTHING en el dialecto del `bind`
+    (Session, Connection o Engine). Opcionalmente con RETURNING.
+    conflict_cols=None ignora el conflicto con cualquier restricción única / PK.
+    """
+    stmt = _dialect_insert(bind, table, "insert_ignore")
+    stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict_cols) if conflict_cols else None)
+    if returning is not None:
+        stmt = stmt.returning(*returning)
+    return stmt
+
+
+def chunked(rows: Sequence, size: int) -> Iterable[List]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def upsert(bind, table: Table, conflict_cols: Sequence[str], update_cols: Sequence[str]):
+    """INSERT ... ON CONFLICT (conflict_cols) DO UPDATE SET col = excluded.col para update_cols."""
+    stmt = _dialect_insert(bind, table, "upsert")
+    return stmt.on_conflict_do_update(
+        index_elements=list(conflict_cols),
+        set_={col: stmt.excluded[col] for col in update_cols},
+    )
+
+
+def upsert_increment(bind, table: Table, conflict_cols: Sequence[str], increment_cols: Sequence[str]):
+    """
+    INSERT ... ON CONFLICT (conflict_cols) DO UPDATE SET col = col + excluded.col
+    para cada columna de increment_cols. Sirve para contadores/acumulados.
+    """
+    stmt = _dialect_insert(bind, table, "upsert_increment")
+    return stmt.on_conflict_do_update(
+        index_elements=list(conflict_cols),
+        set_={col: table.c[col] + stmt.excluded[col] for col in increment_cols},
+    )
@@ -0,0 +1,556 @@
+"""
+Migraciones de esquema versionadas.
+
+Al importar db.session solo se lee un entero (schema_version). Únicamente si
+la BD está por detrás de SCHEMA_VERSION se migra, en una transacción:
+- BD vacía: create_all de los modelos actuales + índice de búsqueda, y se
+  registra la última versión sin ejecutar pasos.
+- BD existente: se ejecutan los pasos pendientes.
+
+Cada paso es autocontenido: DDL explícito y las tablas / columnas congeladas tal
+como eran en su versión (nunca db.models, que siguen evolucionando), e idempotente
+(introspecciona antes de alterar). De core solo usa funciones puras (normalización,
+partes del enunciado, programador SM-2, bits de logros), que deben dar lo mismo que
+una escritura nueva.
+
+Variables de entorno:
+    DIAN_SKIP_MIGRATIONS=1  -> no verificar nada al arrancar (BD ya migrada).
+"""
+import datetime
+import os
+import time
+from typing import Callable, List
+
+from sqlalchemy import (JSON, BigInteger, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, String,
+                        Table, Text, bindparam, case, column, func, inspect, select, table, text)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from db.bulk import chunked
+from db.models import Base
+
+SKIP_ENV = "DIAN_SKIP_MIGRATIONS"
+BACKFILL_CHUNK = 1000
+
+# Metadata propia: la tabla de versión no forma parte de los modelos
+_meta = MetaData()
+schema_version = Table(
+    "schema_version", _meta,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+# --- Esquema congelado por versión: describe BD ya desplegadas, no editar ---
+
+# v0: tablas de la aplicación anteriores al versionado
+_v0 = MetaData()
+_V0_QUESTIONS = Table(
+    "questions", _v0,
+    Column("question_id", String(36), primary_key=True),
+    Column("track", String, nullable=False),
+    Column("competency", String, nullable=False),
+    Column("topic", String, nullable=False),
+    Column("macro_dominio", String),
+    Column("micro_competencia", String),
+    Column("difficulty", Integer, nullable=False),
+    Column("stem", Text, nullable=False),
+    Column("options_json", JSON, nullable=False),
+    Column("correct_key", String),
+    Column("rationale", Text),
+    Column("source_refs", Text),
+    Column("created_at", DateTime),
+    Column("hash_norm", String, unique=True, nullable=False),
+)
+Table(
+    "attempts", _v0,
+    Column("attempt_id", String(36), primary_key=True),
+    Column("question_id", String(36), ForeignKey("questions.question_id")),
+    Column("created_at", DateTime),
+    Column("chosen_key", String, nullable=False),
+    Column("is_correct", Boolean, nullable=False),
+    Column("time_sec", Integer),
+    Column("confidence_1_5", Integer),
+    Column("error_tag", String),
+    Column("notes", Text),
+)
+Table(
+    "user_stats", _v0,
+    Column("id", Integer, primary_key=True),
+    Column("current_streak", Integer),
+    Column("max_streak", Integer),
+    Column("total_points", Integer),
+    Column("last_activity", DateTime),
+)
+Table(
+    "achievements", _v0,
+    Column("achievement_id", String(36), primary_key=True),
+    Column("name", String, nullable=False),
+    Column("description", String),
+    Column("icon", String),
+    Column("unlocked_at", DateTime),
+)
+Table(
+    "skills", _v0,
+    Column("skill_id", String(36), primary_key=True),
+    Column("track", String, nullable=False),
+    Column("competency", String, nullable=False),
+    Column("topic", String, nullable=False),
+    Column("macro_dominio", String),
+    Column("micro_competencia", String),
+    Column("mastery_score", Float),
+    Column("priority_weight", Float),
+    Column("last_seen", DateTime),
+    Column("updated_at", DateTime),
+)
+Table(
+    "configurations", _v0,
+    Column("id", Integer, primary_key=True),
+    Column("key_name", String, unique=True, nullable=False),
+    Column("value", String, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+# v2: índice de texto completo (FTS5 external content / GIN)
+_V2_FTS_TABLE = "questions_fts"
+_V2_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {_V2_FTS_TABLE} USING fts5(
+        search_text, content='questions', content_rowid='rowid'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO {_V2_FTS_TABLE}(rowid, search_text) VALUES (new.rowid, new.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO {_V2_FTS_TABLE}({_V2_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.rowid, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF search_text ON questions BEGIN
+        INSERT INTO {_V2_FTS_TABLE}({_V2_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.rowid, old.search_text);
+        INSERT INTO {_V2_FTS_TABLE}(rowid, search_text) VALUES (new.rowid, new.search_text);
+    END""",
+]
+_V2_PG_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_questions_search_tsv "
+    "ON questions USING GIN (to_tsvector('simple', coalesce(search_text, '')))",
+]
+
+# v3: paginación por llave del explorador
+_V3_DDL = ["CREATE INDEX IF NOT EXISTS ix_questions_created_at_id ON questions (created_at, question_id)"]
+
+# v4: agregados del Dashboard (un solo candidato)
+_v4 = MetaData()
+_V4_DAILY_ACCURACY = Table(
+    "daily_accuracy", _v4,
+    Column("day", Date, primary_key=True),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("correct", Integer, nullable=False, default=0),
+)
+_V4_SKILL_ROLLUP = Table(
+    "skill_rollup", _v4,
+    Column("track", String, primary_key=True),
+    Column("macro_dominio", String, primary_key=True),
+    Column("micro_competencia", String, primary_key=True),
+    Column("skills_count", Integer, nullable=False, default=0),
+    Column("mastery_sum", Float, nullable=False, default=0.0),
+)
+_V4_DEFAULT_MACRO = "Transversal"
+
+# v5: repaso espaciado por pregunta (un solo candidato)
+_v5 = MetaData()
+_V5_REVIEW_STATE = Table(
+    "review_state", _v5,
+    Column("question_id", String(36), ForeignKey(_V0_QUESTIONS.c.question_id), primary_key=True),
+    Column("stability", Float, nullable=False),
+    Column("ease", Float, nullable=False),
+    Column("reps", Integer, nullable=False, default=0),
+    Column("lapses", Integer, nullable=False, default=0),
+    Column("last_review", DateTime, nullable=False),
+    Column("due_at", DateTime, nullable=False),
+    Index("ix_review_state_due", "due_at", "question_id"),
+)
+
+# v7: partición por candidato; los datos anteriores quedan a nombre de este usuario
+_V7_LEGACY_USER_ID = "default"
+_V7_USER_COLUMN = f"VARCHAR(64) NOT NULL DEFAULT '{_V7_LEGACY_USER_ID}'"
+_V7_USER_TABLES = ("attempts", "skills", "user_stats", "achievements")
+_V7_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_attempts_user_created ON attempts (user_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_skills_user_key ON skills (user_id, track, competency, topic)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_user_stats_user ON user_stats (user_id)",
+]
+_v7 = MetaData()
+_V7_DAILY_ACCURACY = Table(
+    "daily_accuracy", _v7,
+    Column("user_id", String(64), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("correct", Integer, nullable=False, default=0),
+)
+_V7_SKILL_ROLLUP = Table(
+    "skill_rollup", _v7,
+    Column("user_id", String(64), primary_key=True),
+    Column("track", String, primary_key=True),
+    Column("macro_dominio", String, primary_key=True),
+    Column("micro_competencia", String, primary_key=True),
+    Column("skills_count", Integer, nullable=False, default=0),
+    Column("mastery_sum", Float, nullable=False, default=0.0),
+)
+_V7_REVIEW_STATE = Table(
+    "review_state", _v7,
+    Column("user_id", String(64), primary_key=True),
+    Column("question_id", String(36), ForeignKey(_V0_QUESTIONS.c.question_id), primary_key=True),
+    Column("stability", Float, nullable=False),
+    Column("ease", Float, nullable=False),
+    Column("reps", Integer, nullable=False, default=0),
+    Column("lapses", Integer, nullable=False, default=0),
+    Column("last_review", DateTime, nullable=False),
+    Column("due_at", DateTime, nullable=False),
+    Index("ix_review_state_user_due", "user_id", "due_at", "question_id"),
+)
+
+# v8: partes del enunciado + filtro situacional
+_V8_DDL = ["CREATE INDEX IF NOT EXISTS ix_questions_situational_track_diff "
+           "ON questions (is_situational, track, difficulty)"]
+
+# v9: facetas del formulario de simulacro
+_v9 = MetaData()
+_V9_TAXONOMY_FACETS = Table(
+    "taxonomy_facets", _v9,
+    Column("track", String, primary_key=True),
+    Column("competency", String, primary_key=True),
+    Column("topic", String, primary_key=True),
+    Column("macro_dominio", String, primary_key=True),
+    Column("micro_competencia", String, primary_key=True),
+    Column("difficulty", Integer, primary_key=True),
+    Column("is_situational", Boolean, primary_key=True),
+    Column("question_count", Integer, nullable=False, default=0),
+)
+
+
+# v10: el índice FTS5 se llave por questions.search_rowid (VACUUM puede renumerar el rowid implícito)
+_V10_FTS_TABLE = "questions_fts"
+_V10_SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS questions_fts_ai",
+    "DROP TRIGGER IF EXISTS questions_fts_ad",
+    "DROP TRIGGER IF EXISTS questions_fts_au",
+    f"DROP TABLE IF EXISTS {_V10_FTS_TABLE}",
+]
+_V10_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {_V10_FTS_TABLE} USING fts5(
+        search_text, content='questions', content_rowid='search_rowid'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        UPDATE questions SET search_rowid = (SELECT coalesce(max(search_rowid), 0) + 1 FROM questions)
+            WHERE rowid = new.rowid AND search_rowid IS NULL;
+        INSERT INTO {_V10_FTS_TABLE}(rowid, search_text)
+            SELECT search_rowid, search_text FROM questions WHERE rowid = new.rowid;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        INSERT INTO {_V10_FTS_TABLE}({_V10_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.search_rowid, old.search_text);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS questions_fts_au AFTER UPDATE OF search_text ON questions BEGIN
+        INSERT INTO {_V10_FTS_TABLE}({_V10_FTS_TABLE}, rowid, search_text) VALUES ('delete', old.search_rowid, old.search_text);
+        INSERT INTO {_V10_FTS_TABLE}(rowid, search_text) VALUES (new.search_rowid, new.search_text);
+    END""",
+]
+_V10_DDL = ["CREATE UNIQUE INDEX IF NOT EXISTS ux_questions_search_rowid ON questions (search_rowid)"]
+
+# v11: versión del banco visible para todos los procesos
+_v11 = MetaData()
+_V11_BANK_VERSION = Table(
+    "bank_version", _v11,
+    Column("id", Integer, primary_key=True),
+    Column("version", BigInteger, nullable=False, default=0),
+)
+
+def add_missing_columns(conn: Connection, table: str, columns: dict) -> List[str]:
+    """columns: {nombre: tipo SQL}. Agrega las que falten y retorna sus nombres."""
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    added = []
+    for col, col_type in columns.items():
+        if col not in existing:
+            print(f"🔨 Adding column {col} to table {table}...")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
+            added.append(col)
+    return added
+
+
+def _create_missing(conn: Connection, tbl: Table) -> bool:
+    """Crea la tabla si no existe. True si la creó (entonces el paso la llena)."""
+    if inspect(conn).has_table(tbl.name):
+        return False
+    tbl.create(conn)
+    return True
+
+
+def _fill_questions(conn: Connection, pending: str, sources: List[str], compute: Callable[..., dict]) -> int:
+    """
+    Recorre por llave (question_id) las preguntas con `pending` NULL y escribe
+    compute(*fuentes) -> {columna: valor}. Retorna cuántas actualizó.
+    """
+    questions = table("questions", column("question_id"), column(pending), *[column(c) for c in sources])
+    query = (select(questions.c.question_id, *[questions.c[c] for c in sources])
+             .where(questions.c[pending].is_(None)).order_by(questions.c.question_id).limit(BACKFILL_CHUNK))
+    total, last = 0, None
+    while True:
+        rows = conn.execute(query if last is None else query.where(questions.c.question_id > last)).all()
+        if not rows:
+            return total
+        values = [compute(*r[1:]) for r in rows]
+        target = table("questions", column("question_id"), *[column(c) for c in values[0]])
+        stmt = (target.update().where(target.c.question_id == bindparam("b_question_id"))
+                .values({c: bindparam(f"b_{c}") for c in values[0]}))
+        conn.execute(stmt, [{"b_question_id": r.question_id, **{f"b_{c}": v for c, v in vals.items()}}
+                            for r, vals in zip(rows, values)])
+        total += len(rows)
+        last = rows[-1].question_id
+
+
+def _m1_taxonomy_columns(conn: Connection):
+    add_missing_columns(conn, "questions", {"macro_dominio": "VARCHAR", "micro_competencia": "VARCHAR"})
+    add_missing_columns(conn, "skills", {"macro_dominio": "VARCHAR", "micro_competencia": "VARCHAR"})
+
+
+def _m2_search_index(conn: Connection):
+    from core.dedupe import search_text_for
+    add_missing_columns(conn, "questions", {"search_text": "TEXT"})
+    filled = _fill_questions(conn, "search_text", ["stem", "rationale"],
+                             lambda stem, rationale: {"search_text": search_text_for(stem, rationale)})
+    if filled:
+        print(f"🔎 search_text calculado para {filled} preguntas.")
+
+    if conn.dialect.name == "sqlite":
+        exists = inspect(conn).has_table(_V2_FTS_TABLE)
+        for ddl in _V2_SQLITE_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {_V2_FTS_TABLE}({_V2_FTS_TABLE}) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        for ddl in _V2_PG_DDL:
+            conn.execute(text(ddl))
+
+
+def _m3_question_indexes(conn: Connection):
+    for ddl in _V3_DDL:
+        conn.execute(text(ddl))
+
+
+def _m4_analytics_tables(conn: Connection):
+    # Backfill desde el historial (solo si la tabla no existía)
+    days = nodes = 0
+    if _create_missing(conn, _V4_DAILY_ACCURACY):
+        attempts = table("attempts", column("created_at", DateTime), column("is_correct", Boolean))
+        day = func.date(attempts.c.created_at)
+        days = conn.execute(_V4_DAILY_ACCURACY.insert().from_select(
+            ["day", "attempts", "correct"],
+            select(day, func.count(), func.sum(case((attempts.c.is_correct, 1), else_=0)))
+            .where(attempts.c.created_at.isnot(None)).group_by(day),
+        )).rowcount
+    if _create_missing(conn, _V4_SKILL_ROLLUP):
+        skills = table("skills", column("track"), column("topic"), column("macro_dominio"),
+                       column("micro_competencia"), column("mastery_score", Float))
+        macro = func.coalesce(func.nullif(skills.c.macro_dominio, ""), _V4_DEFAULT_MACRO)
+        micro = func.coalesce(func.nullif(skills.c.micro_competencia, ""), skills.c.topic)
+        nodes = conn.execute(_V4_SKILL_ROLLUP.insert().from_select(
+            ["track", "macro_dominio", "micro_competencia", "skills_count", "mastery_sum"],
+            select(skills.c.track, macro, micro, func.count(), func.coalesce(func.sum(skills.c.mastery_score), 0.0))
+            .group_by(skills.c.track, macro, micro),
+        )).rowcount
+    print(f"📊 Analytics backfill: {days} días, {nodes} nodos de habilidades")
+
+
+def _m5_review_state(conn: Connection):
+    # Se siembra reproduciendo el historial de intentos (solo si la tabla no existía)
+    from core.scheduler import next_review
+    if not _create_missing(conn, _V5_REVIEW_STATE):
+        return
+    attempts = table("attempts", column("question_id"), column("is_correct", Boolean), column("created_at", DateTime))
+    questions = table("questions", column("question_id"))
+    rows = conn.execute(
+        select(attempts.c.question_id, attempts.c.is_correct, attempts.c.created_at)
+        .join(questions, questions.c.question_id == attempts.c.question_id)  # omite preguntas borradas
+        .where(attempts.c.created_at.isnot(None))
+        .order_by(attempts.c.created_at)
+    ).all()
+    states = {}
+    for qid, is_correct, created_at in rows:
+        states[qid] = next_review(states.get(qid), bool(is_correct), created_at)
+    values = [{"question_id": qid, "stability": r.stability, "ease": r.ease, "reps": r.reps, "lapses": r.lapses,
+               "last_review": r.last_review, "due_at": r.due_at} for qid, r in states.items()]
+    for chunk in chunked(values, BACKFILL_CHUNK):
+        conn.execute(_V5_REVIEW_STATE.insert(), chunk)
+    print(f"📅 Review queue backfill: {len(states)} preguntas programadas")
+
+
+def _m6_achievements_mask(conn: Connection):
+    # El bitset se reconstruye desde los logros ya desbloqueados (bits fijos por diseño)
+    from core.achievements import mask_from_names
+    if not add_missing_columns(conn, "user_stats", {"achievements_mask": "BIGINT DEFAULT 0"}):
+        return
+    names = conn.execute(text("SELECT name FROM achievements")).scalars().all()
+    conn.execute(text("UPDATE user_stats SET achievements_mask = :mask"), {"mask": mask_from_names(names)})
+
+
+def _merge_user_stats(conn: Connection):
+    # get_user_stats era .first()-o-crear: dos sesiones simultáneas podían duplicar la fila.
+    # Antes del índice único queda una por candidato (máximos, y la racha de la última actividad).
+    stats = table("user_stats", column("id", Integer), column("user_id"), column("current_streak", Integer),
+                  column("max_streak", Integer), column("total_points", Integer),
+                  column("last_activity", DateTime), column("achievements_mask", BigInteger))
+    duplicated = select(stats.c.user_id).group_by(stats.c.user_id).having(func.count() > 1)
+    groups = {}
+    for r in conn.execute(select(stats).where(stats.c.user_id.in_(duplicated)).order_by(stats.c.id)).mappings():
+        groups.setdefault(r["user_id"], []).append(r)
+    for user_id, rows in groups.items():
+        def highest(name):
+            return max((r[name] for r in rows if r[name] is not None), default=None)
+        latest = max(rows, key=lambda r: r["last_activity"] or datetime.datetime.min)
+        mask = 0
+        for r in rows:
+            mask |= r["achievements_mask"] or 0
+        conn.execute(stats.update().where(stats.c.id == rows[0]["id"]).values(
+            total_points=highest("total_points"), max_streak=highest("max_streak"),
+            current_streak=latest["current_streak"], last_activity=latest["last_activity"], achievements_mask=mask))
+        conn.execute(stats.delete().where(stats.c.id.in_([r["id"] for r in rows[1:]])))
+        print(f"👤 user_stats: {len(rows)} filas de '{user_id}' fusionadas en una")
+
+
+def _m7_user_partitioning(conn: Connection):
+    # Los datos existentes quedan a nombre de _V7_LEGACY_USER_ID
+    for name in _V7_USER_TABLES:
+        add_missing_columns(conn, name, {"user_id": _V7_USER_COLUMN})
+    _merge_user_stats(conn)
+    for ddl in _V7_DDL:
+        conn.execute(text(ddl))
+
+    # Derivadas: su llave primaria gana user_id. Hasta esta versión todo era del mismo
+    # candidato, así que se recrean copiando sus filas en lugar de recalcularlas.
+    for old, new in ((_V4_DAILY_ACCURACY, _V7_DAILY_ACCURACY), (_V4_SKILL_ROLLUP, _V7_SKILL_ROLLUP),
+                     (_V5_REVIEW_STATE, _V7_REVIEW_STATE)):
+        if "user_id" in {c["name"] for c in inspect(conn).get_columns(old.name)}:
+            continue
+        rows = [{**r, "user_id": _V7_LEGACY_USER_ID} for r in conn.execute(select(old)).mappings()]
+        old.drop(conn)
+        new.create(conn)
+        for chunk in chunked(rows, BACKFILL_CHUNK):
+            conn.execute(new.insert(), chunk)
+        print(f"👥 {new.name}: {len(rows)} filas asignadas a '{_V7_LEGACY_USER_ID}'")
+
+
+def _m8_stem_parts(conn: Connection):
+    # Partes del enunciado precalculadas (core.stem_parts) + índice del filtro situacional
+    from core.stem_parts import stem_parts
+    add_missing_columns(conn, "questions", {"is_situational": "BOOLEAN NOT NULL DEFAULT FALSE",
+                                            "situation_text": "TEXT", "prompt_text": "TEXT"})
+    filled = _fill_questions(conn, "prompt_text", ["stem"], stem_parts)
+    if filled:
+        print(f"🧩 Partes del enunciado calculadas para {filled} preguntas.")
+    for ddl in _V8_DDL:
+        conn.execute(text(ddl))
+
+
+def _m9_taxonomy_facets(conn: Connection):
+    # Se llena desde el banco actual (solo si la tabla no existía)
+    if not _create_missing(conn, _V9_TAXONOMY_FACETS):
+        return
+    q = table("questions", column("track"), column("competency"), column("topic"), column("macro_dominio"),
+              column("micro_competencia"), column("difficulty"), column("is_situational"))
+    keys = [q.c.track, q.c.competency, q.c.topic, func.coalesce(q.c.macro_dominio, ""),
+            func.coalesce(q.c.micro_competencia, ""), func.coalesce(q.c.difficulty, 0), q.c.is_situational]
+    facets = conn.execute(_V9_TAXONOMY_FACETS.insert().from_select(
+        [c.name for c in _V9_TAXONOMY_FACETS.c],
+        select(*keys, func.count()).group_by(*keys),
+    )).rowcount
+    print(f"🗂️ Taxonomy backfill: {facets} facetas")
+
+
+
+def _m10_search_rowid(conn: Connection):
+    add_missing_columns(conn, "questions", {"search_rowid": "INTEGER"})
+    if conn.dialect.name == "sqlite":
+        # Numeración inicial: el rowid actual, por encima de las llaves ya asignadas
+        conn.execute(text("UPDATE questions SET search_rowid = rowid + "
+                          "(SELECT coalesce(max(search_rowid), 0) FROM questions) WHERE search_rowid IS NULL"))
+    for ddl in _V10_DDL:
+        conn.execute(text(ddl))
+    if conn.dialect.name != "sqlite":
+        return  # PostgreSQL busca sobre search_text (GIN de la v2)
+    fts_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = :name"),
+                           {"name": _V10_FTS_TABLE}).scalar() or ""
+    if "search_rowid" in fts_sql:
+        return
+    for ddl in _V10_SQLITE_DROP + _V10_SQLITE_DDL:
+        conn.execute(text(ddl))
+    conn.execute(text(f"INSERT INTO {_V10_FTS_TABLE}({_V10_FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def _m11_bank_version(conn: Connection):
+    _create_missing(conn, _V11_BANK_VERSION)
+
+# (versión, descripción, paso). Agregar siempre al final.
+MIGRATIONS = [
+    (1, "taxonomy columns (macro_dominio, micro_competencia)", _m1_taxonomy_columns),
+    (2, "questions.search_text + full-text index", _m2_search_index),
+    (3, "questions keyset index", _m3_question_indexes),
+    (4, "dashboard analytics tables (daily_accuracy, skill_rollup)", _m4_analytics_tables),
+    (5, "spaced-repetition review_state + due index", _m5_review_state),
+    (6, "user_stats.achievements_mask (bitset de logros)", _m6_achievements_mask),
+    (7, "user_id en attempts/skills/user_stats + índices compuestos por candidato", _m7_user_partitioning),
+    (8, "questions.is_situational / situation_text / prompt_text + índice", _m8_stem_parts),
+    (9, "taxonomy_facets (conteos por filtro del formulario de simulacro)", _m9_taxonomy_facets),
+    (10, "questions.search_rowid: llave estable del índice FTS5", _m10_search_rowid),
+    (11, "bank_version (versión del banco compartida entre procesos)", _m11_bank_version),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(engine: Engine) -> int:
+    """Versión registrada; 0 si la tabla no existe (BD nueva o anterior al versionado)."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(schema_version.c.version).where(schema_version.c.id == 1)).scalar() or 0
+    except SQLAlchemyError:
+        return 0
+
+
+def _set_schema_version(conn: Connection, version: int):
+    values = {"version": version, "applied_at": datetime.datetime.utcnow()}
+    if conn.execute(schema_version.update().where(schema_version.c.id == 1).values(**values)).rowcount == 0:
+        conn.execute(schema_version.insert().values(id=1, **values))
+
+
+def _create_current_schema(conn: Connection):
+    """BD vacía: el esquema de los modelos actuales de una vez (equivale a aplicar todos los pasos)."""
+    from core.bank_search import ensure_search_index
+    Base.metadata.create_all(bind=conn)
+    ensure_search_index(conn)
+
+
+def run_migrations(engine: Engine, force: bool = False) -> int:
+    """
+    Lleva la BD a SCHEMA_VERSION. En el caso normal (al día) cuesta una sola consulta.
+    Retorna la versión final.
+    """
+    if os.getenv(SKIP_ENV, "").lower() in ("1", "true", "yes") and not force:
+        return -1
+
+    current = get_schema_version(engine)
+    if current >= SCHEMA_VERSION:
+        return current
+
+    t0 = time.perf_counter()
+    print(f"🔍 Database: {engine.dialect.name.upper()} schema v{current} -> v{SCHEMA_VERSION}. Migrating...")
+    with engine.begin() as conn:
+        _meta.create_all(bind=conn)
+        if not inspect(conn).has_table("questions"):
+            _create_current_schema(conn)
+        else:
+            if current == 0:
+                # Anterior al versionado: tablas de la aplicación que falten
+                _v0.create_all(bind=conn)
+            for version, description, step in MIGRATIONS:
+                if version > current:
+                    print(f"🔨 Migration {version}: {description}")
+                    step(conn)
+        _set_schema_version(conn, SCHEMA_VERSION)
+    print(f"✅ Database schema synchronized successfully ({(time.perf_counter() - t0) * 1000:.0f} ms).")
+    return SCHEMA_VERSION
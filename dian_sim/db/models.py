@@ -1,11 +1,20 @@
 import datetime
 import json
 import uuid
-from sqlalchemy import Column, String, Integer, Text, Boolean, DateTime, Float, ForeignKey, JSON
+from sqlalchemy import BigInteger, Column, String, Integer, Text, Boolean, Date, DateTime, Float, ForeignKey, JSON, Index, false
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+# Candidato al que pertenecen intentos, habilidades y estadísticas cuando no se indica otro
+# (instalación de un solo usuario y datos anteriores a la columna user_id)
+DEFAULT_USER_ID = "default"
+
+
+def _user_column():
+    return Column(String(64), nullable=False, default=DEFAULT_USER_ID, server_default=DEFAULT_USER_ID)
+
+
 class Question(Base):
     __tablename__ = "questions"
 
@@ -23,13 +32,29 @@ class Question(Base):
     source_refs = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     hash_norm = Column(String, unique=True, nullable=False)
+    search_text = Column(Text, nullable=True) # normalize_text(stem + rationale), alimenta el índice FTS
+    search_rowid = Column(Integer, nullable=True) # llave estable del índice FTS5 (SQLite; la asigna su trigger)
+    # Partes del enunciado (core.stem_parts), calculadas al escribir (core.question_store)
+    is_situational = Column(Boolean, nullable=False, default=False, server_default=false())
+    situation_text = Column(Text, nullable=True)
+    prompt_text = Column(Text, nullable=True)
 
     attempts = relationship("Attempt", back_populates="question")
 
+    __table_args__ = (
+        # Paginación por llave del explorador (core.bank_pages)
+        Index("ix_questions_created_at_id", "created_at", "question_id"),
+        # Candidatos filtrados por "solo situacionales" + eje + dificultad
+        Index("ix_questions_situational_track_diff", "is_situational", "track", "difficulty"),
+        # Índice FTS5 -> pregunta (core.bank_search)
+        Index("ux_questions_search_rowid", "search_rowid", unique=True),
+    )
+
 class Attempt(Base):
     __tablename__ = "attempts"
 
     attempt_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = _user_column()
     question_id = Column(String(36), ForeignKey("questions.question_id"))
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     chosen_key = Column(String, nullable=False)
@@ -41,17 +66,29 @@ class Attempt(Base):
 
     question = relationship("Question", back_populates="attempts")
 
+    __table_args__ = (
+        # Historial / simulacros de un candidato
+        Index("ix_attempts_user_created", "user_id", "created_at"),
+    )
+
 class UserStats(Base):
     __tablename__ = "user_stats"
     id = Column(Integer, primary_key=True)
+    user_id = _user_column()
     current_streak = Column(Integer, default=0)
     max_streak = Column(Integer, default=0)
     total_points = Column(Integer, default=0)
     last_activity = Column(DateTime, default=datetime.datetime.utcnow)
+    achievements_mask = Column(BigInteger, default=0)  # bit = core.achievements.Rule.bit
+
+    __table_args__ = (
+        Index("ux_user_stats_user", "user_id", unique=True),
+    )
 
 class Achievement(Base):
     __tablename__ = "achievements"
     achievement_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = _user_column()
     name = Column(String, nullable=False)
     description = Column(String)
     icon = Column(String) # Emoji or path
@@ -62,6 +99,7 @@ class Skill(Base):
     __tablename__ = "skills"
 
     skill_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = _user_column()
     track = Column(String, nullable=False)
     competency = Column(String, nullable=False)
     topic = Column(String, nullable=False)
@@ -74,6 +112,69 @@ class Skill(Base):
 
     # Unique constraint for track/competency/topic combination could be added via Index/UniqueConstraint
     # but for simplicity we'll handle uniqueness via application logic or add __table_args__
+    __table_args__ = (
+        # Habilidades de un candidato (selección adaptativa, finalize)
+        Index("ix_skills_user_key", "user_id", "track", "competency", "topic"),
+    )
+
+class DailyAccuracy(Base):
+    """Agregado por día (UTC) de los intentos; lo mantiene core.analytics."""
+    __tablename__ = "daily_accuracy"
+
+    user_id = Column(String(64), primary_key=True, default=DEFAULT_USER_ID)
+    day = Column(Date, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
+
+
+class SkillRollup(Base):
+    """Suma de dominio por nodo Eje / Macro-Dominio / Micro-Competencia del Dashboard."""
+    __tablename__ = "skill_rollup"
+
+    user_id = Column(String(64), primary_key=True, default=DEFAULT_USER_ID)
+    track = Column(String, primary_key=True)
+    macro_dominio = Column(String, primary_key=True) # "Transversal" si la habilidad no tiene
+    micro_competencia = Column(String, primary_key=True) # topic si la habilidad no tiene
+    skills_count = Column(Integer, nullable=False, default=0)
+    mastery_sum = Column(Float, nullable=False, default=0.0)
+
+class BankVersion(Base):
+    """Contador de cambios del banco (una fila); lo incrementa core.bank_version con cada escritura."""
+    __tablename__ = "bank_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+class TaxonomyFacet(Base):
+    """Preguntas por combinación de filtros del formulario de simulacro; lo mantiene core.taxonomy."""
+    __tablename__ = "taxonomy_facets"
+
+    track = Column(String, primary_key=True)
+    competency = Column(String, primary_key=True)
+    topic = Column(String, primary_key=True)
+    macro_dominio = Column(String, primary_key=True) # "" si la pregunta no tiene
+    micro_competencia = Column(String, primary_key=True) # "" si la pregunta no tiene
+    difficulty = Column(Integer, primary_key=True)
+    is_situational = Column(Boolean, primary_key=True)
+    question_count = Column(Integer, nullable=False, default=0)
+
+class ReviewState(Base):
+    """Estado de repaso espaciado por pregunta (core.scheduler)."""
+    __tablename__ = "review_state"
+
+    user_id = Column(String(64), primary_key=True, default=DEFAULT_USER_ID)
+    question_id = Column(String(36), ForeignKey("questions.question_id"), primary_key=True)
+    stability = Column(Float, nullable=False) # días hasta el próximo repaso
+    ease = Column(Float, nullable=False) # factor de crecimiento (SM-2)
+    reps = Column(Integer, nullable=False, default=0) # aciertos consecutivos
+    lapses = Column(Integer, nullable=False, default=0)
+    last_review = Column(DateTime, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Cola de pendientes: WHERE user_id = u AND due_at <= now ORDER BY due_at, question_id LIMIT k
+        Index("ix_review_state_user_due", "user_id", "due_at", "question_id"),
+    )
 
 class Configuration(Base):
     __tablename__ = "configurations"
@@ -0,0 +1,218 @@
+"""
+Perfilador opcional de consultas SQL por página de Streamlit.
+
+Se activa con DIAN_PROFILE_SQL=1 (db/session.py lo instala sobre el engine).
+Escucha before/after_cursor_execute y registra por sentencia:
+- huella: el SQL con literales, parámetros y listas IN (?, ?, ...) normalizados,
+- duración, filas (rowcount del driver: psycopg2 lo da también en SELECT,
+  sqlite3 solo en INSERT/UPDATE/DELETE),
+- la página de Streamlit que la emitió y la ejecución (rerun) a la que pertenece.
+
+Por (página, huella) se acumulan conteo, tiempos y el máximo de repeticiones
+dentro de un mismo rerun: una huella que se repite muchas veces en un rerun es
+un patrón N+1. Los SELECT más lentos que DIAN_PROFILE_SQL_EXPLAIN_MS guardan su
+plan (EXPLAIN / EXPLAIN QUERY PLAN) una vez por huella.
+
+Se consulta en la página de diagnóstico (app/pages/9_Diagnostico_SQL.py, oculta
+del menú; URL /Diagnostico_SQL) o con to_json() / dump().
+"""
+import collections
+import datetime
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ENABLE_ENV = "DIAN_PROFILE_SQL"
+EXPLAIN_ENV = "DIAN_PROFILE_SQL_EXPLAIN_MS"
+DEFAULT_EXPLAIN_MS = 100.0
+MAX_EVENTS = 5000          # sentencias recientes que se conservan una a una
+N_PLUS_ONE_MIN = 10        # repeticiones de una huella en un rerun para marcarla como N+1
+OUTSIDE_STREAMLIT = "(fuera de Streamlit)"
+
+_EXPLAIN_PREFIX = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+_READ = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    """SQL normalizado: mismas consultas con distintos valores comparten huella."""
+    s = _STRING.sub("?", statement)
+    s = _PARAM.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _IN_LIST.sub("(?, ...)", s)
+    return _SPACE.sub(" ", s).strip()
+
+
+class QueryEvent(NamedTuple):
+    at: str
+    page: str
+    run: int
+    fingerprint: str
+    duration_ms: float
+    rows: Optional[int]
+
+
+class QueryProfiler:
+
+    def __init__(self, explain_ms: float = DEFAULT_EXPLAIN_MS, max_events: int = MAX_EVENTS):
+        self.explain_ms = explain_ms
+        self.events = collections.deque(maxlen=max_events)
+        self.stats: Dict[tuple, dict] = {}
+        self.explains: Dict[str, str] = {}
+        self._runs: Dict[str, tuple] = {}  # {sesión: (marcador del rerun, número)}
+        self._run_seq = 0
+        self._lock = threading.Lock()
+        self._engines: List[Engine] = []
+
+    # --- Instalación ---
+    def attach(self, engine: Engine) -> "QueryProfiler":
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        self._engines.append(engine)
+        return self
+
+    def detach(self):
+        for engine in self._engines:
+            event.remove(engine, "before_cursor_execute", self._before)
+            event.remove(engine, "after_cursor_execute", self._after)
+        self._engines = []
+
+    def reset(self):
+        with self._lock:
+            self.events.clear()
+            self.stats.clear()
+            self.explains.clear()
+
+    # --- Página y rerun ---
+    def _page_and_run(self):
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            ctx = get_script_run_ctx(suppress_warning=True)
+        except Exception:
+            ctx = None
+        if ctx is None:
+            return OUTSIDE_STREAMLIT, 0
+        info = ctx.pages_manager.get_pages().get(ctx.page_script_hash) or {}
+        page = info.get("page_name") or os.path.basename(info.get("script_path") or "") or ctx.page_script_hash
+        # Streamlit crea un dict `cursors` nuevo en cada rerun; se guarda la referencia
+        # (no el id) para que no se recicle
+        marker, run = self._runs.get(ctx.session_id, (None, 0))
+        if marker is not ctx.cursors:
+            self._run_seq += 1
+            run = self._run_seq
+            self._runs[ctx.session_id] = (ctx.cursors, run)
+        return page, run
+
+    # --- Eventos del engine ---
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_profiler_t0", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_profiler_t0")
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        fp = fingerprint(statement)
+        with self._lock:
+            page, run = self._page_and_run()
+            self.events.append(QueryEvent(datetime.datetime.now().isoformat(timespec="milliseconds"),
+                                          page, run, fp, round(duration_ms, 3), rows))
+            s = self.stats.get((page, fp))
+            if s is None:
+                s = self.stats[(page, fp)] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": None,
+                                              "max_per_run": 0, "_run": None, "_in_run": 0,
+                                              "statement": statement, "executemany": executemany}
+            s["count"] += 1
+            s["total_ms"] += duration_ms
+            s["max_ms"] = max(s["max_ms"], duration_ms)
+            if rows is not None:  # None: el driver no lo reporta (SELECT en sqlite3)
+                s["rows"] = (s["rows"] or 0) + rows
+            s["_in_run"] = s["_in_run"] + 1 if s["_run"] == run else 1
+            s["_run"] = run
+            s["max_per_run"] = max(s["max_per_run"], s["_in_run"])
+            want_plan = (duration_ms >= self.explain_ms and not executemany and fp not in self.explains
+                         and _READ.match(statement) is not None)
+            if want_plan:
+                self.explains[fp] = ""  # reservado: un solo EXPLAIN por huella
+        if want_plan:
+            plan = self._explain(conn, statement, parameters)
+            with self._lock:
+                self.explains[fp] = plan
+
+    def _explain(self, conn, statement, parameters) -> str:
+        prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+        if prefix is None:
+            return f"(EXPLAIN no soportado en {conn.dialect.name})"
+        # Cursor DBAPI directo: no vuelve a disparar los eventos del engine
+        raw = conn.connection.dbapi_connection.cursor()
+        try:
+            raw.execute(prefix + statement, parameters)
+            return "\n".join(str(r[-1]) for r in raw.fetchall())
+        except Exception as e:
+            return f"(EXPLAIN falló: {e})"
+        finally:
+            raw.close()
+
+    # --- Reportes ---
+    def report(self, page: str = None) -> List[dict]:
+        """Una fila por (página, huella), de mayor a menor tiempo total."""
+        with self._lock:
+            items = [(k, dict(v)) for k, v in self.stats.items() if page is None or k[0] == page]
+            explains = dict(self.explains)
+        rows = [{
+            "page": p, "fingerprint": fp, "count": s["count"], "total_ms": round(s["total_ms"], 3),
+            "avg_ms": round(s["total_ms"] / s["count"], 3), "max_ms": round(s["max_ms"], 3), "rows": s["rows"],
+            "max_per_run": s["max_per_run"], "n_plus_one": s["max_per_run"] >= N_PLUS_ONE_MIN and not s["executemany"],
+            "statement": s["statement"], "explain": explains.get(fp) or None,
+        } for (p, fp), s in items]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def pages(self) -> List[str]:
+        with self._lock:
+            return sorted({p for p, _ in self.stats})
+
+    def to_json(self, recent: int = 200) -> str:
+        with self._lock:
+            events = list(self.events)[-recent:]
+        return json.dumps({
+            "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "explain_ms": self.explain_ms,
+            "n_plus_one_min": N_PLUS_ONE_MIN,
+            "queries": self.report(),
+            "recent": [e._asdict() for e in events],
+        }, indent=2, ensure_ascii=False, default=str)
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+
+_profiler: Optional[QueryProfiler] = None
+
+
+def get_profiler() -> Optional[QueryProfiler]:
+    """El perfilador instalado (None si DIAN_PROFILE_SQL no está activo)."""
+    return _profiler
+
+
+def install_from_env(engine: Engine) -> Optional[QueryProfiler]:
+    global _profiler
+    if os.getenv(ENABLE_ENV, "").strip().lower() not in ("1", "true", "yes"):
+        return None
+    if _profiler is None:
+        _profiler = QueryProfiler(float(os.getenv(EXPLAIN_ENV, DEFAULT_EXPLAIN_MS)))
+    _profiler.attach(engine)
+    print(f"🔬 SQL profiler activo (EXPLAIN desde {_profiler.explain_ms:.0f} ms)")
+    return _profiler
@@ -29,46 +29,14 @@ engine = create_engine(
     pool_recycle=300     # Recycle connections every 5 minutes
 )
 
-# Auto-create tables and handle migrations (PostgreSQL/SQLite)
-from db.models import Base
-from sqlalchemy import text
-try:
-    # 1. Ensure tables exist
-    Base.metadata.create_all(bind=engine)
-    
-    # 2. Universal Migration Logic (SQLite & Postgres)
-    db_type = "postgres" if "postgres" in DATABASE_URL.lower() else "sqlite"
-    print(f"🔍 Database: {db_type.upper()} detected. Checking schema synchronization...")
-    
-    with engine.begin() as conn:
-        # Tables to check
-        tables_to_migrate = ["questions", "skills", "configurations"] # Agregada configurations
-        new_cols_map = {
-            "questions": ["macro_dominio", "micro_competencia"],
-            "skills": ["macro_dominio", "micro_competencia"],
-            "configurations": [] # Solo verificar existencia
-        }
-        
-        for table in tables_to_migrate:
-            # Check existing columns
-            if db_type == "sqlite":
-                existing_cols = [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})")).fetchall()]
-            else:
-                # Postgres
-                existing_cols = [row[0] for row in conn.execute(text(f"SELECT column_name FROM information_schema.columns WHERE table_name='{table}';")).fetchall()]
-            
-            # Check if table itself exists (especially for Postgres if create_all failed partially)
-            if not existing_cols and db_type != "sqlite":
-                 # Minimal check or force creation if needed, but let's focus on missing columns
-                 pass
-
-            for col in new_cols_map.get(table, []):
-                if col not in existing_cols:
-                    print(f"🔨 Adding column {col} to table {table}...")
-                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} VARCHAR;"))
-        
-        print("✅ Database schema synchronized successfully.")
+# Perfilador de consultas opcional: DIAN_PROFILE_SQL=1 (ver db/profiler.py)
+from db.profiler import install_from_env
+install_from_env(engine)
 
+# Schema versionado: al día = una sola consulta (ver db/migrations.py)
+from db.migrations import run_migrations
+try:
+    run_migrations(engine)
 except Exception as e:
     # In Streamlit Cloud, this will show up in the Logs (Manage App -> Logs)
     print(f"❌ DATABASE MIGRATION ERROR: {e}")
@@ -0,0 +1,17 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def side_db_path(suffix: str) -> str:
+    """
+    Archivo SQLite auxiliar (índices, cachés) junto a la BD principal:
+    dian_sim.db -> dian_sim_<suffix>.db. Si la BD es remota, va en la raíz del proyecto.
+    """
+    from db.session import DATABASE_URL
+    if DATABASE_URL.startswith("sqlite:///"):
+        db_file = DATABASE_URL.replace("sqlite:///", "", 1)
+        if db_file and db_file != ":memory:":
+            root, _ = os.path.splitext(os.path.abspath(db_file))
+            return f"{root}_{suffix}.db"
+    return os.path.join(BASE_DIR, f"dian_sim_{suffix}.db")
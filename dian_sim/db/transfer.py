@@ -0,0 +1,228 @@
+"""
+Copia masiva y reanudable entre dos bases (SQLite local -> PostgreSQL en la nube,
+o cualquier par de URLs soportadas por db.bulk).
+
+- Por tabla, lotes por llave primaria (keyset) insertados con executemany +
+  ON CONFLICT DO NOTHING: una ida y vuelta por lote, no una por fila.
+- questions y skills se copian en paralelo; attempts después (su FK a questions
+  en PostgreSQL exige que las preguntas ya estén).
+- Una pregunta que el destino ya tenía con el mismo hash_norm bajo otro id no se
+  copia; sus intentos se reescriben hacia la del destino. Los intentos cuya
+  pregunta no existe quedan con question_id NULL (como tras un borrado) y se reportan.
+- Tras cada lote confirmado se guarda la última llave en un archivo de checkpoint:
+  una corrida interrumpida continúa donde quedó (repetir un lote es inofensivo).
+- Las tablas derivadas (analítica, repaso espaciado, facetas) se recalculan en el destino.
+- Al final se comparan conteos y checksums por tabla.
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from db.bulk import insert_ignore
+from db.models import Attempt, Question, Skill
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# (modelo, columna de la llave para el keyset)
+TABLES = {
+    "questions": (Question, Question.question_id),
+    "skills": (Skill, Skill.skill_id),
+    "attempts": (Attempt, Attempt.attempt_id),
+}
+# Fases: las tablas de una fase corren en paralelo
+PHASES = [("questions", "skills"), ("attempts",)]
+# Columnas propias de cada base que no se copian ni se comparan
+# (search_rowid: llave del índice FTS5 de SQLite, la asigna el trigger del destino)
+LOCAL_COLUMNS = {"search_rowid"}
+
+
+def _copied_columns(table) -> list:
+    return [c for c in table.columns if c.name not in LOCAL_COLUMNS]
+
+
+class Checkpoint:
+    """{tabla: {"last_key": ..., "rows": n, "done": bool}} persistido en JSON (escritura atómica)."""
+
+    def __init__(self, path: str, signature: str, restart: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {"signature": signature, "tables": {}}
+        if path and os.path.exists(path) and not restart:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("signature") == signature:
+                self.state = saved
+            else:
+                print("⚠️ Checkpoint de otra migración (origen/destino distintos): se ignora.")
+
+    def table(self, name: str) -> dict:
+        with self._lock:
+            return dict(self.state["tables"].get(name, {"last_key": None, "rows": 0, "done": False}))
+
+    def update(self, name: str, **values):
+        with self._lock:
+            self.state["tables"].setdefault(name, {"last_key": None, "rows": 0, "done": False}).update(values)
+            if self.path:
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.state, f, indent=2)
+                os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def migration_signature(source_url: str, dest_url: str) -> str:
+    return hashlib.sha256(f"{source_url}|{dest_url}".encode("utf-8")).hexdigest()[:16]
+
+
+def question_id_map(source: Engine, dest: Engine) -> Dict[str, Optional[str]]:
+    """
+    {question_id del origen: question_id de la misma pregunta (hash_norm) en el destino}.
+    Difieren cuando el destino ya la tenía bajo otro id; None si no está en el destino.
+    """
+    with dest.connect() as conn:
+        dest_by_hash = dict(conn.execute(select(Question.hash_norm, Question.question_id)).all())
+    with source.connect() as conn:
+        rows = conn.execution_options(yield_per=DEFAULT_CHUNK_SIZE).execute(
+            select(Question.question_id, Question.hash_norm))
+        return {qid: dest_by_hash.get(hash_norm) for qid, hash_norm in rows}
+
+
+def copy_table(source: Engine, dest: Engine, name: str, checkpoint: Checkpoint,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, on_chunk: Callable[[str, int], None] = None,
+               question_ids: Dict[str, Optional[str]] = None) -> int:
+    """
+    Copia `name` por lotes desde el checkpoint. Retorna las filas leídas del origen en esta corrida.
+    Con question_ids (question_id_map) reescribe la columna question_id de cada fila; las
+    que quedan sin pregunta se acumulan en el checkpoint como "orphans".
+    """
+    model, key = TABLES[name]
+    table = model.__table__
+    state = checkpoint.table(name)
+    if state["done"]:
+        return 0
+
+    skip_keys = set()
+    if name == "skills":
+        # skills no tiene restricción única: se deduplica por candidato y (track, competency, topic)
+        with dest.connect() as conn:
+            skip_keys = set(conn.execute(select(Skill.user_id, Skill.track, Skill.competency, Skill.topic)).all())
+
+    stmt = insert_ignore(dest, table, None)
+    last_key, total, copied = state["last_key"], state["rows"], 0
+    orphans = state.get("orphans", 0)
+    while True:
+        query = select(*_copied_columns(table)).order_by(key).limit(chunk_size)
+        if last_key is not None:
+            query = query.where(key > last_key)
+        with source.connect() as conn:
+            rows = [dict(r._mapping) for r in conn.execute(query)]
+        if not rows:
+            break
+        batch = [r for r in rows if (r["user_id"], r["track"], r["competency"], r["topic"]) not in skip_keys] \
+            if skip_keys else rows
+        if question_ids is not None:
+            for r in batch:
+                if r["question_id"] is not None:
+                    r["question_id"] = question_ids.get(r["question_id"])
+                    orphans += r["question_id"] is None
+        if batch:
+            with dest.begin() as conn:
+                conn.execute(stmt, batch)
+        last_key = rows[-1][key.name]
+        total += len(rows)
+        copied += len(rows)
+        checkpoint.update(name, last_key=last_key, rows=total, orphans=orphans)
+        print(f"  {name}: {total} filas")
+        if on_chunk:
+            on_chunk(name, total)
+    checkpoint.update(name, done=True)
+    return copied
+
+
+def _canonical(value) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return "" if value is None else str(value)
+
+
+def table_checksum(engine: Engine, name: str, question_ids: Dict[str, Optional[str]] = None) -> Dict[str, object]:
+    """
+    {"rows", "checksum"}: suma (mod 2^64) del sha256 de cada fila; no depende del orden.
+    Con question_ids, question_id se traduce igual que al copiar (para comparar el origen).
+    """
+    model, key = TABLES[name]
+    table = model.__table__
+    cols = sorted(c.name for c in _copied_columns(table))
+    qid_at = cols.index("question_id") if question_ids is not None else None
+    acc, rows = 0, 0
+    with engine.connect() as conn:
+        for r in conn.execution_options(yield_per=DEFAULT_CHUNK_SIZE).execute(select(*[table.c[c] for c in cols])):
+            if qid_at is not None and r[qid_at] is not None:
+                r = r[:qid_at] + (question_ids.get(r[qid_at]),) + r[qid_at + 1:]
+            raw = "\x1f".join(_canonical(v) for v in r).encode("utf-8")
+            acc = (acc + int.from_bytes(hashlib.sha256(raw).digest()[:8], "big")) % (1 << 64)
+            rows += 1
+    return {"rows": rows, "checksum": f"{acc:016x}"}
+
+
+def verify(source: Engine, dest: Engine, tables: List[str] = None,
+           question_ids: Dict[str, Optional[str]] = None) -> Dict[str, dict]:
+    """Conteos y checksums por tabla; con question_ids los intentos del origen se comparan ya traducidos."""
+    report = {}
+    for name in tables or list(TABLES):
+        src = table_checksum(source, name, question_ids if name == "attempts" else None)
+        dst = table_checksum(dest, name)
+        report[name] = {"source": src, "dest": dst, "match": src == dst}
+    return report
+
+
+def migrate(source: Engine, dest: Engine, checkpoint: Checkpoint, chunk_size: int = DEFAULT_CHUNK_SIZE,
+            on_chunk: Callable[[str, int], None] = None) -> Dict[str, dict]:
+    """
+    Copia todas las tablas por fases y retorna el reporte de verify(); report["attempts"]
+    agrega "remapped" (preguntas que el destino ya tenía bajo otro id) y "orphans"
+    (intentos que quedaron sin pregunta).
+    """
+    from db.migrations import run_migrations
+    # Ambos lados al día: el origen puede ser una BD local antigua sin columnas nuevas
+    run_migrations(source, force=True)
+    run_migrations(dest, force=True)
+
+    question_ids = None
+    for phase in PHASES:
+        if "attempts" in phase:
+            # Con questions ya copiadas: a qué pregunta del destino apunta cada intento
+            question_ids = question_id_map(source, dest)
+        with ThreadPoolExecutor(max_workers=len(phase)) as pool:
+            futures = [pool.submit(copy_table, source, dest, name, checkpoint, chunk_size, on_chunk,
+                                   question_ids if name == "attempts" else None) for name in phase]
+            for future in futures:
+                future.result()
+
+    # Derivadas de attempts/skills: se recalculan en el destino en vez de copiarlas
+    from sqlalchemy.orm import Session
+    from core.analytics import rebuild_analytics
+    from core.scheduler import rebuild_review_state
+    from core.taxonomy import rebuild_taxonomy
+    with Session(dest) as db:
+        rebuild_analytics(db)
+        rebuild_review_state(db)
+        rebuild_taxonomy(db)  # también mueve la versión del banco: las cachés sobre el destino ven la copia
+        db.commit()
+    report = verify(source, dest, question_ids=question_ids)
+    report["attempts"]["remapped"] = sum(1 for qid, dest_qid in question_ids.items()
+                                         if dest_qid is not None and dest_qid != qid)
+    report["attempts"]["orphans"] = checkpoint.table("attempts").get("orphans", 0)
+    return report
+
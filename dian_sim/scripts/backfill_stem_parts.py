@@ -0,0 +1,35 @@
+"""
+Calcula is_situational / situation_text / prompt_text (core.stem_parts) para las
+preguntas que aún no los tienen. La migración 8 ya lo hace al actualizar el esquema;
+útil tras cargar filas por SQL directo o, con --recompute, tras cambiar las marcas
+SITUACIÓN:/PREGUNTA:.
+
+Uso:
+    python scripts/backfill_stem_parts.py
+    python scripts/backfill_stem_parts.py --recompute
+"""
+import argparse
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.session import SessionLocal
+from core.question_store import backfill_stem_parts
+from core.taxonomy import rebuild_taxonomy
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill de las partes del enunciado")
+    parser.add_argument("--recompute", action="store_true", help="Recalcular todas las preguntas, no solo las pendientes")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        updated = backfill_stem_parts(db, recompute=args.recompute)
+        # is_situational forma parte de las facetas del formulario
+        rebuild_taxonomy(db)
+        db.commit()
+        print(f"✅ Partes del enunciado calculadas para {updated} preguntas.")
+    finally:
+        db.close()
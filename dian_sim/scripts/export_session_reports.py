@@ -0,0 +1,40 @@
+"""
+Genera en lote los reportes PDF de los simulacros guardados (p. ej. para un grupo de estudio).
+
+Uso:
+    python scripts/export_session_reports.py --out reportes/ --limit 500 --workers 4
+    python scripts/export_session_reports.py --user ana.perez      # solo un candidato
+"""
+import argparse
+import sys
+import os
+import time
+
+# Add the project root directory to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.session import SessionLocal
+from core.pdf_utils import SESSION_GAP_SECONDS, generate_reports_batch, session_report_jobs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="reportes")
+    parser.add_argument("--limit", type=int, default=None, help="Solo los N simulacros más recientes")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--user", default=None, help="Solo los simulacros de este candidato (user_id)")
+    parser.add_argument("--gap", type=float, default=SESSION_GAP_SECONDS,
+                        help="Segundos sin respuestas que separan dos simulacros del mismo candidato")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        jobs = session_report_jobs(db, args.limit, user_id=args.user, gap_seconds=args.gap)
+    finally:
+        db.close()
+
+    if not jobs:
+        print("No hay simulacros guardados.")
+        sys.exit(0)
+    t0 = time.perf_counter()
+    paths = generate_reports_batch(jobs, args.out, workers=args.workers)
+    print(f"✅ {len(paths)} reportes en {args.out} ({time.perf_counter() - t0:.1f} s).")
@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 from db.session import SessionLocal, engine
 from db.models import Question, Base
 from core.generators.templates import generate_dummy_questions
+from core.question_store import after_questions_committed, build_question_row, insert_questions
 
 def init_db():
     Base.metadata.create_all(bind=engine)
@@ -32,15 +33,15 @@ def seed_data(db: Session):
         seen_hashes.add(item["hash_norm"])
         
         # Pydantic validation could go here, but direct mapping is faster for seed
-        q = Question(**item)
-        objects.append(q)
+        objects.append(build_question_row(item))
         
         if len(objects) >= 200:
             break
     
-    db.add_all(objects)
+    inserted = insert_questions(db, objects)
     db.commit()
-    print(f"Seeded {len(objects)} questions.")
+    after_questions_committed(inserted)
+    print(f"Seeded {len(inserted)} questions.")
 
 if __name__ == "__main__":
     init_db()
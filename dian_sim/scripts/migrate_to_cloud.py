@@ -1,120 +1,90 @@
+"""
+Migra la BD local (SQLite) a la nube (PostgreSQL) por lotes y de forma reanudable.
+
+Si la corrida se interrumpe, volver a ejecutar el mismo comando continúa desde el
+checkpoint. Al final compara conteos y checksums por tabla. Las preguntas que el
+destino ya tenía con el mismo hash_norm no se duplican: sus intentos se reasignan.
+
+Uso:
+    python scripts/migrate_to_cloud.py                      # dian_sim.db -> DATABASE_URL
+    python scripts/migrate_to_cloud.py --dest sqlite:////tmp/copia.db --chunk-size 2000
+    python scripts/migrate_to_cloud.py --restart            # ignora el checkpoint previo
+"""
+import argparse
 import sys
 import os
-from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker
+import time
+from sqlalchemy import create_engine
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from db.models import Base, Question, Attempt, Skill
+from db.transfer import DEFAULT_CHUNK_SIZE, Checkpoint, migrate, migration_signature
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def normalize_url(url: str) -> str:
+    # Ensure PostgreSQL uses the correct driver for SQLAlchemy 2.0+
+    if url.startswith("postgres://") or url.startswith("postgresql://"):
+        url = url.replace("postgres://", "postgresql+psycopg2://", 1)
+        url = url.replace("postgresql://", "postgresql+psycopg2://", 1)
+    return url
+
 
-def migrate():
-    # 1. Setup Source (SQLite)
-    sqlite_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "dian_sim.db"))
-    sqlite_url = f"sqlite:///{sqlite_path}"
-    sqlite_engine = create_engine(sqlite_url)
-    SqliteSession = sessionmaker(bind=sqlite_engine)
-    sqlite_db = SqliteSession()
+def safe_url(url: str) -> str:
+    # Log host safely
+    return url.split("@")[1] if "@" in url else url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=f"sqlite:///{os.path.join(PROJECT_ROOT, 'dian_sim.db')}")
+    parser.add_argument("--dest", default=None, help="Por defecto DATABASE_URL (.env)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--checkpoint", default=os.path.join(PROJECT_ROOT, ".migrate_checkpoint.json"))
+    parser.add_argument("--restart", action="store_true")
+    args = parser.parse_args()
 
-    # 2. Setup Destination (PostgreSQL)
     from dotenv import load_dotenv
     load_dotenv()
-    pg_url = os.getenv("DATABASE_URL")
-    if not pg_url or "postgresql" not in pg_url:
-        print("Error: DATABASE_URL not set or not a PostgreSQL URL.")
-        return
-
-    if pg_url.startswith("postgresql://"):
-        pg_url = pg_url.replace("postgresql://", "postgresql+psycopg2://")
-    
-    pg_engine = create_engine(pg_url)
-    PgSession = sessionmaker(bind=pg_engine)
-    pg_db = PgSession()
-
-    print(f"Connecting to Cloud DB: {pg_url.split('@')[1]}") # Log host safely
-
-    # 3. Create Tables in Cloud
-    print("Creating tables in cloud...")
-    Base.metadata.create_all(bind=pg_engine)
-
-    # 4. Migrate Questions
-    print("Migrating Questions...")
-    questions = sqlite_db.query(Question).all()
-    count_q = 0
-    for q in questions:
-        # Check if already exists by hash
-        exists = pg_db.query(Question).filter_by(hash_norm=q.hash_norm).first()
-        if not exists:
-            # Create a new instance to avoid session conflicts
-            new_q = Question(
-                question_id=q.question_id,
-                track=q.track,
-                competency=q.competency,
-                topic=q.topic,
-                difficulty=q.difficulty,
-                stem=q.stem,
-                options_json=q.options_json,
-                correct_key=q.correct_key,
-                rationale=q.rationale,
-                source_refs=q.source_refs,
-                created_at=q.created_at,
-                hash_norm=q.hash_norm
-            )
-            pg_db.add(new_q)
-            count_q += 1
-    
-    pg_db.commit()
-    print(f"Migrated {count_q} new questions.")
-
-    # 5. Migrate Skills
-    print("Migrating Skills/Mastery...")
-    skills = sqlite_db.query(Skill).all()
-    count_s = 0
-    for s in skills:
-        exists = pg_db.query(Skill).filter_by(track=s.track, competency=s.competency, topic=s.topic).first()
-        if not exists:
-            new_s = Skill(
-                skill_id=s.skill_id,
-                track=s.track,
-                competency=s.competency,
-                topic=s.topic,
-                mastery_score=s.mastery_score,
-                priority_weight=s.priority_weight,
-                last_seen=s.last_seen,
-                updated_at=s.updated_at
-            )
-            pg_db.add(new_s)
-            count_s += 1
-    pg_db.commit()
-    print(f"Migrated {count_s} skill profiles.")
-
-    # 6. Migrate Attempts
-    print("Migrating Attempts...")
-    attempts = sqlite_db.query(Attempt).all()
-    count_a = 0
-    for a in attempts:
-        exists = pg_db.query(Attempt).filter_by(attempt_id=a.attempt_id).first()
-        if not exists:
-            new_a = Attempt(
-                attempt_id=a.attempt_id,
-                question_id=a.question_id,
-                created_at=a.created_at,
-                chosen_key=a.chosen_key,
-                is_correct=a.is_correct,
-                time_sec=a.time_sec,
-                confidence_1_5=a.confidence_1_5,
-                error_tag=a.error_tag,
-                notes=a.notes
-            )
-            pg_db.add(new_a)
-            count_a += 1
-    pg_db.commit()
-    print(f"Migrated {count_a} attempt history items.")
-
-    print("Migration finished successfully! 🚀")
-    
-    sqlite_db.close()
-    pg_db.close()
+    dest_url = args.dest or os.getenv("DATABASE_URL")
+    if not dest_url:
+        print("Error: DATABASE_URL not set and no --dest given.")
+        return 1
+    source_url, dest_url = normalize_url(args.source), normalize_url(dest_url)
+    if source_url == dest_url:
+        print("Error: source and destination are the same database.")
+        return 1
+
+    source = create_engine(source_url)
+    dest = create_engine(dest_url, pool_pre_ping=True, pool_size=4)
+    print(f"Connecting to Cloud DB: {safe_url(dest_url)}")
+
+    checkpoint = Checkpoint(args.checkpoint, migration_signature(source_url, dest_url), restart=args.restart)
+    t0 = time.perf_counter()
+    report = migrate(source, dest, checkpoint, args.chunk_size)
+    print(f"\nCopia terminada en {time.perf_counter() - t0:.1f} s. Verificación:")
+    print(f"{'tabla':>10} | {'filas origen':>12} | {'filas destino':>13} | {'checksum':>8}")
+    print("-" * 53)
+    for name, r in report.items():
+        status = "✅" if r["match"] else "⚠️"
+        print(f"{name:>10} | {r['source']['rows']:>12} | {r['dest']['rows']:>13} | {status:>8}")
+    attempts = report["attempts"]
+    if attempts["remapped"]:
+        print(f"ℹ️ {attempts['remapped']} preguntas ya existían en el destino con otro id (mismo hash_norm): "
+              "sus intentos quedaron apuntando a la del destino.")
+    if attempts["orphans"]:
+        print(f"⚠️ {attempts['orphans']} intentos sin pregunta en el origen quedaron con question_id NULL.")
+
+    if all(r["match"] for r in report.values()):
+        checkpoint.clear()
+        print("Migration finished successfully! 🚀")
+        return 0
+    print("⚠️ Hay diferencias: el destino ya tenía datos propios (p. ej. las preguntas con el mismo "
+          "hash_norm bajo otro id, que no se copian).")
+    return 2
+
 
 if __name__ == "__main__":
-    migrate()
+    sys.exit(main())
@@ -0,0 +1,24 @@
+"""
+Recalcula las tablas de analítica del Dashboard (daily_accuracy, skill_rollup)
+desde attempts/skills. Útil tras importar intentos o editar habilidades a mano.
+
+Uso:
+    python scripts/rebuild_analytics.py
+"""
+import sys
+import os
+
+# Add the project root directory to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db.session import SessionLocal
+from core.analytics import rebuild_analytics
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        days, nodes = rebuild_analytics(db)
+        db.commit()
+        print(f"✅ Analítica reconstruida: {days} días, {nodes} nodos de habilidades.")
+    finally:
+        db.close()
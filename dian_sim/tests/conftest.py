@@ -0,0 +1,46 @@
+import importlib
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Base
+
+# Eventos ORM de Question (search_text, partes del enunciado, facetas): las pruebas escriben por ORM
+importlib.import_module("core.question_store")
+
+
+def memory_engine(foreign_keys: bool = False):
+    """SQLite en memoria con el esquema de los modelos (create_all)."""
+    engine = create_engine("sqlite://")
+    if foreign_keys:
+        event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def engine():
+    engine = memory_engine()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def fk_engine():
+    """Igual que `engine` pero con las llaves foráneas activas (SQLite no las valida por defecto)."""
+    engine = memory_engine(foreign_keys=True)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
@@ -27,3 +27,968 @@ def test_mastery_update():
     # Caps
     assert calculate_mastery_update(True, 100.0) == 100.0
     assert calculate_mastery_update(False, 0.0) == 0.0
+
+def _make_pool():
+    from types import SimpleNamespace
+    from core.selection import QuestionPool
+    keys = [("FUNCIONAL", "Tributaria", "IVA"), ("FUNCIONAL", "Aduanera", "Aranceles"), ("INTEGRIDAD", "Ética", "Valores")]
+    skills = {
+        keys[0]: SimpleNamespace(mastery_score=10.0, priority_weight=3.0),
+        keys[1]: SimpleNamespace(mastery_score=60.0, priority_weight=1.0),
+        keys[2]: SimpleNamespace(mastery_score=90.0, priority_weight=1.0),
+    }
+    skill_idx = [0] * 30 + [1] * 30 + [2] * 30
+    ids = [f"q{i}" for i in range(90)]
+    return QuestionPool(ids, keys, skill_idx, [2] * 90, skills_map=skills), keys
+
+def test_pool_selection_mix():
+    import numpy as np
+    pool, _ = _make_pool()
+    selected = pool.select(20, rng=np.random.default_rng(0))
+    assert len(selected) == len(set(selected)) == 20
+    # 60/25/15: 12 débiles (q0-q29), 5 medias (q30-q59), 3 fuertes
+    weak = [q for q in selected if int(q[1:]) < 30]
+    assert len(weak) == 12
+
+def test_pool_update_skill_moves_bucket():
+    pool, keys = _make_pool()
+    pool.update_skill(keys[0], 95.0)
+    assert pool.buckets[0].size == 0
+    assert pool.buckets[2].size == 60
+    # Filtro por track deja solo las preguntas de INTEGRIDAD
+    mask = pool.mask(tracks=["INTEGRIDAD"])
+    assert set(pool.select(50, mask=mask)) == {f"q{i}" for i in range(60, 90)}
+
+def test_finalize_exam_batch_in_memory(db):
+    from db.models import Question, Attempt, Skill
+    from core.finalize import finalize_exam_batch
+
+    for i in range(4):
+        db.add(Question(question_id=f"q{i}", track="FUNCIONAL", competency="Tributaria", topic="IVA" if i < 2 else "Renta",
+                        difficulty=2, stem=f"Pregunta {i}", options_json={"A": "1", "B": "2"}, correct_key="A", hash_norm=f"h{i}"))
+    db.add(Skill(track="FUNCIONAL", competency="Tributaria", topic="IVA", mastery_score=50.0, priority_weight=1.0))
+    db.commit()
+
+    summary = finalize_exam_batch(db, ["q0", "q1", "q2", "q3"], {"q0": "A", "q1": "B", "q2": "A"})
+    assert summary["total"] == 4 and summary["correct"] == 2
+    assert set(summary["timings"]) == {"load_ms", "compute_ms", "write_ms"}
+    assert db.query(Attempt).count() == 4
+    assert db.query(Skill).count() == 2
+    iva = db.query(Skill).filter_by(topic="IVA").one()
+    assert iva.mastery_score == calculate_mastery_update(False, calculate_mastery_update(True, 50.0))
+
+def test_dedupe_index_lsh(tmp_path):
+    from core.dedupe_index import DedupeIndex
+    index = DedupeIndex(str(tmp_path / "dedupe.db"))
+    index.add_many([
+        ("q1", "SITUACIÓN: Un contribuyente presenta la declaración de renta fuera del plazo establecido. PREGUNTA: ¿Qué sanción aplica?"),
+        ("q2", "Definición del hecho generador del IVA en la importación de bienes"),
+    ])
+    matches = index.find_duplicates("SITUACION: un contribuyente presenta la declaracion de renta fuera de plazo establecido. PREGUNTA: ¿Que sancion aplica?")
+    assert matches and matches[0][2] == "q1"
+    assert index.find_duplicates("Régimen de zonas francas y usuarios industriales") == []
+    index.remove(["q1"])
+    assert len(index) == 1
+    index.close()
+
+def test_validate_import_errors_vectorized():
+    import pandas as pd
+    from core.import_utils import validate_import_errors, validate_import_df
+    df = pd.DataFrame({
+        'track': ['FUNCIONAL', ''], 'competency': ['c', 'c'], 'topic': ['t', 't'],
+        'stem': ['Enunciado 1', 'Enunciado 2'], 'options_A': ['a', 'a'], 'options_B': ['b', 'b'],
+        'options_C': ['c', 'c'], 'correct_key': ['A', 'E'], 'difficulty': [2, 9],
+    })
+    errors = validate_import_errors(df)
+    assert list(errors['fila']) == [3, 3, 3]
+    assert list(errors['campo']) == ['track', 'correct_key', 'difficulty']
+    is_valid, err_list = validate_import_df(df)
+    assert not is_valid and err_list[0] == "Fila 3: El campo 'track' está vacío."
+
+def test_import_dataframe_skips_duplicates(monkeypatch, db):
+    import pandas as pd
+    from db.models import Question
+    from core import question_store
+
+    df = pd.DataFrame({
+        'track': ['funcional'] * 5, 'competency': ['c'] * 5, 'topic': ['t'] * 5,
+        'stem': ['Pregunta uno', 'Pregunta dos', 'PREGUNTA UNO!', 'Pregunta tres', 'Pregunta cuatro'],
+        'options_A': ['a'] * 5, 'options_B': ['b'] * 5, 'options_C': ['c'] * 5, 'correct_key': ['a'] * 5,
+    })
+    monkeypatch.setattr(question_store, 'after_questions_committed', lambda inserted: None)
+    result = question_store.import_dataframe(db, df, chunk_size=2)
+    assert result['inserted'] == 4 and result['duplicates'] == 1
+    q = db.query(Question).filter_by(stem='Pregunta dos').one()
+    assert q.track == 'FUNCIONAL' and q.correct_key == 'A' and q.difficulty == 2
+
+
+def test_token_bucket_limits_rate():
+    from core.generators.rate_limit import TokenBucket
+    clock = [0.0]
+    bucket = TokenBucket(rate=2.0, capacity=2, clock=lambda: clock[0], sleep=lambda s: clock.__setitem__(0, clock[0] + s))
+    for _ in range(6):
+        bucket.acquire()
+    # 2 de ráfaga + 4 a 2/s => 2 segundos simulados
+    assert clock[0] == pytest.approx(2.0)
+    assert not bucket.try_acquire()
+    assert bucket.acquire(timeout=0.1) is False
+
+
+def test_llm_fake_provider_concurrent_partial_results():
+    from core.generators.fake import FakeLLMBackend
+    from core.generators.llm import LLMGenerator
+    from core.generators.rate_limit import TokenBucket
+
+    gen = LLMGenerator("fake", "")
+    gen.fake_backend = FakeLLMBackend(latency_s=0.02)
+    gen.limiter = TokenBucket(1000, 100)
+    seen = []
+    results = gen.generate_from_text("texto", 22, concurrency=4, on_batch=lambda b, done, total: seen.append((len(b), done, total)))
+    assert len(results) == 22
+    assert sorted(n for n, _, _ in seen) == [2, 5, 5, 5, 5]
+    assert [d for _, d, _ in seen] == [1, 2, 3, 4, 5]
+    assert gen.fake_backend.max_in_flight > 1
+
+    # Un lote fallido no descarta los que ya llegaron
+    gen.fake_backend = FakeLLMBackend(latency_s=0.0, fail_every=3)
+    partial = gen.generate_from_text("texto", 20, concurrency=1)
+    assert len(partial) == 10
+
+
+def test_llm_cache_lru_ttl_and_explain(tmp_path):
+    from core.llm_cache import LLMCache, make_key
+    from core.generators.fake import FakeLLMBackend
+    from core.generators.llm import LLMGenerator
+
+    clock = [1000.0]
+    cache = LLMCache(str(tmp_path / "cache.db"), max_entries=2, ttl_s=60, clock=lambda: clock[0])
+    for i in range(3):
+        clock[0] += 1
+        cache.set(make_key("k", i), f"v{i}")
+    cache.evict()
+    assert cache.get(make_key("k", 0)) is None  # LRU desalojada
+    assert cache.get(make_key("k", 2)) == "v2"
+    clock[0] += 120
+    assert cache.get(make_key("k", 2)) is None  # vencida por TTL
+    assert cache.stats()["generic"] == {"hits": 1, "misses": 2, "hit_rate": 1 / 3}
+
+    gen = LLMGenerator("fake", "", cache=cache)
+    gen.fake_backend = FakeLLMBackend(latency_s=0.0)
+    q = {"question_id": "q1", "stem": "x", "rationale": "r"}
+    first = gen.explain_question(q)
+    assert gen.explain_question(q) == first
+    assert cache.stats()["explain"]["hits"] == 1
+    # Lotes: misma solicitud => mismas preguntas; cada lote con su propia llave
+    batch_a = gen.generate_from_text("texto", 10, concurrency=1)
+    batch_b = gen.generate_from_text("texto", 10, concurrency=1)
+    assert [q["stem"] for q in batch_a] == [q["stem"] for q in batch_b]
+    assert len({q["stem"] for q in batch_a}) == 10
+    cache.close()
+
+
+def test_bank_search_fts_sqlite(engine, db):
+    from sqlalchemy import text
+    from db.models import Question
+    from core.bank_search import ensure_search_index, search_page
+    from core.question_store import build_question_row, insert_questions
+
+    # Fila antigua sin search_text: ensure_search_index la rellena
+    db.execute(Question.__table__.insert(), [{"question_id": "old", "track": "FUNCIONAL", "competency": "C", "topic": "T",
+               "difficulty": 1, "stem": "Notificación por edicto", "options_json": {}, "hash_norm": "h-old"}])
+    db.commit()
+    with engine.begin() as conn:
+        ensure_search_index(conn)
+
+    insert_questions(db, [build_question_row({"track": "FUNCIONAL", "competency": "C", "topic": "T", "difficulty": 2,
+                                             "stem": f"Sanción por extemporaneidad {i}", "rationale": "Artículo 641 E.T.",
+                                             "options_json": {}}) for i in range(3)])
+    db.add(Question(question_id="orm", track="INTEGRIDAD", competency="C", topic="T", difficulty=3,
+                    stem="Conflicto de interés", rationale="Sanción disciplinaria", options_json={}, hash_norm="h-orm"))
+    db.commit()
+
+    page, total = search_page(db, "SANCION")  # sin tildes ni mayúsculas
+    assert total == 4 and len(page) == 4
+    assert search_page(db, "notificacion")[0][0].question_id == "old"
+    page, total = search_page(db, "sanc", track="INTEGRIDAD")  # prefijo + filtro
+    assert total == 1 and page[0].question_id == "orm"
+
+    db.delete(db.get(Question, "orm"))
+    db.commit()
+    assert search_page(db, "conflicto") == ([], 0)
+    assert db.execute(text("SELECT count(*) FROM questions_fts")).scalar() == 4
+
+    # El índice va por search_rowid: renumerar el rowid implícito (VACUUM) no lo desincroniza
+    db.execute(text("UPDATE questions SET rowid = rowid + 100"))
+    db.commit()
+    assert search_page(db, "notificacion")[0][0].question_id == "old"
+    page, total = search_page(db, "sanc", track="FUNCIONAL")
+    assert total == 3 and {q.stem[-1] for q in page} == {"0", "1", "2"}
+
+
+def test_bank_keyset_pagination_and_count_cache(session_factory, db):
+    import datetime
+    from db.models import Question
+    from core import bank_pages
+    from core.bank_version import bump_bank_version
+    from core.question_store import delete_questions
+
+    base = datetime.datetime(2026, 1, 1)
+    # Varias preguntas comparten created_at (carga masiva): desempata question_id
+    db.execute(Question.__table__.insert(), [{
+        "question_id": f"q{i:03d}", "track": "FUNCIONAL" if i % 2 else "INTEGRIDAD", "competency": "C", "topic": "T",
+        "difficulty": 1 + i % 3, "stem": f"s{i}", "options_json": {}, "hash_norm": f"h{i}",
+        "created_at": base + datetime.timedelta(minutes=i // 4),
+    } for i in range(95)])
+    db.commit()
+    expected = [q.question_id for q in db.query(Question).order_by(Question.created_at.desc(), Question.question_id.desc())]
+
+    bank_pages.invalidate_page_cache()
+    seen, cursor = [], None
+    while True:
+        rows, cursor = bank_pages.fetch_page(db, after=cursor, limit=7)
+        seen += [q.question_id for q in rows]
+        if len(rows) < 7:
+            break
+    assert seen == expected
+
+    for page in (1, 3, 11, 12, 14):
+        rows, _, _ = bank_pages.fetch_page_number(db, page, limit=7)
+        assert [q.question_id for q in rows] == expected[(page - 1) * 7: page * 7]
+    assert bank_pages.fetch_page_number(db, 30, limit=7)[0] == []
+
+    assert bank_pages.count_questions(db, "FUNCIONAL", [1, 2]) == 32
+    db.execute(Question.__table__.delete().where(Question.question_id == "q001"))
+    db.commit()
+    assert bank_pages.count_questions(db, "FUNCIONAL", [2, 1]) == 32  # cacheado: el DELETE directo no movió la versión
+    with session_factory() as other:  # la versión vive en la BD: la mueve cualquier proceso
+        bump_bank_version(other)
+        other.commit()
+    assert bank_pages.count_questions(db, "FUNCIONAL", [1, 2]) == 31
+    delete_questions(db, ["q003"])  # las rutas de escritura la mueven en su transacción
+    db.commit()
+    assert bank_pages.count_questions(db, "FUNCIONAL", [1, 2]) == 30
+
+
+def test_versioned_migrations(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine, event, inspect, text
+    from db.migrations import SCHEMA_VERSION, SKIP_ENV, get_schema_version, run_migrations
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        # Esquema anterior a las columnas de taxonomía / búsqueda
+        conn.execute(text("CREATE TABLE questions (question_id VARCHAR(36) PRIMARY KEY, track VARCHAR NOT NULL, "
+                          "competency VARCHAR NOT NULL, topic VARCHAR NOT NULL, difficulty INTEGER NOT NULL, "
+                          "stem TEXT NOT NULL, options_json JSON NOT NULL, correct_key VARCHAR, rationale TEXT, "
+                          "source_refs TEXT, created_at DATETIME, hash_norm VARCHAR NOT NULL UNIQUE)"))
+        conn.execute(text("INSERT INTO questions VALUES ('q1', 'FUNCIONAL', 'C', 'T', 1, 'Sanción mínima', '{}', "
+                          "'A', NULL, NULL, NULL, 'h1')"))
+
+    monkeypatch.delenv(SKIP_ENV, raising=False)
+    assert get_schema_version(engine) == 0
+    assert run_migrations(engine) == SCHEMA_VERSION
+    cols = {c["name"] for c in inspect(engine).get_columns("questions")}
+    assert {"macro_dominio", "micro_competencia", "search_text"} <= cols
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT search_text FROM questions")).scalar() == "sancion minima"
+        assert conn.execute(text("SELECT question_count FROM taxonomy_facets")).scalar() == 1
+
+    # Los pasos (DDL congelado por versión) llegan al mismo esquema que una BD nueva
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert run_migrations(fresh) == SCHEMA_VERSION
+
+    def schema(eng):
+        ins = inspect(eng)
+        return {t: ({c["name"] for c in ins.get_columns(t)}, ins.get_pk_constraint(t)["constrained_columns"],
+                    sorted((i["name"], i["column_names"]) for i in ins.get_indexes(t)))
+                for t in ins.get_table_names()}
+    assert schema(engine) == schema(fresh)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert run_migrations(engine) == SCHEMA_VERSION
+    assert len(statements) == 1  # al día: solo se lee la versión
+
+    monkeypatch.setenv(SKIP_ENV, "1")
+    assert run_migrations(engine) == -1
+    assert len(statements) == 1
+
+
+def test_migration_merges_duplicate_user_stats(tmp_path):
+    import datetime
+    from sqlalchemy import create_engine, text
+    from db.migrations import SCHEMA_VERSION, run_migrations
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        # Base anterior al índice único: get_user_stats podía crear dos filas
+        conn.execute(text("CREATE TABLE questions (question_id VARCHAR(36) PRIMARY KEY, track VARCHAR NOT NULL, "
+                          "competency VARCHAR NOT NULL, topic VARCHAR NOT NULL, difficulty INTEGER NOT NULL, "
+                          "stem TEXT NOT NULL, options_json JSON NOT NULL, correct_key VARCHAR, rationale TEXT, "
+                          "source_refs TEXT, created_at DATETIME, hash_norm VARCHAR NOT NULL UNIQUE)"))
+        conn.execute(text("CREATE TABLE user_stats (id INTEGER PRIMARY KEY, current_streak INTEGER, "
+                          "max_streak INTEGER, total_points INTEGER, last_activity DATETIME)"))
+        conn.execute(text("INSERT INTO user_stats VALUES (1, 2, 7, 300, '2026-01-05 10:00:00.000000'), "
+                          "(2, 4, 4, 120, '2026-01-09 08:00:00.000000')"))
+
+    assert run_migrations(engine, force=True) == SCHEMA_VERSION
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, user_id, current_streak, max_streak, total_points, last_activity "
+                                 "FROM user_stats")).all()
+    assert len(rows) == 1
+    row = rows[0]
+    assert (row.id, row.user_id, row.current_streak, row.max_streak, row.total_points) == (1, "default", 4, 7, 300)
+    assert str(row.last_activity).startswith(str(datetime.datetime(2026, 1, 9, 8, 0)))
+
+
+def test_exam_snapshot_records(session_factory, db):
+    import pickle
+    from db.models import Question
+    from core.exam_snapshot import QuestionRecord, build_exam_snapshot, snapshot_for
+    from core.stem_parts import split_stem
+
+    assert split_stem("SITUACIÓN: Un caso. PREGUNTA: ¿Qué hacer?") == ("Un caso.", "¿Qué hacer?")
+    assert split_stem("Pregunta directa") == (None, "Pregunta directa")
+
+    for i in range(3):
+        db.add(Question(question_id=f"q{i}", track="FUNCIONAL", competency="C", topic=f"T{i}", difficulty=2,
+                        stem=f"SITUACIÓN: caso {i}. PREGUNTA: ¿{i}?", options_json={"A": "a", "B": "b"},
+                        correct_key="A", rationale="r", hash_norm=f"h{i}"))
+    db.commit()
+
+    snap = build_exam_snapshot(db, ["q2", "missing", "q0"])
+    assert snap.question_ids == ("q2", "q0")
+    assert snap[0].situation == "caso 2." and snap[0].question_text == "¿2?" and snap[0].options == {"A": "a", "B": "b"}
+    with pytest.raises(AttributeError):
+        snap[0].correct_key = "B"
+    assert not hasattr(snap[0], "__dict__")
+    assert pickle.loads(pickle.dumps(snap[1])).to_dict()["options_json"] == {"A": "a", "B": "b"}
+
+    state = {"exam_snapshot": snap}
+    calls = []
+    factory = lambda: calls.append(1) or session_factory()
+    assert snapshot_for(state, ["q2", "q0"], factory) is snap and not calls
+    assert snapshot_for(state, ["q1"], factory).question_ids == ("q1",) and len(calls) == 1
+    assert isinstance(state["exam_snapshot"][0], QuestionRecord)
+
+def test_analytics_incremental_matches_rebuild(db):
+    import datetime
+    from db.models import Question, Skill
+    from core.analytics import load_daily_accuracy, load_skill_rollup, rebuild_analytics
+    from core.finalize import finalize_exam_batch
+
+    for i in range(4):
+        db.add(Question(question_id=f"q{i}", track="FUNCIONAL", competency="Tributaria", topic="IVA" if i < 2 else "Renta",
+                        macro_dominio="Fiscalización" if i == 3 else None, difficulty=2, stem=f"Pregunta {i}",
+                        options_json={"A": "1", "B": "2"}, correct_key="A", hash_norm=f"h{i}"))
+    db.add(Skill(track="FUNCIONAL", competency="Tributaria", topic="IVA", mastery_score=50.0, priority_weight=1.0))
+    db.commit()
+    rebuild_analytics(db)
+    db.commit()
+
+    finalize_exam_batch(db, ["q0", "q1", "q2"], {"q0": "A", "q1": "B", "q2": "A"})
+    # q3 mueve la habilidad Renta de "Transversal" a "Fiscalización"
+    finalize_exam_batch(db, ["q3"], {"q3": "B"})
+
+    def snapshot():
+        daily = load_daily_accuracy(db)
+        rollup = load_skill_rollup(db).sort_values(["Macro-Dominio", "Micro-Competencia"]).reset_index(drop=True)
+        return daily, rollup
+
+    daily, rollup = snapshot()
+    assert list(daily["Intentos"]) == [4]
+    assert daily["Fecha"][0] == datetime.datetime.utcnow().date()
+    assert daily["Porcentaje"][0] == 50.0
+    assert list(rollup["Macro-Dominio"]) == ["Fiscalización", "Transversal"]
+    assert list(rollup["Habilidades"]) == [1, 1]
+
+    rebuild_analytics(db)
+    daily2, rollup2 = snapshot()
+    assert daily.equals(daily2)
+    assert list(rollup2["Dominio"]) == list(rollup["Dominio"])
+
+def test_review_scheduler_due_queue(db):
+    import datetime
+    import numpy as np
+    from db.models import Question, ReviewState
+    from core import scheduler
+
+    now = datetime.datetime(2026, 3, 1, 12, 0)
+    first = scheduler.next_review(None, True, now)
+    assert first.stability == scheduler.FIRST_INTERVAL_DAYS and first.due_at == now + datetime.timedelta(days=1)
+    lapse = scheduler.next_review(first, False, now)
+    assert lapse.reps == 0 and lapse.lapses == 1 and lapse.due_at < first.due_at
+
+    pool, keys = _make_pool()
+    db.add_all([Question(question_id=f"q{i}", track="FUNCIONAL", competency="c", topic="t", difficulty=2,
+                         stem=f"Pregunta {i}", options_json={"A": "1"}, correct_key="A", hash_norm=f"h{i}") for i in range(90)])
+    db.commit()
+
+    # q5 fallada hace 2 días (la más vencida), q7 fallada hace 12 h, q9 acertada hace 12 h (vence en 12 h)
+    scheduler.record_reviews(db, [("q5", False)], now - datetime.timedelta(days=2))
+    scheduler.record_reviews(db, [("q7", False), ("q9", True)], now - datetime.timedelta(hours=12))
+    db.commit()
+    assert db.query(ReviewState).count() == 3
+    assert scheduler.count_due(db, now) == 2
+    assert scheduler.due_question_ids(db, 5, now, batch_size=1) == ["q5", "q7"]
+
+    selected, n_due = scheduler.select_review_session(db, pool, 10, now=now, rng=np.random.default_rng(0))
+    assert n_due == 2 and {"q5", "q7"} <= set(selected) and len(set(selected)) == 10
+    # Con filtro de eje INTEGRIDAD (q60-q89) ninguna pendiente pasa y se usa la mezcla 60/25/15
+    mask = pool.mask(tracks=["INTEGRIDAD"])
+    selected, n_due = scheduler.select_review_session(db, pool, 5, mask=mask, now=now)
+    assert n_due == 0 and all(int(q[1:]) >= 60 for q in selected)
+
+def _make_pdf(n_pages: int) -> bytes:
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_font("Helvetica", size=12)
+    for i in range(n_pages):
+        pdf.add_page()
+        pdf.cell(0, 10, f"Articulo {i + 1} del Estatuto Tributario")
+    return bytes(pdf.output())
+
+def test_pdf_extract_parallel_and_cached(tmp_path):
+    from core import pdf_extract
+    data = _make_pdf(20)
+    assert pdf_extract.parse_page_range("", 20) == list(range(20))
+    assert pdf_extract.parse_page_range("3-4, 1, 19-", 20) == [0, 2, 3, 18, 19]
+    with pytest.raises(ValueError):
+        pdf_extract.parse_page_range("15-25", 20)
+
+    cache = pdf_extract.PdfTextCache(str(tmp_path / "pdf_text.db"))
+    pages = list(pdf_extract.iter_pages(data, cache=cache, workers=2, chunk_pages=4))
+    assert [p for p, _ in pages] == list(range(20))
+    assert "Articulo 7 " in pages[6][1]
+    assert pdf_extract.page_count(data, cache=cache) == 20
+
+    # Las páginas quedaron en la caché por sha256
+    sha = pdf_extract.file_sha256(data)
+    assert len(cache.get_pages(sha, range(20))) == 20
+    assert pdf_extract.extract_text(data, [6, 7], cache=cache).splitlines()[0] == pages[6][1].splitlines()[0]
+    cache.close()
+
+def test_retrieval_batch_contexts_cover_document():
+    from core.generators.retrieval import CHARS_PER_TOKEN, plan_batch_contexts, split_chunks
+    topics = ["sanción por extemporaneidad", "régimen simple de tributación", "devolución de saldos a favor",
+              "zonas francas", "facturación electrónica", "cobro coactivo"]
+    text = "\n".join(f"ARTÍCULO {i + 1}. Disposición sobre {topics[i % 6]}. " + f"Detalle {topics[i % 6]} número {i}. " * 12
+                     for i in range(60))
+    chunks = split_chunks(text)
+    assert len(chunks) == 60 and chunks[4].startswith("ARTÍCULO 5.")
+
+    assert plan_batch_contexts("texto corto", 3) == ["texto corto"] * 3
+    contexts = plan_batch_contexts(text, 4, context_tokens=500)
+    assert len(contexts) == 4
+    assert all(len(c) <= 500 * CHARS_PER_TOKEN for c in contexts)
+    # Lotes distintos y agrupados por tema
+    assert len(set(contexts)) == 4
+    assert all(len({t for t in topics if t in c}) == 1 for c in contexts)
+    # Con enfoque, el primer lote trae los artículos del tema pedido
+    focused = plan_batch_contexts(text, 2, context_tokens=500, query="cobro coactivo")
+    assert "cobro coactivo" in focused[0] and "zonas francas" not in focused[0]
+
+def test_pdf_reports_logo_resource_and_batch(tmp_path):
+    import pypdf
+    from core import pdf_utils
+    details = [{"stem": f"Pregunta {i} sobre el régimen sancionatorio", "user_ans": "A", "correct_key": "A" if i % 2 else "B",
+                "rationale": "Artículo 641 del Estatuto Tributario. " * 4} for i in range(60)]
+    buf = pdf_utils.generate_exam_pdf({"total": 60, "correct": 30}, details)
+    assert buf.tell() == 0
+    reader = pypdf.PdfReader(buf)
+    assert len(reader.pages) > 3
+    if pdf_utils._logo_data() is not None:
+        # Un solo recurso de imagen compartido por todas las páginas
+        xobjects = {p["/Resources"]["/XObject"].raw_get("/I1").idnum for p in reader.pages}
+        assert len(xobjects) == 1
+
+    jobs = [({"total": 1, "correct": 1}, details[:1], f"r{i}.pdf") for i in range(3)]
+    paths = pdf_utils.generate_reports_batch(jobs, str(tmp_path), workers=2, chunksize=1)
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["r0.pdf", "r1.pdf", "r2.pdf"]
+    assert all(open(p, "rb").read(5) == b"%PDF-" for p in paths)
+    assert pdf_utils.generate_reports_batch(jobs[:1])[0][:5] == b"%PDF-"
+
+
+def test_migrate_to_cloud_resumes_and_verifies(tmp_path):
+    import datetime
+    from sqlalchemy import create_engine, func, select
+    from sqlalchemy.orm import Session
+    from db.migrations import run_migrations
+    from db.models import Attempt, Question, Skill
+    from db.transfer import Checkpoint, migrate, verify
+
+    source = create_engine(f"sqlite:///{tmp_path / 'local.db'}")
+    dest = create_engine(f"sqlite:///{tmp_path / 'cloud.db'}")
+    run_migrations(source, force=True)
+    now = datetime.datetime(2026, 1, 1, 8, 0)
+    with Session(source) as db:
+        for i in range(25):
+            db.add(Question(question_id=f"q{i:02d}", track="FUNCIONAL", competency="C", topic="T", difficulty=2,
+                            stem=f"Pregunta {i}", options_json={"A": "x", "B": "y"}, correct_key="A",
+                            hash_norm=f"h{i}", macro_dominio="Tributaria", micro_competencia="IVA"))
+            db.add(Attempt(question_id=f"q{i:02d}", chosen_key="A", is_correct=i % 2 == 0, created_at=now))
+        db.add(Skill(track="FUNCIONAL", competency="C", topic="T", mastery_score=42.5,
+                     macro_dominio="Tributaria", micro_competencia="IVA"))
+        db.commit()
+
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+
+    def interrupt(name, rows):
+        if name == "attempts" and rows >= 10:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        migrate(source, dest, Checkpoint(checkpoint_path, "sig"), chunk_size=10, on_chunk=interrupt)
+    resumed = Checkpoint(checkpoint_path, "sig")
+    assert resumed.table("questions")["done"] and resumed.table("attempts")["rows"] == 10
+
+    report = migrate(source, dest, resumed, chunk_size=10)
+    assert all(r["match"] for r in report.values())
+    assert report["attempts"]["dest"]["rows"] == 25
+    with dest.connect() as conn:
+        assert conn.execute(select(func.count()).where(Question.macro_dominio == "Tributaria")).scalar() == 25
+
+    # Repetir desde cero es idempotente (ON CONFLICT DO NOTHING / skills deduplicadas)
+    migrate(source, dest, Checkpoint(checkpoint_path, "sig", restart=True), chunk_size=10)
+    assert all(r["match"] for r in verify(source, dest).values())
+
+
+def test_migrate_to_cloud_maps_attempts_to_existing_questions(tmp_path):
+    from sqlalchemy import create_engine, event, select
+    from sqlalchemy.orm import Session
+    from db.migrations import run_migrations
+    from db.models import Attempt, Question
+    from db.transfer import Checkpoint, migrate
+
+    def question(qid, hash_norm):
+        return Question(question_id=qid, track="FUNCIONAL", competency="C", topic="T", difficulty=2,
+                        stem=f"Pregunta {hash_norm}", options_json={"A": "x", "B": "y"}, correct_key="A",
+                        hash_norm=hash_norm)
+
+    source = create_engine(f"sqlite:///{tmp_path / 'local.db'}")
+    dest = create_engine(f"sqlite:///{tmp_path / 'cloud.db'}")
+    # Como PostgreSQL: un intento hacia una pregunta inexistente rompe la copia
+    event.listen(dest, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    run_migrations(source, force=True)
+    run_migrations(dest, force=True)
+    with Session(source) as db:
+        for i in range(5):
+            db.add(question(f"q{i}", f"h{i}"))
+            db.add(Attempt(question_id=f"q{i}", chosen_key="A", is_correct=True))
+        # Intento huérfano (SQLite local sin llaves foráneas)
+        db.add(Attempt(question_id="borrada", chosen_key="B", is_correct=False))
+        db.commit()
+    with Session(dest) as db:
+        db.add(question("nube-2", "h2"))
+        db.commit()
+
+    report = migrate(source, dest, Checkpoint(str(tmp_path / "checkpoint.json"), "sig"), chunk_size=2)
+    assert report["attempts"]["match"] and report["attempts"]["dest"]["rows"] == 6
+    assert report["attempts"]["remapped"] == 1 and report["attempts"]["orphans"] == 1
+    # El destino tenía su propia versión de h2: questions difiere a propósito
+    assert not report["questions"]["match"] and report["questions"]["dest"]["rows"] == 5
+    with dest.connect() as conn:
+        targets = sorted(conn.execute(select(Attempt.question_id)).scalars(), key=str)
+    assert targets == sorted(["q0", "q1", "nube-2", "q3", "q4", None], key=str)
+
+
+def test_streaming_export_formats(session_factory):
+    import csv
+    import io
+    from openpyxl import load_workbook
+    from core.export import EXPORT_COLUMNS, deferred_export, export_questions, parquet_available
+    from db.models import Question
+
+    with session_factory() as db:
+        for i in range(30):
+            db.add(Question(question_id=f"q{i:02d}", track="FUNCIONAL", competency="C", topic="T", difficulty=1 + i % 3,
+                            stem=f"Enunciado {i}\ncon | barra\x0b", options_json={"A": "a", "B": "b", "C": "c"},
+                            correct_key="A", rationale=None if i % 2 else "Porque sí", hash_norm=f"h{i}"))
+        db.commit()
+
+        ws = load_workbook(export_questions(db, "xlsx"), read_only=True).active
+        rows = list(ws.values)
+        assert list(rows[0]) == EXPORT_COLUMNS and len(rows) == 31
+        assert rows[1][4] == "Enunciado 0\ncon | barra" and rows[1][8] is None  # sin opción D
+
+        selected = ["q05", "q07", "q99"]
+        text = io.TextIOWrapper(export_questions(db, "csv", question_ids=selected), encoding="utf-8-sig")
+        assert [r["stem"] for r in csv.DictReader(text)] == ["Enunciado 5\ncon | barra\x0b", "Enunciado 7\ncon | barra\x0b"]
+
+        lines = export_questions(db, "txt", question_ids=["q02"]).read().decode("utf-8").split("\n")
+        assert lines[1] == "FUNCIONAL|C|T|Enunciado 2 con   barra\x0b|a|b|c||A|Porque sí|3"
+
+        if parquet_available():
+            import pandas as pd
+            df = pd.read_parquet(export_questions(db, "parquet"))
+            assert list(df.columns) == EXPORT_COLUMNS and len(df) == 30
+
+    # La descarga diferida abre su propia sesión y retorna bytes
+    data = deferred_export(session_factory, "txt", ["q01"])()
+    assert isinstance(data, bytes) and data.count(b"\n") == 1
+
+
+def test_bulk_delete_questions_and_attempts(fk_engine):
+    import datetime
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+    from core.analytics import rebuild_analytics
+    from core.bank_search import ensure_search_index, search_page
+    from core.question_store import build_question_row, delete_matching, delete_questions, insert_questions
+    from db.models import DEFAULT_USER_ID, Attempt, DailyAccuracy, Question, ReviewState
+
+    engine = fk_engine
+    with engine.begin() as conn:
+        ensure_search_index(conn)
+    day = datetime.datetime(2026, 3, 1, 10, 0)
+    with Session(engine) as db:
+        insert_questions(db, [build_question_row({
+            "question_id": f"q{i:02d}", "track": "FUNCIONAL" if i < 20 else "INTEGRIDAD", "competency": "C",
+            "topic": "T", "difficulty": 1 + i % 3, "stem": f"{'Sanción' if i % 2 else 'Régimen'} número {i}",
+            "options_json": {"A": "a", "B": "b"}, "correct_key": "A"}) for i in range(30)], chunk_size=7)
+        for i in range(30):
+            db.add(Attempt(question_id=f"q{i:02d}", chosen_key="A", is_correct=i % 3 == 0, created_at=day))
+            db.add(ReviewState(question_id=f"q{i:02d}", stability=1.0, ease=2.5, reps=1, lapses=0,
+                               last_review=day, due_at=day))
+        rebuild_analytics(db)
+        db.commit()
+
+        # Selección: los intentos quedan huérfanos (question_id NULL) y se conservan
+        result = delete_questions(db, ["q00", "q01", "q02", "q99"], chunk_size=2)
+        db.commit()
+        assert result["questions"] == 3 and result["ids"] == ["q00", "q01", "q02", "q99"]
+        assert db.execute(select(func.count()).select_from(Attempt).where(Attempt.question_id.is_(None))).scalar() == 3
+        assert db.get(DailyAccuracy, (DEFAULT_USER_ID, day.date())).attempts == 30
+
+        # Filtro: eje + búsqueda FTS, borrando también los intentos y descontándolos del Dashboard
+        result = delete_matching(db, track="FUNCIONAL", search="sancion", delete_attempts=True, chunk_size=3)
+        db.commit()
+        expected = [f"q{i:02d}" for i in range(3, 20, 2)]
+        assert sorted(result["ids"]) == expected and result["attempts"] == len(expected)
+        assert db.get(Question, "q03") is None and db.get(ReviewState, (DEFAULT_USER_ID, "q03")) is None
+        assert search_page(db, "sancion", track="FUNCIONAL")[1] == 0
+        assert search_page(db, "sancion")[1] == 5  # INTEGRIDAD intactas
+        stats = db.get(DailyAccuracy, (DEFAULT_USER_ID, day.date()))
+        assert stats.attempts == 30 - len(expected)
+        assert stats.correct == 10 - sum(1 for q in expected if int(q[1:]) % 3 == 0)
+
+
+def test_synthetic_corpus_reproducible_and_loadable(engine):
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+    from core.dedupe import compute_hash, search_text_for
+    from core.generators.synthetic import load_corpus, question_batches
+    from db.migrations import run_migrations
+    from db.models import Attempt, DailyAccuracy, Question, ReviewState, Skill
+
+    first = [r for batch in question_batches(300, seed=7, batch_size=128, near_dup_rate=0.2) for r in batch]
+    again = [r for batch in question_batches(300, seed=7, batch_size=128, near_dup_rate=0.2) for r in batch]
+    assert [r["question_id"] for r in first] == [r["question_id"] for r in again]
+    for r in first:
+        # Piezas normalizadas una vez == normalizar el texto completo
+        assert r["hash_norm"] == compute_hash(r["stem"])
+        assert r["search_text"] == search_text_for(r["stem"], r["rationale"])
+        assert r["options_json"][r["correct_key"]].startswith("Aplicar la normativa")
+
+    run_migrations(engine, force=True)  # sobre create_all: pasos idempotentes + índice FTS
+    with Session(engine) as db:
+        counts = load_corpus(db, 500, 1000, seed=3, batch_size=200)
+        assert counts["questions"] == db.execute(select(func.count()).select_from(Question)).scalar() == 500
+        assert counts["attempts"] == 1000
+        # Simulacros completos de 20 intentos con el mismo created_at
+        assert db.execute(select(func.count(func.distinct(Attempt.created_at)))).scalar() == 50
+        assert db.execute(select(func.sum(DailyAccuracy.attempts))).scalar() == 1000
+        assert db.execute(select(func.count()).select_from(ReviewState)).scalar() > 0
+        assert db.execute(select(func.count()).select_from(Skill)).scalar() == counts["skills"]
+
+
+def test_benchmark_suite_json_and_thresholds():
+    import importlib.util
+    import os
+    path = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "suite.py")
+    spec = importlib.util.spec_from_file_location("bench_suite", path)
+    suite = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(suite)
+
+    results = suite.run_suite([200], ["selection.pool", "finalize.exam_batch", "import.validate"], repeat=1,
+                              memory=True, log=lambda msg: None)
+    assert [(r["case"], r["size"]) for r in results] == [
+        ("selection.pool", 200), ("finalize.exam_batch", 200), ("import.validate", 200)]
+    assert all(r["min_ms"] <= r["median_ms"] <= r["max_ms"] for r in results)
+
+    assert suite.threshold_for({"import.*": 5, "import.validate@200": 7}, "import.validate", 200) == 7
+    assert suite.threshold_for({"import.*": 5}, "import.validate", 1000) == 5
+    assert suite.check(results, {"selection.pool": 1e6}) == []
+    failures = suite.check(results, {"finalize.*": 0.0})
+    assert len(failures) == 1 and failures[0].startswith("finalize.exam_batch@200")
+    baseline = [dict(r, median_ms=r["median_ms"] / 10) for r in results]
+    assert len(suite.check(results, baseline=baseline, max_regression=0.5)) == 3
+
+
+def test_achievement_engine_bitset_and_single_roundtrip(engine):
+    import datetime
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from core.achievements import (EXAM_FINISHED, POINTS_CROSSED, STREAK_CHANGED, ExamOutcome, detect_events,
+                                   evaluate, mask_from_names, unlocked_rules)
+    from core.gamification import update_user_stats
+    from db.models import Achievement, UserStats
+
+    # Solo se evalúan las reglas del evento, y nunca las ya desbloqueadas
+    outcome = ExamOutcome(correct=5, total=10, streak=7, points=2000)
+    mask, unlocked = evaluate(0, {STREAK_CHANGED}, outcome)
+    assert [r.name for r in unlocked] == ["Constancia", "Imparable"]
+    assert evaluate(mask, {STREAK_CHANGED}, outcome) == (mask, [])
+    assert [r.name for r in evaluate(mask, {POINTS_CROSSED}, outcome)[1]] == ["Veterano"]
+    assert detect_events(2, 2, 1400, 1600, 3, 10) == {EXAM_FINISHED, POINTS_CROSSED}
+    assert detect_events(2, 3, 1600, 1700, 10, 10) == {EXAM_FINISHED, STREAK_CHANGED, "perfect_exam"}
+    assert mask_from_names(["Primer Paso", "Perfección", "desconocido"]) == 0b1001
+
+    with Session(engine) as db:
+        _, _, new, _, _ = update_user_stats(db, datetime.date.today(), 10, 10)
+        assert [a.name for a in new] == ["Primer Paso", "Perfección"]
+        stats = db.query(UserStats).one()
+        assert [r.name for r in unlocked_rules(stats.achievements_mask)] == ["Primer Paso", "Perfección"]
+        db.expunge_all()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        _, _, new, _, _ = update_user_stats(db, datetime.date.today(), 10, 10)
+        assert new == []
+        # Una lectura y una escritura de user_stats; la tabla achievements no se toca
+        assert len(statements) == 2
+        assert statements[0].lstrip().startswith("SELECT") and statements[1].lstrip().startswith("UPDATE")
+        assert db.query(Achievement).count() == 2
+
+
+def test_per_user_partitioning(engine):
+    import datetime
+    from sqlalchemy.orm import Session
+    from core.analytics import load_daily_accuracy, load_skill_rollup
+    from core.finalize import finalize_exam_batch
+    from core.gamification import get_user_stats
+    from core.pdf_utils import session_report_jobs
+    from core.scheduler import count_due
+    from core.selection import get_question_pool, invalidate_question_pool, update_pool_skills
+    from db.models import DEFAULT_USER_ID, Attempt, Question, Skill
+
+    far = datetime.datetime.utcnow() + datetime.timedelta(days=30)
+    with Session(engine) as db:
+        for i in range(6):
+            db.add(Question(question_id=f"q{i}", track="FUNCIONAL", competency="Tributaria", topic="IVA" if i < 3 else "Renta",
+                            difficulty=2, stem=f"Pregunta {i}", options_json={"A": "1", "B": "2"}, correct_key="A",
+                            hash_norm=f"h{i}"))
+        db.add(Skill(track="FUNCIONAL", competency="Tributaria", topic="IVA", mastery_score=90.0))  # DEFAULT_USER_ID
+        db.commit()
+
+        ana = finalize_exam_batch(db, ["q0", "q1", "q3"], {"q0": "A", "q1": "A", "q3": "A"}, user_id="ana")
+        luis = finalize_exam_batch(db, ["q0", "q4"], {"q0": "B", "q4": "B"}, user_id="luis")
+        assert ana["correct"] == 3 and luis["correct"] == 0
+
+        # Cada candidato tiene sus intentos, habilidades, estadísticas, agregados y cola de repaso
+        assert db.query(Attempt).filter_by(user_id="ana").count() == 3
+        assert db.query(Skill).filter_by(user_id="luis").count() == 2
+        assert db.query(Skill).filter_by(user_id=DEFAULT_USER_ID).one().mastery_score == 90.0
+        assert get_user_stats(db, "ana").total_points > 0 and get_user_stats(db, "luis").total_points == 0
+        assert get_user_stats(db) is None
+        assert load_daily_accuracy(db, "ana")["Intentos"].tolist() == [3]
+        assert load_daily_accuracy(db, "luis")["Porcentaje"].tolist() == [0.0]
+        assert load_skill_rollup(db, "luis")["Habilidades"].sum() == 2 and load_skill_rollup(db).empty
+        assert count_due(db, far, user_id="ana") == 3 and count_due(db, far, user_id="luis") == 2
+        assert count_due(db, far) == 0
+
+        # Un snapshot del banco compartido; el dominio de cada candidato aparte
+        invalidate_question_pool()
+        base, pool_luis = get_question_pool(db), get_question_pool(db, "luis")
+        assert pool_luis.question_ids is base.question_ids
+        iva = base.skill_keys.index(("FUNCIONAL", "Tributaria", "IVA"))
+        assert base.mastery[iva] == 90.0 and pool_luis.mastery[iva] == 0.0
+        update_pool_skills({("FUNCIONAL", "Tributaria", "IVA"): (85.0, 1.0)}, "luis")
+        assert pool_luis.mastery[iva] == 85.0 and base.mastery[iva] == 90.0
+        invalidate_question_pool()
+
+        jobs = session_report_jobs(db, user_id="luis")
+        assert len(jobs) == 1 and jobs[0][0]["total"] == 2 and jobs[0][2].startswith("Resultado_Simulacro_luis_")
+        assert len(session_report_jobs(db)) == 2
+
+
+def test_sql_profiler_fingerprints_n_plus_one_and_explain(engine):
+    import json
+    from sqlalchemy import select, text
+    from sqlalchemy.orm import Session
+    from db.models import Question
+    from db.profiler import N_PLUS_ONE_MIN, OUTSIDE_STREAMLIT, QueryProfiler, fingerprint
+
+    assert fingerprint("SELECT * FROM q WHERE id IN (?, ?, ?) AND name = 'x' LIMIT 5") == \
+        fingerprint("SELECT *  FROM q WHERE id IN (%(id_1)s, %(id_2)s) AND name = 'otro' LIMIT 10") == \
+        "SELECT * FROM q WHERE id IN (?, ...) AND name = ? LIMIT ?"
+
+    profiler = QueryProfiler(explain_ms=0).attach(engine)
+    with Session(engine) as db:
+        for i in range(N_PLUS_ONE_MIN):
+            db.add(Question(question_id=f"q{i}", track="FUNCIONAL", competency="C", topic="T", difficulty=1,
+                            stem=f"P{i}", options_json={"A": "a"}, correct_key="A", hash_norm=f"h{i}"))
+        db.commit()
+        for i in range(N_PLUS_ONE_MIN):  # una consulta por pregunta
+            db.execute(select(Question.stem).where(Question.question_id == f"q{i}")).scalar()
+        db.execute(text("UPDATE questions SET difficulty = 2"))
+    profiler.detach()
+
+    report = profiler.report()
+    lookup = next(r for r in report if "WHERE questions.question_id = ?" in r["fingerprint"])
+    assert lookup["page"] == OUTSIDE_STREAMLIT and lookup["count"] == N_PLUS_ONE_MIN and lookup["n_plus_one"]
+    assert "questions" in lookup["explain"] and lookup["rows"] is None
+    update = next(r for r in report if r["fingerprint"].startswith("UPDATE"))
+    assert update["rows"] == N_PLUS_ONE_MIN and update["explain"] is None and not update["n_plus_one"]
+    dumped = json.loads(profiler.to_json())
+    assert len(dumped["queries"]) == len(report) and dumped["recent"][-1]["fingerprint"] == update["fingerprint"]
+
+
+def test_stem_parts_precomputed_on_insert_and_backfilled(db):
+    import pandas as pd
+    from sqlalchemy import select, text
+    from db.models import Question
+    from core.exam_snapshot import build_exam_snapshot
+    from core.question_store import (backfill_stem_parts, build_question_row, insert_questions,
+                                     question_rows_from_import_df)
+    from core.selection import QuestionPool, get_question_pool, invalidate_question_pool
+    from core.stem_parts import stem_parts
+
+    assert stem_parts("SITUACIÓN: Un caso. PREGUNTA: ¿Qué hacer?") == \
+        {"is_situational": True, "situation_text": "Un caso.", "prompt_text": "¿Qué hacer?"}
+    assert stem_parts("Pregunta directa") == {"is_situational": False, "situation_text": None,
+                                              "prompt_text": "Pregunta directa"}
+
+    # Generador / creación manual, carga masiva y ORM
+    insert_questions(db, [build_question_row({"question_id": "gen", "track": "FUNCIONAL", "competency": "C",
+                                              "topic": "T", "difficulty": 2, "options_json": {},
+                                              "stem": "SITUACIÓN: caso gen. PREGUNTA: ¿gen?"})])
+    df = pd.DataFrame([{"track": "funcional", "competency": "C", "topic": "T", "difficulty": 3, "stem": "Directa",
+                        "options_A": "a", "options_B": "b", "options_C": "c", "correct_key": "A"}])
+    insert_questions(db, question_rows_from_import_df(df))
+    db.add(Question(question_id="orm", track="INTEGRIDAD", competency="C", topic="T", difficulty=1,
+                    stem="SITUACIÓN: caso orm. PREGUNTA: ¿orm?", options_json={}, hash_norm="h-orm"))
+    # Fila anterior a las columnas: sin calcular hasta el backfill
+    db.execute(Question.__table__.insert(), [{"question_id": "old", "track": "FUNCIONAL", "competency": "C",
+               "topic": "T", "difficulty": 2, "stem": "SITUACIÓN: caso old. PREGUNTA: ¿old?", "options_json": {},
+               "hash_norm": "h-old"}])
+    db.commit()
+
+    parts = {r.question_id: (r.is_situational, r.situation_text, r.prompt_text) for r in db.execute(
+        select(Question.question_id, Question.is_situational, Question.situation_text, Question.prompt_text))}
+    assert parts["gen"] == (True, "caso gen.", "¿gen?") and parts["orm"] == (True, "caso orm.", "¿orm?")
+    assert [p for q, p in parts.items() if q not in ("gen", "orm", "old")] == [(False, None, "Directa")]
+    assert parts["old"] == (False, None, None)
+    # El snapshot no depende del backfill
+    assert build_exam_snapshot(db, ["old"])[0].question_text == "¿old?"
+    invalidate_question_pool()
+    stale = get_question_pool(db)
+    assert stale.count(stale.mask(only_situational=True)) == 2
+
+    assert backfill_stem_parts(db) == 1 and backfill_stem_parts(db) == 0
+    # Mismo conteo y created_at: el snapshot se renueva por la versión del banco
+    fresh = get_question_pool(db)
+    assert fresh is not stale and fresh.count(fresh.mask(only_situational=True)) == 3
+    invalidate_question_pool()
+    assert db.get(Question, "old").is_situational and db.get(Question, "old").situation_text == "caso old."
+    assert backfill_stem_parts(db, recompute=True) == 4
+
+    pool = QuestionPool.from_db(db, None)
+    assert pool.count(pool.mask(only_situational=True)) == 3
+    assert pool.count(pool.mask(tracks=["FUNCIONAL"], difficulties=[2], only_situational=True)) == 2
+
+    plan = " ".join(r[-1] for r in db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT question_id FROM questions "
+        "WHERE is_situational = 1 AND track = 'FUNCIONAL' AND difficulty IN (1, 2)")))
+    assert "ix_questions_situational_track_diff" in plan
+
+
+def test_taxonomy_facets_incremental_and_cached(engine, session_factory, db, monkeypatch):
+    from sqlalchemy import event, select
+    from db.models import Question, TaxonomyFacet
+    from core import taxonomy
+    from core.bank_version import bump_bank_version
+    from core.question_store import backfill_stem_parts, build_question_row, delete_questions, insert_questions
+    from core.taxonomy import FACET_COLUMNS, get_taxonomy, rebuild_taxonomy
+
+    monkeypatch.setattr(taxonomy, "_cache", None)  # otra BD en memoria pudo dejar la misma versión
+
+    def facets():
+        return {tuple(r[:-1]): r[-1] for r in db.execute(select(
+            *[TaxonomyFacet.__table__.c[c] for c in FACET_COLUMNS], TaxonomyFacet.question_count))}
+
+    rows = [build_question_row({"question_id": f"q{i}", "track": "FUNCIONAL" if i % 3 else "INTEGRIDAD",
+                                "competency": "C", "topic": f"T{i % 2}", "difficulty": 1 + i % 3, "options_json": {},
+                                "stem": f"SITUACIÓN: caso {i}. PREGUNTA: ¿{i}?" if i % 4 else f"Directa {i}"})
+            for i in range(12)]
+    insert_questions(db, rows + [dict(rows[0], question_id="dup")])  # el duplicado no cuenta
+    db.add(Question(question_id="orm", track="COMPORTAMENTAL", competency="C", topic="T9", difficulty=2,
+                    macro_dominio="M", stem="Directa orm", options_json={}, hash_norm="h-orm"))
+    db.commit()
+    assert sum(facets().values()) == 13 and facets()[("COMPORTAMENTAL", "C", "T9", "M", "", 2, False)] == 1
+
+    # Edición por ORM: la pregunta cambia de faceta; borrados por lotes y por ORM descuentan
+    orm = db.get(Question, "orm")
+    orm.topic, orm.stem = "T1", "SITUACIÓN: editada. PREGUNTA: ¿?"
+    db.commit()
+    assert ("COMPORTAMENTAL", "C", "T9", "M", "", 2, False) not in facets()
+    delete_questions(db, ["q1", "q2"])
+    db.delete(db.get(Question, "q3"))
+    db.commit()
+    incremental = facets()
+    assert sum(incremental.values()) == 10
+    rebuild_taxonomy(db)
+    assert facets() == incremental
+
+    catalog = get_taxonomy(db)
+    assert catalog.tracks == ["COMPORTAMENTAL", "FUNCIONAL", "INTEGRIDAD"] and catalog.topics == ["T0", "T1"]
+    assert catalog.count() == 10
+    assert catalog.count(topics=["T1"], difficulties=[1, 2], only_situational=True) == db.query(Question).filter(
+        Question.topic == "T1", Question.difficulty.in_([1, 2]), Question.is_situational.is_(True)).count()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert get_taxonomy(db) is catalog and catalog.count(topics=["T1"], difficulties=[2, 1], only_situational=True)
+    assert len(statements) == 1  # mismo banco: solo la lectura de la versión
+    bump_bank_version(db)
+    db.commit()
+    statements.clear()
+    assert get_taxonomy(db) is not catalog and len(statements) == 2
+
+    # Otro proceso (p. ej. scripts/backfill_stem_parts.py --recompute) reescribe el banco
+    catalog = get_taxonomy(db)
+    with session_factory() as other:
+        other.execute(Question.__table__.update().values(is_situational=False, prompt_text=None))
+        assert backfill_stem_parts(other) == 10
+        rebuild_taxonomy(other)
+        other.commit()
+    refreshed = get_taxonomy(db)
+    assert refreshed is not catalog and refreshed.count() == 10
+    assert refreshed.count(only_situational=True) == catalog.count(only_situational=True)
+
+
+def test_session_report_jobs_group_legacy_attempts_by_gap(db):
+    import datetime
+    from core.pdf_utils import session_report_jobs
+    from db.models import Attempt, Question
+
+    db.add_all([Question(question_id=f"q{i}", track="FUNCIONAL", competency="C", topic="T", difficulty=2,
+                         stem=f"Pregunta {i}", options_json={"A": "a"}, correct_key="A", hash_norm=f"h{i}")
+                for i in range(5)])
+    t0 = datetime.datetime(2026, 1, 8, 16, 3, 44)
+    ms = datetime.timedelta(milliseconds=15)
+    # Finalize anterior: una fila tras otra; finalize_exam_batch: mismo created_at para todo el simulacro
+    legacy = [(f"q{i}", t0 + i * ms, "default") for i in range(5)]
+    later = [(f"q{i}", t0 + datetime.timedelta(minutes=3) + i * ms, "default") for i in range(3)]
+    batch = [(f"q{i}", t0 + datetime.timedelta(hours=1), "default") for i in range(4)]
+    other = [(f"q{i}", t0 + i * ms, "ana") for i in range(2)]  # a la vez que el primero, otro candidato
+    db.add_all([Attempt(question_id=q, created_at=at, user_id=u, chosen_key="A" if i % 2 else "B",
+                        is_correct=bool(i % 2)) for rows in (legacy, later, batch, other) for i, (q, at, u) in enumerate(rows)])
+    db.commit()
+
+    jobs = session_report_jobs(db, user_id="default")
+    assert [j[0]["total"] for j in jobs] == [4, 3, 5]
+    assert [d["stem"] for d in jobs[2][1]] == [f"Pregunta {i}" for i in range(5)]  # orden de respuesta
+    assert jobs[2][2] == "Resultado_Simulacro_20260108_160344_060000.pdf"
+    assert sorted(j[0]["total"] for j in session_report_jobs(db)) == [2, 3, 4, 5]
+    assert [j[0]["total"] for j in session_report_jobs(db, limit=2)] == [4, 3]
+    assert len(session_report_jobs(db, user_id="default", gap_seconds=600)) == 2